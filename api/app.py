@@ -7,9 +7,18 @@ FilePath: \ai_translator\api\app.py
 Description: 这是默认设置,请设置`customMade`, 打开koroFileHeader查看配置 进行设置: https://github.com/OBKoro1/koro1FileHeader/wiki/%E9%85%8D%E7%BD%AE
 '''
 import argparse
-from flask import Flask
+import os
+import sys
 
+from flask import Flask, Response, jsonify, request, send_file
+from werkzeug.utils import secure_filename
 
+# 将当前文件所在目录添加到系统路径中，以便能够找到自定义模块
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from service import JobManager, JobQueueFullError, TranslationJob
+from translator import create_content_filter, segment_index_options
+from utils import ConfigLoader, METRICS
 
 
 def parse_args():
@@ -17,20 +26,143 @@ def parse_args():
     parser = argparse.ArgumentParser(description="这是一个 AI 翻译助手")
     parser.add_argument('--port', type=int, default=5000, help='运行应用的端口号，默认为5000')
     parser.add_argument('--env', choices=['development', 'production'], default='development', help='应用运行环境，默认为development')
+    parser.add_argument('--config', type=str, default='config.yaml', help='模型和API设置的配置文件，默认为config.yaml')
+    parser.add_argument('--model_type', type=str, default='OpenAIModel', choices=['GLMModel', 'OpenAIModel'], help='翻译使用的模型类型，默认为OpenAIModel')
 
 
     return parser.parse_args()
 
-# 创建 Flask 应用实例
-app = Flask(__name__)
 
-# 假设这是你的路由和其他配置
-@app.route('/')
-def hello_world():
-    return 'Hello, World!'
+def create_app(job_manager: JobManager) -> Flask:
+    """
+    创建 Flask 应用实例。翻译任务提交后由 job_manager 在后台执行，HTTP请求只负责提交和查询，立即返回。
+
+    参数:
+    - job_manager: JobManager，翻译任务管理器，所有任务共享其中的模型实例。
+
+    返回:
+    - Flask，应用实例。
+    """
+    app = Flask(__name__)
+
+    @app.route('/')
+    def hello_world():
+        return 'Hello, World!'
+
+    @app.route('/jobs', methods=['POST'])
+    def submit_job():
+        # 上传的PDF文件，以及可选的输出格式和目标语言
+        upload = request.files.get('file')
+        if upload is None or not upload.filename:
+            return jsonify({"error": "Missing PDF file in form field 'file'."}), 400
+        file_format = request.form.get('file_format', 'markdown')
+        if file_format.lower() not in ('markdown', 'pdf'):
+            return jsonify({"error": f"Unsupported file format: {file_format}"}), 400
+        target_language = request.form.get('target_language', '中文')
+
+        # 先预留队列位置再保存上传文件，队列已满时直接拒绝
+        try:
+            job_id = job_manager.reserve()
+        except JobQueueFullError as e:
+            METRICS.inc("jobs_rejected")
+            return jsonify({"error": str(e)}), 429, {"Retry-After": "30"}
+        try:
+            pdf_file_path = os.path.join(job_manager.job_dir(job_id), secure_filename(upload.filename) or 'book.pdf')
+            upload.save(pdf_file_path)
+        except Exception:
+            job_manager.release(job_id)
+            raise
+
+        job = job_manager.submit(job_id, pdf_file_path, file_format, target_language)
+        METRICS.inc("jobs_submitted")
+        return jsonify(job.to_dict()), 202, {"Location": f"/jobs/{job.job_id}"}
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        # Prometheus文本格式的运行指标
+        return Response(METRICS.to_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    @app.route('/jobs/<job_id>', methods=['GET'])
+    def get_job(job_id):
+        job = job_manager.get(job_id)
+        if job is None:
+            return jsonify({"error": f"Unknown job: {job_id}"}), 404
+        return jsonify(job.to_dict())
+
+    @app.route('/jobs/<job_id>', methods=['DELETE'])
+    def delete_job(job_id):
+        # 删除已结束的任务及其文件，执行中的任务不能删除
+        job = job_manager.get(job_id)
+        if job is None:
+            return jsonify({"error": f"Unknown job: {job_id}"}), 404
+        if not job_manager.remove(job_id):
+            return jsonify(job.to_dict()), 409
+        return "", 204
+
+    @app.route('/jobs/<job_id>/partial', methods=['GET'])
+    def get_job_partial(job_id):
+        # 翻译中的页面目前为止的译文，已完成的页面见结果文件
+        job = job_manager.get(job_id)
+        if job is None:
+            return jsonify({"error": f"Unknown job: {job_id}"}), 404
+        return Response(job.partial_markdown(), mimetype="text/markdown",
+                        headers={"X-Job-Status": job.status, "X-Pages-Done": str(job.pages_done)})
+
+    @app.route('/jobs/<job_id>/result', methods=['GET'])
+    def get_job_result(job_id):
+        job = job_manager.get(job_id)
+        if job is None:
+            return jsonify({"error": f"Unknown job: {job_id}"}), 404
+        if job.status != TranslationJob.SUCCEEDED:
+            return jsonify(job.to_dict()), 409
+        # 下载不改变过期时间，客户端取得结果后调用 POST /jobs/<job_id>/ack 或 DELETE /jobs/<job_id>
+        return send_file(os.path.abspath(job.output_file_path), as_attachment=True)
+
+    @app.route('/jobs/<job_id>/ack', methods=['POST'])
+    def ack_job_result(job_id):
+        # 客户端确认已取得翻译结果，结果在短暂的宽限期后过期删除；未确认的结果在 result_ttl 后删除
+        job = job_manager.get(job_id)
+        if job is None:
+            return jsonify({"error": f"Unknown job: {job_id}"}), 404
+        if not job_manager.acknowledge(job_id):
+            return jsonify(job.to_dict()), 409
+        return jsonify(job.to_dict())
+
+    return app
+
 
 if __name__ == '__main__':
+    from model import create_cache, create_model
+
     args = parse_args()
-    
+    config = ConfigLoader(args.config).load_config()
+    common_config = config['common']
+    service_config = config.get('Service', {})
+
+    # 模型实例（连同限流器、缓存和连接池）在所有任务之间共享，启动时创建一次
+    concurrency = common_config.get('concurrency', 1)
+    model = create_model(args.model_type, config, concurrency=concurrency * service_config.get('workers', 2))
+    cache = create_cache(config)
+    if cache is not None:
+        model.set_cache(cache)
+
+    job_manager = JobManager(model,
+                             workers=service_config.get('workers', 2),
+                             max_queue=service_config.get('max_queue', 16),
+                             output_dir=service_config.get('output_dir', 'jobs'),
+                             stream_partial=service_config.get('stream_partial', True),
+                             result_ttl=service_config.get('result_ttl', 3600),
+                             translator_options={
+                                 "concurrency": concurrency,
+                                 "parse_workers": common_config.get('parse_workers', 1),
+                                 "render_workers": common_config.get('render_workers', 1),
+                                 "pdf_chunk_pages": common_config.get('pdf_chunk_pages', 32),
+                                 "batch_max_chars": common_config.get('batch_max_chars', 0),
+                                 "content_filter": create_content_filter(config),
+                                 "segment_options": segment_index_options(config),
+                                 "async_requests": common_config.get('async_requests', False),
+                             })
+    app = create_app(job_manager)
+
     # 根据命令行参数配置应用
-    app.run(host='0.0.0.0', port=args.port, debug=args.env == 'development')
\ No newline at end of file
+    app.run(host='0.0.0.0', port=args.port, debug=args.env == 'development', use_reloader=False)
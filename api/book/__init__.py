@@ -1,3 +1,3 @@
 from .book import Book
 from .page import Page
-from .content import ContentType, Content, TableContent
\ No newline at end of file
+from .content import ContentType, Content, TableContent, cell_key, parse_cell_translations
\ No newline at end of file
@@ -13,6 +13,7 @@ class Book:
     - pdf_file_path: str，存储PDF文件的路径。
     - pages: list，存储Page对象的列表，每个Page对象代表PDF中的一页。
     """
+    __slots__ = ("pdf_file_path", "pages")
 
     def __init__(self, pdf_file_path):
         """
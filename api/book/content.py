@@ -1,8 +1,54 @@
-import pandas as pd
 from enum import Enum, auto
-from PIL import Image as PILImage
-from utils import LOG
-import io
+from utils import LOG, METRICS
+import json
+import re
+
+# pandas 和 PIL 只在需要DataFrame和处理图片时导入，纯文本的书不需要加载它们
+
+# 不需要翻译的表格单元格：空白、纯标点、数字（可带千分位、小数、百分号、货币符号和正负号）、日期和时间
+NON_TRANSLATABLE_CELL_PATTERN = (
+    r'\s*(?:'
+    r'[-+]?[$€£¥]?\s*\d[\d,]*(?:\.\d+)?\s*%?'
+    r'|\d{1,4}[-/.年]\d{1,2}[-/.月]\d{1,4}日?'
+    r'|\d{1,2}:\d{2}(?::\d{2})?'
+    r'|[\W_]*'
+    r')\s*'
+)
+NON_TRANSLATABLE_CELL_RE = re.compile(NON_TRANSLATABLE_CELL_PATTERN)
+
+
+def cell_key(row_idx: int, col_idx: int) -> str:
+    """
+    表格翻译协议中单元格的键：r行号c列号，从1开始，表头为第1行。
+
+    :param row_idx: 行索引，从0开始。
+    :param col_idx: 列索引，从0开始。
+    :return: 单元格的键，例如 "r2c3"。
+    """
+    return f"r{row_idx + 1}c{col_idx + 1}"
+
+
+def parse_cell_translations(text: str, cells: dict) -> dict:
+    """
+    解析模型按表格翻译协议返回的JSON对象 {单元格键: 译文}，并对照请求的单元格逐个校验：
+    只保留请求中有的键、且译文为非空字符串的单元格。缺少的键、多余的键和格式不对的值只影响对应的单元格，
+    JSON对象之外的内容（例如代码块标记）被忽略。
+
+    :param text: 模型返回的文本。
+    :param cells: 请求的单元格 {单元格键: 原文}。
+    :return: 通过校验的单元格 {单元格键: 译文}；无法解析为JSON对象时为空字典。
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        return {}
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {key: value.strip() for key, value in data.items() if key in cells and isinstance(value, str) and value.strip()}
+
 
 # 定义内容类型枚举，包括文本、表格和图片
 class ContentType(Enum):
@@ -12,6 +58,9 @@ class ContentType(Enum):
 
 # 定义内容类，包含原始内容、翻译内容及其类型和状态
 class Content:
+    # 使用 __slots__ 避免每个实例的 __dict__，一本书中有大量内容对象
+    __slots__ = ("content_type", "original", "translation", "status")
+
     def __init__(self, content_type, original, translation=None):
         """
         初始化内容对象。
@@ -25,6 +74,7 @@ class Content:
         self.translation = translation
         self.status = False
 
+    @METRICS.timed("set_translation")
     def set_translation(self, translation, status):
         """
         设置翻译内容并更新状态。
@@ -49,77 +99,131 @@ class Content:
             return True
         elif self.content_type == ContentType.TABLE and isinstance(translation, list):
             return True
-        elif self.content_type == ContentType.IMAGE and isinstance(translation, PILImage.Image):
-            return True
+        elif self.content_type == ContentType.IMAGE:
+            from PIL import Image as PILImage
+            return isinstance(translation, PILImage.Image)
         return False
 
 
 # 表格内容类，继承自内容类，提供针对表格内容的特定操作
 class TableContent(Content):
+    """
+    表格按行存储为字符串列表的列表（第一行为表头），原文和译文都不保存DataFrame，
+    需要时通过 to_dataframe 创建。
+    """
+    __slots__ = ()
+
     def __init__(self, data, translation=None):
         """
         初始化表格内容对象。
         
-        :param data: 表格数据，二维列表形式。
+        :param data: 表格数据，二维列表形式，第一行为表头。空单元格（None）视为空字符串，较短的行用空字符串补齐。
         :param translation: 翻译后的表格数据（默认为None）。
-        :raises ValueError: 当给定数据与创建的DataFrame对象的行和列数不匹配时抛出。
+        :raises ValueError: 当表头的列数与表格的最大列数不一致时抛出。
         """
-        df = pd.DataFrame(data)
+        columns = max(len(row) for row in data)
+        # 验证表头的列数是否与表格的列数一致
+        if len(data[0]) != columns:
+            raise ValueError("The number of rows and columns in the extracted table data do not match.")
 
-        # 验证数据中的行和列数是否与DataFrame对象匹配
-        if len(data) != len(df) or len(data[0]) != len(df.columns):
-            raise ValueError("The number of rows and columns in the extracted table data and DataFrame object do not match.")
-        
-        super().__init__(ContentType.TABLE, df)
+        rows = [["" if cell is None else str(cell) for cell in row] + [""] * (columns - len(row)) for row in data]
+        super().__init__(ContentType.TABLE, rows, translation)
 
+    @METRICS.timed("set_translation")
     def set_translation(self, translation, status):
         """
-        设置翻译后的表格内容并更新状态。
+        设置翻译后的表格内容并更新状态。翻译后的表格同样按行存储，第一行为表头。
         
-        :param translation: 翻译后的表格内容，字符串形式。
+        :param translation: 翻译后的表格内容。字典形式时为 {单元格原文: 译文}，按单元格映射回表格，
+            字典中没有的单元格保留原文；字符串形式时为模型按表格翻译协议返回的JSON对象（见 translatable_cell_keys），
+            缺失或格式不对的单元格保留原文，此时状态为失败。
         :param status: 翻译的状态（True表示成功）。
-        :raises ValueError: 当翻译类型不为字符串时抛出。
+        :raises ValueError: 当翻译类型不为字典或字符串时抛出。
         """
         try:
+            if isinstance(translation, dict):
+                self.translation = self._map_cells(translation)
+                self.status = status
+                return
             if not isinstance(translation, str):
-                raise ValueError(f"Invalid translation type. Expected str, but got {type(translation)}")
+                raise ValueError(f"Invalid translation type. Expected dict or str, but got {type(translation)}")
 
             LOG.debug(translation)
-            # 将字符串转换为列表的列表形式
-            # table_data = [row.strip().split(',') for row in translation.strip().split('\n')]
-            # LOG.debug(translation)
-            # 从table_data创建read_csv
-            # translated_df = pd.DataFrame(translation)
-            csv_file_like = io.StringIO(translation)
-            LOG.debug(csv_file_like)
-            
-            translated_df = pd.read_csv(csv_file_like)
-
-            LOG.debug(translated_df)
-            self.translation = translated_df
-            self.status = status
+            cells = self.translatable_cell_keys()
+            translated = parse_cell_translations(translation, cells)
+            if len(translated) < len(cells):
+                LOG.warning(f"表格翻译结果中 {len(cells) - len(translated)}/{len(cells)} 个单元格缺失或格式不对，保留原文")
+                METRICS.inc("table_parse_failures")
+            self.translation = self._map_cells({cells[key]: text for key, text in translated.items()})
+            self.status = status and len(translated) == len(cells)
         except Exception as e:
             LOG.error(f"An error occurred during table translation: {e}")
+            METRICS.inc("table_parse_failures")
             self.translation = None
             self.status = False
 
+    def translatable_cells(self):
+        """
+        返回表格中需要翻译的单元格原文：去重后的非空、非数字、非日期的单元格，按首次出现的顺序排列。
+
+        :return: 单元格原文字符串列表。
+        """
+        cells = dict.fromkeys(cell for row in self.original for cell in row)
+        return [cell for cell in cells if not NON_TRANSLATABLE_CELL_RE.fullmatch(cell)]
+
+    def translatable_cell_keys(self) -> dict:
+        """
+        返回需要翻译的单元格及其在表格翻译协议中的键，与 translatable_cells 的单元格和顺序相同，
+        相同的单元格只保留第一次出现的位置。
+
+        :return: {单元格键: 单元格原文}，键见 cell_key。
+        """
+        cells = {}
+        for row_idx, row in enumerate(self.original):
+            for col_idx, cell in enumerate(row):
+                if cell not in cells:
+                    cells[cell] = cell_key(row_idx, col_idx)
+        return {key: cell for cell, key in cells.items() if not NON_TRANSLATABLE_CELL_RE.fullmatch(cell)}
+
+    def _map_cells(self, cell_translations: dict) -> list:
+        """
+        将单元格译文映射回整张表格。
+
+        :param cell_translations: {单元格原文: 译文}，没有译文的单元格保留原文。
+        :return: 翻译后的表格，按行存储，第一行为表头。
+        """
+        return [[cell_translations.get(cell, cell) for cell in row] for row in self.original]
+
+    def to_dataframe(self, translated=False) -> "pd.DataFrame":
+        """
+        创建表格的DataFrame。每次调用都新建，不在内容对象中保留。
+
+        :param translated: 是否使用翻译后的表格。原文的表头作为第一行数据、列名为列序号；译文以第一行作为列名。
+        :return: DataFrame。
+        """
+        import pandas as pd
+
+        if translated:
+            return pd.DataFrame(self.translation[1:], columns=self.translation[0])
+        return pd.DataFrame(self.original)
+
     def __str__(self):
         """
         返回原始表格内容的字符串表示。
         
         :return: 表格的字符串表示。
         """
-        return self.original.to_string(header=False, index=False)
+        return self.get_original_as_str()
 
     def iter_items(self, translated=False):
         """
         遍历表格内容项。
         
-        :param translated: 是否遍历翻译后的表格内容（默认为False，即遍历原始内容）。
+        :param translated: 是否遍历翻译后的表格内容（默认为False，即遍历原始内容）。译文不包括表头行。
         :return: 表格内容项的迭代器。
         """
-        target_df = self.translation if translated else self.original
-        for row_idx, row in target_df.iterrows():
+        rows = self.translation[1:] if translated else self.original
+        for row_idx, row in enumerate(rows):
             for col_idx, item in enumerate(row):
                 yield (row_idx, col_idx, item)
 
@@ -127,18 +231,20 @@ class TableContent(Content):
         """
         更新表格中的内容项。
         
-        :param row_idx: 行索引。
+        :param row_idx: 行索引，与 iter_items 一致。
         :param col_idx: 列索引。
         :param new_value: 新值。
         :param translated: 是否更新翻译后的表格内容（默认为False，即更新原始内容）。
         """
-        target_df = self.translation if translated else self.original
-        target_df.at[row_idx, col_idx] = new_value
+        if translated:
+            self.translation[row_idx + 1][col_idx] = new_value
+        else:
+            self.original[row_idx][col_idx] = new_value
 
     def get_original_as_str(self):
         """
-        返回原始表格内容的字符串表示。
+        返回原始表格内容的字符串表示（与 DataFrame.to_string 的格式相同）。
         
         :return: 原始表格的字符串表示。
         """
-        return self.original.to_string(header=False, index=False)
\ No newline at end of file
+        return self.to_dataframe().to_string(header=False, index=False)
@@ -12,6 +12,7 @@ class Page:
     """
     Page类用于创建和管理页面内容。
     """
+    __slots__ = ("contents",)
 
     def __init__(self):
         """
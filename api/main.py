@@ -7,9 +7,9 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # 导入自定义的工具模块和模型模块
-from utils import ArgumentParser, ConfigLoader, LOG
-from model import GLMModel, OpenAIModel
-from translator import PDFTranslator
+from utils import ArgumentParser, ConfigLoader, LOG, METRICS
+from model import create_cache, create_model
+from translator import BatchTranslator, PDFTranslator, collect_books, create_content_filter, segment_index_options
 
 # 主程序入口
 if __name__ == "__main__":
@@ -22,15 +22,92 @@ if __name__ == "__main__":
     config_loader = ConfigLoader(args.config)
     config = config_loader.load_config()
 
-    # 根据命令行参数或配置文件加载OpenAI模型和API密钥
-    model_name = args.openai_model if args.openai_model else config['OpenAIModel']['model']
-    api_key = args.openai_api_key if args.openai_api_key else config['OpenAIModel']['api_key']
-    model = OpenAIModel(model=model_name, api_key=api_key)
+    # 并发请求数上限，未配置时按顺序逐个翻译
+    concurrency = args.concurrency if args.concurrency else config['common'].get('concurrency', 1)
+    # 是否以协程方式发送翻译请求，进行中的请求都在一个事件循环线程中等待
+    async_requests = args.async_requests or config['common'].get('async_requests', False)
+
+    # 根据命令行参数或配置文件创建模型，所有并发请求共享同一个限流器
+    model = create_model(args.model_type, config, concurrency=concurrency,
+                         glm_model_url=args.glm_model_url, timeout=args.timeout,
+                         openai_model=args.openai_model, openai_api_key=args.openai_api_key)
+
+    # 根据配置文件创建翻译缓存，--purge_cache 时先清空缓存，--no_cache 时本次运行绕过缓存
+    cache = create_cache(config)
+    if cache is not None:
+        if args.purge_cache:
+            cache.purge()
+        if args.no_cache:
+            cache.close()
+            cache = None
+        else:
+            model.set_cache(cache)
 
     # 根据命令行参数或配置文件设置PDF文件路径和文件格式
     pdf_file_path = args.book if args.book else config['common']['book']
     file_format = args.file_format if args.file_format else config['common']['file_format']
+    # 是否使用按页流水线模式，以及流水线中缓冲的页面数上限
+    streaming = args.streaming or config['common'].get('streaming', False)
+    queue_size = config['common'].get('queue_size', 8)
+    # 解析PDF使用的进程数
+    parse_workers = args.parse_workers if args.parse_workers else config['common'].get('parse_workers', 1)
+    # 渲染PDF输出使用的进程数，以及每个渲染分段的页数
+    render_workers = args.render_workers if args.render_workers else config['common'].get('render_workers', 1)
+    pdf_chunk_pages = config['common'].get('pdf_chunk_pages', 32)
+    # 批量翻译时单个请求的原文字符数上限，0表示不打包
+    batch_max_chars = args.batch_max_chars if args.batch_max_chars is not None else config['common'].get('batch_max_chars', 0)
+
+    # 检查点目录，未配置时不记录检查点
+    checkpoint_dir = config['common'].get('checkpoint_dir')
+    # 翻译前识别无需翻译的内容，--no_content_filter 时全部发送给模型
+    content_filter = None if args.no_content_filter else create_content_filter(config)
+    # 每本书建立重复片段索引，页眉页脚和重复段落只翻译一次，--no_segment_index 时逐页翻译
+    segment_options = None if args.no_segment_index else segment_index_options(config)
+
+    failed = False
+    if args.books:
+        # 批量模式：所有书共享同一个模型、限流器、缓存和翻译线程池
+        if args.previous_book:
+            LOG.warning("--previous_book 只适用于翻译单本书，批量模式下忽略")
+        if async_requests:
+            LOG.warning("批量模式下各书共享翻译线程池，忽略 async_requests")
+        fairness = args.fairness if args.fairness else config['common'].get('fairness', 'round_robin')
+        max_books = args.max_books if args.max_books else config['common'].get('max_books', 4)
+        batch_translator = BatchTranslator(model, concurrency=concurrency, fairness=fairness, max_books=max_books,
+                                           translator_options={
+                                               "streaming": streaming,
+                                               "queue_size": queue_size,
+                                               "parse_workers": parse_workers,
+                                               "render_workers": render_workers,
+                                               "pdf_chunk_pages": pdf_chunk_pages,
+                                               "batch_max_chars": batch_max_chars,
+                                               "checkpoint_dir": checkpoint_dir,
+                                               "content_filter": content_filter,
+                                               "segment_options": segment_options,
+                                           })
+        results = batch_translator.translate_books(collect_books(args.books), file_format, resume=args.resume)
+        failed = any(result.status != "succeeded" for result in results)
+    else:
+        # 创建PDF翻译器实例，并执行PDF翻译
+        translator = PDFTranslator(model, concurrency=concurrency, streaming=streaming, queue_size=queue_size,
+                                   parse_workers=parse_workers, batch_max_chars=batch_max_chars,
+                                   checkpoint_dir=checkpoint_dir, content_filter=content_filter,
+                                   render_workers=render_workers, pdf_chunk_pages=pdf_chunk_pages, segment_options=segment_options,
+                                   async_requests=async_requests)
+        translator.translate_pdf(pdf_file_path, file_format, resume=args.resume, previous=args.previous_book)
+
+    if cache is not None:
+        cache.log_stats()
+        cache.close()
+    if args.model_type == 'GLMModel':
+        model.log_connection_stats()
+        model.close()
+
+    # 输出各阶段耗时和请求计数的运行报告
+    if args.report:
+        METRICS.write_report(args.report, book=args.books if args.books else pdf_file_path, model=model.model_name,
+                             file_format=file_format, concurrency=concurrency, failed=failed)
+        LOG.info(f"运行报告已保存: {args.report}")
 
-    # 创建PDF翻译器实例，并执行PDF翻译
-    translator = PDFTranslator(model)
-    translator.translate_pdf(pdf_file_path, file_format)
\ No newline at end of file
+    if failed:
+        sys.exit(1)
@@ -1,3 +1,25 @@
+import importlib
+
 from .model import Model
-from .glm_model import GLMModel
-from .openai_model import OpenAIModel
\ No newline at end of file
+from .rate_limiter import RateLimiter
+
+# 模型客户端依赖较重的第三方库（openai、requests），在首次访问时才导入对应模块，
+# 例如只使用GLM模型时不会加载openai
+_LAZY_EXPORTS = {
+    "GLMModel": ".glm_model",
+    "OpenAIModel": ".openai_model",
+    "TranslationCache": ".translation_cache",
+    "create_model": ".factory",
+    "create_cache": ".factory",
+}
+
+__all__ = ["Model", "RateLimiter", *_LAZY_EXPORTS]
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
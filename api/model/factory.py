@@ -0,0 +1,68 @@
+from model.model import Model
+from model.rate_limiter import RateLimiter
+from model.translation_cache import TranslationCache
+
+
+def create_model(model_type: str, config: dict, concurrency: int = 1, rate_limiter: RateLimiter = None,
+                 glm_model_url: str = None, timeout: int = None, openai_model: str = None, openai_api_key: str = None) -> Model:
+    """
+    根据模型类型和配置创建模型实例。命令行参数优先于配置文件。
+
+    参数:
+    - model_type: str，"GLMModel" 或 "OpenAIModel"。
+    - config: dict，加载后的配置。
+    - concurrency: int，翻译并发数，GLM连接池大小不小于该值。
+    - rate_limiter: RateLimiter，共享的限流器，为None时按配置文件的 RateLimiter 段创建。
+    - glm_model_url, timeout, openai_model, openai_api_key: 可选，覆盖配置文件中的对应项。glm_model_url 可以是逗号分隔的多个副本地址。
+
+    返回:
+    - Model，创建好的模型实例。
+    """
+    # 所有并发请求共享同一个限流器
+    if rate_limiter is None:
+        rate_limiter = RateLimiter(**config.get('RateLimiter', {}))
+
+    # 只导入所选模型的客户端模块
+    if model_type == 'GLMModel':
+        from model.glm_model import GLMModel
+
+        # 加载GLM模型服务地址和超时时间，连接池大小不小于并发数；多个副本时地址为列表
+        glm_config = config['GLMModel']
+        model_url = glm_model_url.split(",") if glm_model_url else glm_config['model_url']
+        return GLMModel(model_url=model_url,
+                        timeout=timeout if timeout else glm_config['timeout'],
+                        max_chunk_chars=glm_config.get('max_chunk_chars'),
+                        rate_limiter=rate_limiter,
+                        pool_size=max(concurrency, glm_config.get('pool_size', concurrency)),
+                        pool_retries=glm_config.get('pool_retries', 2),
+                        stream_url=glm_config.get('stream_url'),
+                        max_failures=glm_config.get('max_failures', 3),
+                        probe_interval=glm_config.get('probe_interval', 5.0),
+                        hedge_percentile=glm_config.get('hedge_percentile', 0.0))
+
+    from model.openai_model import OpenAIModel
+
+    # 加载OpenAI模型和API密钥
+    openai_config = config['OpenAIModel']
+    return OpenAIModel(model=openai_model if openai_model else openai_config['model'],
+                       api_key=openai_api_key if openai_api_key else openai_config['api_key'],
+                       max_tokens=openai_config.get('max_tokens', 1024),
+                       max_chunk_chars=openai_config.get('max_chunk_chars'),
+                       rate_limiter=rate_limiter)
+
+
+def create_cache(config: dict) -> TranslationCache:
+    """
+    根据配置文件的 TranslationCache 段创建翻译缓存。
+
+    参数:
+    - config: dict，加载后的配置。
+
+    返回:
+    - TranslationCache，配置中禁用缓存时返回None。
+    """
+    cache_config = config.get('TranslationCache', {})
+    if not cache_config.get('enabled', True):
+        return None
+    return TranslationCache(path=cache_config.get('path', 'cache/translation_cache.sqlite3'),
+                            max_size_mb=cache_config.get('max_size_mb', 256))
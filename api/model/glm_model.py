@@ -1,55 +1,584 @@
+import asyncio
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import List, Optional, Union
+
 import requests
 import simplejson
+try:
+    import httpx
+except ImportError:
+    # 未安装 httpx 时，异步请求在线程中执行同步版本（见 make_request_async）
+    httpx = None
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from model import Model
+from model.rate_limiter import RateLimiter, estimate_tokens, parse_retry_after
+from model.replica_pool import Replica, ReplicaPool
+from utils import LOG, METRICS
+
+# 表示服务端暂时无法处理、值得重试的HTTP状态码
+RETRYABLE_STATUS_CODES = (429, 502, 503, 504)
+# 探测摘除的副本时发送的提示和超时时间上限（秒）
+PROBE_PROMPT = "ping"
+PROBE_TIMEOUT = 10
+# 流式响应的结束标记
+_STREAM_DONE = object()
+
+
+class _ServerBusy(Exception):
+    """
+    服务端返回了值得重试的状态码。
+    """
+    def __init__(self, status_code: int, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
 
 class GLMModel(Model):
     """
     GLMModel类，继承自Model类，用于通过HTTP请求与特定的模型服务进行交互。
     
     参数:
-    - model_url: str，模型服务的URL地址。
+    - model_url: str 或 List[str]，模型服务的URL地址。多个副本时传入列表，请求按最少进行中请求数分发到各副本，
+      连续失败的副本暂时摘除，探测成功后重新加入。
     - timeout: int，请求超时时间（秒）。
+    - max_chunk_chars: int，单个请求中文本原文的最大字符数，超过时切分后分别翻译。
+    - rate_limiter: RateLimiter，所有并发请求共享的限流器，默认为不限速、只负责退避重试的限流器。
+    - pool_size: int，连接池中保持的长连接数，应不小于翻译并发数。
+    - pool_retries: int，建立连接失败时由连接池自动重试的次数。
+    - stream_url: str 或 List[str]，可选，流式接口的URL，多个副本时与 model_url 一一对应。请求负载与 model_url 相同，
+      响应为逐行的JSON（可带SSE的 "data:" 前缀，以 [DONE] 结束），每行的 "response" 为目前为止生成的全部文本，或 "delta" 为新增的文本。
+    - max_failures: int，副本连续失败多少次后摘除。
+    - probe_interval: float，探测摘除副本的间隔（秒）。
+    - hedge_percentile: float，对冲请求的延迟分位数（0到1之间）：非流式请求的耗时超过最近成功请求延迟的该分位数时，
+      向另一个健康的副本再发一次相同的请求，取先返回的结果。0表示不对冲，只有一个副本时不生效。
     """
-    def __init__(self, model_url: str, timeout: int):
-        self.model_url = model_url  # 模型服务的URL
+    def __init__(self, model_url: Union[str, List[str]], timeout: int, max_chunk_chars: int = None, rate_limiter: RateLimiter = None,
+                 pool_size: int = 10, pool_retries: int = 2, stream_url: Union[str, List[str]] = None, max_failures: int = 3,
+                 probe_interval: float = 5.0, hedge_percentile: float = 0.0):
+        model_urls = [model_url] if isinstance(model_url, str) else list(model_url)
+        stream_urls = None
+        if stream_url:
+            stream_urls = [stream_url] if isinstance(stream_url, str) else list(stream_url)
+        self.model_url = model_urls[0]  # 模型服务的URL，多个副本时为第一个副本
+        self.stream_url = stream_urls[0] if stream_urls else None  # 流式接口的URL
         self.timeout = timeout  # 请求超时时间
+        # 缓存按模型名称区分，多个副本提供同一个模型
+        self.model_name = f"GLMModel:{model_urls[0]}" if len(model_urls) == 1 else f"GLMModel:{','.join(sorted(model_urls))}"
+        self.max_chunk_chars = max_chunk_chars  # 单个请求中文本原文的最大字符数
+        self.rate_limiter = rate_limiter or RateLimiter()  # 共享限流器
+        self.pool_size = pool_size
+        self.pool_retries = pool_retries
+        self.replicas = ReplicaPool(model_urls, stream_urls, max_failures=max_failures, probe_interval=probe_interval,
+                                    hedge_percentile=hedge_percentile, probe=self._probe)  # 副本负载均衡
+        # 对冲时原请求和对冲请求都在该线程池中发出，翻译线程等待先返回的结果
+        self.hedge_executor = None
+        if hedge_percentile and len(model_urls) > 1:
+            self.hedge_executor = ThreadPoolExecutor(max_workers=pool_size * 2, thread_name_prefix="glm-hedge")
+        self.session = self._create_session(pool_size, pool_retries, len(model_urls))  # 复用连接的HTTP会话
+        # 异步请求使用的HTTP客户端，连接池绑定到创建它的事件循环，在首次发送异步请求时按事件循环创建
+        self._async_client = None
+        self._async_client_loop = None
+
+    @staticmethod
+    def _create_session(pool_size: int, pool_retries: int, hosts: int = 1) -> requests.Session:
+        """
+        创建带连接池的HTTP会话，所有翻译线程共享并复用长连接，避免每个请求重新建立TCP/TLS连接。
+
+        连接池只重试建立连接阶段的失败（此时请求尚未发出，重试是安全的）；
+        429/5xx和读超时仍由 make_request 结合限流器重试。
+
+        参数:
+        - pool_size: int，每个副本的连接池中保持的长连接数。
+        - pool_retries: int，建立连接失败时的重试次数。
+        - hosts: int，副本数，每个副本各保留一个连接池。
+
+        返回:
+        - requests.Session，配置好连接池的会话。
+        """
+        retry = Retry(total=pool_retries, connect=pool_retries, read=0, status=0, redirect=0, backoff_factor=0.1)
+        adapter = HTTPAdapter(pool_connections=hosts, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"Connection": "keep-alive"})
+        return session
+
+    def connection_stats(self) -> dict:
+        """
+        汇总连接池的复用情况。
+
+        返回:
+        - dict，包含发出的请求数、新建的连接数和连接复用率。
+        """
+        requests_sent = 0
+        connections = 0
+        # http:// 和 https:// 挂载的是同一个适配器，只统计一次
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    requests_sent += pool.num_requests
+                    connections += pool.num_connections
+        return {
+            "requests": requests_sent,
+            "connections": connections,
+            "reuse_rate": 1 - connections / requests_sent if requests_sent else 0.0,
+        }
+
+    def log_connection_stats(self):
+        """
+        将连接池的复用情况，以及多个副本时各副本的请求数、失败和延迟输出到日志。
+        """
+        stats = self.connection_stats()
+        LOG.info(
+            f"GLM连接池: 请求 {stats['requests']} 次, 新建连接 {stats['connections']} 个, "
+            f"连接复用率 {stats['reuse_rate']:.1%}, 连接池大小 {self.pool_size}"
+        )
+        if len(self.replicas.replicas) > 1:
+            for replica in self.replicas.stats():
+                LOG.info(
+                    f"GLM副本 {replica['url']}: 请求 {replica['requests']} 次（对冲 {replica['hedges']} 次）, "
+                    f"失败 {replica['failures']} 次, 摘除 {replica['ejections']} 次, "
+                    f"延迟 p50 {replica['latency_p50_ms']}ms / p95 {replica['latency_p95_ms']}ms, "
+                    f"{'健康' if replica['healthy'] else '已摘除'}"
+                )
+
+    def close(self):
+        """
+        停止副本探测，关闭对冲线程池和HTTP会话及其连接池。
+        """
+        self.replicas.close()
+        if self.hedge_executor is not None:
+            self.hedge_executor.shutdown(wait=False)
+        self.session.close()
+
+    @property
+    def supports_streaming(self) -> bool:
+        """
+        配置了流式接口时支持流式返回。
+        """
+        return bool(self.stream_url)
 
     def make_request(self, prompt):
         """
-        向模型服务发送请求，并获取响应。
-        
+        向模型服务发送请求，并获取响应。发送前经过共享限流器，
+        遇到429/503、连接错误或超时时按指数退避重试。
+
         参数:
         - prompt: str，发送给模型的服务端的输入文本。
-        
+
         返回:
         - translation: str，模型服务返回的文本响应。
         - True: bool，表示请求成功。
         """
+        return self._request_with_retries(prompt, lambda response: response.json()["response"])
+
+    def make_stream_request(self, prompt, on_partial):
+        """
+        向流式接口发送请求，每收到一行就以目前为止生成的全部文本调用 on_partial。
+        限流和重试与 make_request 相同，连接中途断开时从头重试。流式请求不对冲。
+
+        参数:
+        - prompt: str，发送给模型的服务端的输入文本。
+        - on_partial: 回调函数，参数为目前为止收到的文本。
+
+        返回:
+        - translation: str，模型服务返回的完整文本。
+        - True: bool，表示请求成功。
+        """
+        return self._request_with_retries(prompt, lambda response: self._read_stream(response, on_partial), stream=True)
+
+    @staticmethod
+    def _read_stream(response: requests.Response, on_partial) -> str:
+        """
+        逐行读取流式响应并回调，返回完整的文本。
+        """
+        text = ""
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                event = GLMModel._parse_stream_line(line)
+                if event is _STREAM_DONE:
+                    break
+                if event is not None:
+                    text = GLMModel._apply_stream_event(text, event)
+                    on_partial(text)
+        return text
+
+    @staticmethod
+    def _parse_stream_line(line: str):
+        """
+        解析流式响应的一行：返回事件字典；空行和注释行返回None；结束标记 [DONE] 返回 _STREAM_DONE。
+        """
+        if line.startswith("data:"):
+            line = line[len("data:"):]
+        line = line.strip()
+        if not line or line.startswith(":"):
+            return None
+        if line == "[DONE]":
+            return _STREAM_DONE
+        return json.loads(line)
+
+    @staticmethod
+    def _apply_stream_event(text: str, event: dict) -> str:
+        """
+        将一个流式事件合并到目前为止的文本："response" 为全部文本，"delta" 为新增的文本。
+        """
+        if "response" in event:
+            return event["response"]
+        return text + event.get("delta", "")
+
+    def _request_with_retries(self, prompt, read_response, stream: bool = False):
+        """
+        经过共享限流器向副本发送请求，由 read_response 从响应中读取文本。
+        遇到429/503、连接错误或超时时按指数退避重试，重试时按负载均衡重新选择副本。
+
+        参数:
+        - prompt: str，发送给模型的服务端的输入文本。
+        - read_response: 从成功的响应中读取文本的函数。
+        - stream: bool，是否以流式方式读取响应体。
+
+        返回:
+        - translation: str，模型服务返回的文本响应。
+        - True: bool，表示请求成功。
+        """
+        # 准备请求的负载数据
+        payload = {
+            "prompt": prompt,
+            "history": []
+        }
+        attempts = 0  # 已重试次数
+        while True:
+            retry_after = None
+            issued_at = self.rate_limiter.acquire(estimate_tokens(prompt))
+            try:
+                translation = self._send(prompt, payload, read_response, stream)
+                self.rate_limiter.on_success()
+                return translation, True
+            except _ServerBusy as e:
+                # 服务端繁忙，按 Retry-After 和退避时间等待后重试
+                retry_after = e.retry_after
+                if e.status_code == 429:
+                    self.rate_limiter.on_rate_limited(retry_after, issued_at)
+                error = f"服务端繁忙：HTTP {e.status_code}"
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                # 处理请求超时、连接错误和流式响应中途断开，重试
+                error = f"请求超时或连接失败：{e}"
+            except requests.exceptions.RequestException as e:
+                # 处理其他请求异常
+                raise Exception(f"请求异常：{e}")
+            except (simplejson.errors.JSONDecodeError, json.JSONDecodeError) as e:
+                # 处理JSON解析错误
+                raise Exception("Error: response is not valid JSON format.")
+            except Exception as e:
+                # 处理其他未知异常
+                raise Exception(f"发生了未知错误：{e}")
+
+            attempts += 1
+            time.sleep(self._retry_delay(attempts, error, retry_after))
+
+    def _retry_delay(self, attempts: int, error: str, retry_after: float = None) -> float:
+        """
+        计算第 attempts 次重试前的退避时间，超过最大重试次数时抛出异常。
+
+        参数:
+        - attempts: int，重试序号，从1开始。
+        - error: str，本次失败的描述。
+        - retry_after: float，服务端要求的等待秒数，可以为None。
+
+        返回:
+        - float，等待的秒数。
+        """
+        if attempts > self.rate_limiter.max_retries:
+            raise Exception(f"{error}，已重试 {self.rate_limiter.max_retries} 次")
+        METRICS.inc("request_retries", model=self.model_name)
+        delay = self.rate_limiter.backoff_delay(attempts, retry_after)
+        LOG.warning(f"{error}，{delay:.1f}秒后重试（第 {attempts}/{self.rate_limiter.max_retries} 次）")
+        return delay
+
+    def _send(self, prompt, payload: dict, read_response, stream: bool):
+        """
+        选择副本发送一次请求。启用对冲时，请求在 hedge_delay 内没有返回则向另一个健康的副本再发一次，
+        返回先成功的结果；两者都失败时抛出先发生的异常。
+
+        返回:
+        - str，模型服务返回的文本。
+        """
+        replica = self.replicas.acquire()
+        delay = self._hedge_delay(stream)
+        if delay is None:
+            return self._attempt(replica, payload, read_response, stream)
+
+        primary = self.hedge_executor.submit(self._attempt, replica, payload, read_response, stream)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        hedge_replica = self.replicas.acquire(exclude=(replica,), hedge=True)
+        if hedge_replica is None:
+            return primary.result()
+
+        self.rate_limiter.acquire(estimate_tokens(prompt))
+        METRICS.inc("hedged_requests", model=self.model_name)
+        hedge = self.hedge_executor.submit(self._attempt, hedge_replica, payload, read_response, stream)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                if future is hedge:
+                    METRICS.inc("hedged_requests_won", model=self.model_name)
+                return future.result()
+        raise error
+
+    def _hedge_delay(self, stream: bool) -> Optional[float]:
+        """
+        返回本次请求触发对冲的等待时间。未启用对冲（hedge_percentile 为0或只有一个副本，此时没有对冲线程池）、
+        流式请求或延迟样本不足时返回None，只向一个副本发送请求。同步和异步请求使用相同的条件。
+        """
+        if self.hedge_executor is None or stream:
+            return None
+        return self.replicas.hedge_delay()
+
+    def _attempt(self, replica: Replica, payload: dict, read_response, stream: bool):
+        """
+        向一个副本发送请求并读取响应文本，结束后将耗时和结果计入副本的统计。
+        连接错误、超时和5xx计为副本故障，429和请求本身的错误不影响副本的健康状态。
+
+        返回:
+        - str，模型服务返回的文本。
+        """
+        url = replica.stream_url if stream else replica.url
+        started_at = time.perf_counter()
+        ok = None
         try:
-            # 准备请求的负载数据
-            payload = {
-                "prompt": prompt,
-                "history": []
-            }
             # 向模型服务发送POST请求
-            response = requests.post(self.model_url, json=payload, timeout=self.timeout)
+            response = self.session.post(url, json=payload, timeout=self.timeout, stream=stream)
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                retry_after = parse_retry_after(response.headers)
+                response.close()
+                ok = None if response.status_code == 429 else False
+                raise _ServerBusy(response.status_code, retry_after)
+            if response.status_code >= 500:
+                ok = False
             # 检查响应状态
             response.raise_for_status()
-            # 解析JSON响应
-            response_dict = response.json()
-            translation = response_dict["response"]  # 提取响应文本
-            return translation, True
-        except requests.exceptions.RequestException as e:
-            # 处理请求异常
-            raise Exception(f"请求异常：{e}")
-        except requests.exceptions.Timeout as e:
-            # 处理请求超时
-            raise Exception(f"请求超时：{e}")
-        except simplejson.errors.JSONDecodeError as e:
-            # 处理JSON解析错误
-            raise Exception("Error: response is not valid JSON format.")
-        except Exception as e:
-            # 处理其他未知异常
-            raise Exception(f"发生了未知错误：{e}")
-        return "", False  # 请求失败时的返回值
\ No newline at end of file
+            # 解析JSON响应，提取响应文本
+            translation = read_response(response)
+            ok = True
+            return translation
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError):
+            ok = False
+            raise
+        finally:
+            self.replicas.release(replica, time.perf_counter() - started_at, ok)
+
+    async def make_request_async(self, prompt):
+        """
+        make_request 的异步版本，使用 httpx.AsyncClient 发送请求。副本选择、限流、重试和对冲与 make_request 相同，
+        对冲时先返回的请求胜出后取消另一个请求。未安装 httpx 时在线程中执行 make_request。
+
+        参数:
+        - prompt: str，发送给模型的服务端的输入文本。
+
+        返回:
+        - translation: str，模型服务返回的文本响应。
+        - True: bool，表示请求成功。
+        """
+        if httpx is None:
+            return await super().make_request_async(prompt)
+        return await self._request_with_retries_async(prompt, self._read_json_async)
+
+    async def make_stream_request_async(self, prompt, on_partial):
+        """
+        make_stream_request 的异步版本，on_partial 在事件循环所在的线程中调用。未安装 httpx 时在线程中执行 make_stream_request，
+        on_partial 在该线程中调用。
+
+        参数:
+        - prompt: str，发送给模型的服务端的输入文本。
+        - on_partial: 回调函数，参数为目前为止收到的文本。
+
+        返回:
+        - translation: str，模型服务返回的完整文本。
+        - True: bool，表示请求成功。
+        """
+        if httpx is None:
+            return await super().make_stream_request_async(prompt, on_partial)
+        return await self._request_with_retries_async(prompt, lambda response: self._read_stream_async(response, on_partial), stream=True)
+
+    async def aclose(self):
+        """
+        关闭当前事件循环中的异步HTTP客户端及其连接池。
+        """
+        if self._async_client is not None and self._async_client_loop is asyncio.get_running_loop():
+            client, self._async_client, self._async_client_loop = self._async_client, None, None
+            await client.aclose()
+
+    def _get_async_client(self):
+        """
+        返回当前事件循环的异步HTTP客户端，事件循环改变时重新创建。每个副本最多保持 pool_size 个长连接。
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            connections = self.pool_size * len(self.replicas.replicas)
+            self._async_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+                transport=httpx.AsyncHTTPTransport(retries=self.pool_retries),
+            )
+            self._async_client_loop = loop
+        return self._async_client
+
+    @staticmethod
+    async def _read_json_async(response) -> str:
+        """
+        读取非流式响应的JSON，返回其中的文本。
+        """
+        await response.aread()
+        return response.json()["response"]
+
+    @staticmethod
+    async def _read_stream_async(response, on_partial) -> str:
+        """
+        逐行读取异步的流式响应并回调，返回完整的文本。
+        """
+        text = ""
+        async for line in response.aiter_lines():
+            event = GLMModel._parse_stream_line(line)
+            if event is _STREAM_DONE:
+                break
+            if event is not None:
+                text = GLMModel._apply_stream_event(text, event)
+                on_partial(text)
+        return text
+
+    async def _request_with_retries_async(self, prompt, read_response, stream: bool = False):
+        """
+        _request_with_retries 的异步版本，read_response 是从响应中读取文本的协程函数，退避等待时不阻塞事件循环。
+
+        参数:
+        - prompt: str，发送给模型的服务端的输入文本。
+        - read_response: 从成功的响应中读取文本的协程函数。
+        - stream: bool，是否向流式接口发送请求。
+
+        返回:
+        - translation: str，模型服务返回的文本响应。
+        - True: bool，表示请求成功。
+        """
+        payload = {
+            "prompt": prompt,
+            "history": []
+        }
+        attempts = 0
+        while True:
+            retry_after = None
+            issued_at = await self.rate_limiter.acquire_async(estimate_tokens(prompt))
+            try:
+                translation = await self._send_async(prompt, payload, read_response, stream)
+                self.rate_limiter.on_success()
+                return translation, True
+            except _ServerBusy as e:
+                retry_after = e.retry_after
+                if e.status_code == 429:
+                    self.rate_limiter.on_rate_limited(retry_after, issued_at)
+                error = f"服务端繁忙：HTTP {e.status_code}"
+            except httpx.TransportError as e:
+                # 请求超时、连接错误和流式响应中途断开，重试
+                error = f"请求超时或连接失败：{e!r}"
+            except httpx.HTTPError as e:
+                raise Exception(f"请求异常：{e}")
+            except json.JSONDecodeError:
+                raise Exception("Error: response is not valid JSON format.")
+            except Exception as e:
+                raise Exception(f"发生了未知错误：{e}")
+
+            attempts += 1
+            await asyncio.sleep(self._retry_delay(attempts, error, retry_after))
+
+    async def _send_async(self, prompt, payload: dict, read_response, stream: bool):
+        """
+        _send 的异步版本：请求在 hedge_delay 内没有返回时向另一个健康的副本再发一次，
+        返回先成功的结果并取消另一个请求；两者都失败时抛出先发生的异常。
+
+        返回:
+        - str，模型服务返回的文本。
+        """
+        replica = self.replicas.acquire()
+        delay = self._hedge_delay(stream)
+        if delay is None:
+            return await self._attempt_async(replica, payload, read_response, stream)
+
+        primary = asyncio.ensure_future(self._attempt_async(replica, payload, read_response, stream))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+            hedge_replica = self.replicas.acquire(exclude=(replica,), hedge=True)
+            if hedge_replica is None:
+                return await primary
+
+            await self.rate_limiter.acquire_async(estimate_tokens(prompt))
+            METRICS.inc("hedged_requests", model=self.model_name)
+            hedge = asyncio.ensure_future(self._attempt_async(hedge_replica, payload, read_response, stream))
+            tasks.append(hedge)
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    if task is hedge:
+                        METRICS.inc("hedged_requests_won", model=self.model_name)
+                    return task.result()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _attempt_async(self, replica: Replica, payload: dict, read_response, stream: bool):
+        """
+        _attempt 的异步版本：向一个副本发送请求并读取响应文本，结束后将耗时和结果计入副本的统计。
+
+        返回:
+        - str，模型服务返回的文本。
+        """
+        url = replica.stream_url if stream else replica.url
+        started_at = time.perf_counter()
+        ok = None
+        try:
+            async with self._get_async_client().stream("POST", url, json=payload) as response:
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    ok = None if response.status_code == 429 else False
+                    raise _ServerBusy(response.status_code, parse_retry_after(response.headers))
+                if response.status_code >= 500:
+                    ok = False
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                translation = await read_response(response)
+                ok = True
+                return translation
+        except httpx.TransportError:
+            ok = False
+            raise
+        finally:
+            self.replicas.release(replica, time.perf_counter() - started_at, ok)
+
+    def _probe(self, replica: Replica) -> bool:
+        """
+        探测摘除的副本：发送一个很短的请求，返回200时视为健康。
+        """
+        payload = {"prompt": PROBE_PROMPT, "history": []}
+        with self.session.post(replica.url, json=payload, timeout=min(self.timeout, PROBE_TIMEOUT)) as response:
+            return response.status_code == 200
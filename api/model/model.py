@@ -1,12 +1,41 @@
 
+import asyncio
+import json
+import re
+import time
+
 # 从book模块导入ContentType枚举类
-from book import ContentType
+from book import ContentType, parse_cell_translations
+from model.rate_limiter import estimate_tokens
+from utils import METRICS
+
+# 批量翻译时用于包裹每段文本的分段标记
+BATCH_SEGMENT_PATTERN = re.compile(r'<seg id="(\d+)">(.*?)</seg>', re.DOTALL)
+# 流式返回中尚未结束的最后一段
+PARTIAL_SEGMENT_PATTERN = re.compile(r'<seg id="(\d+)">((?:(?!</seg>).)*)$', re.DOTALL)
 
 class Model:
     """
     提供与翻译请求相关的模型方法。
     """
-    
+
+    # 模型名称，参与翻译缓存键的计算，子类应设置为能区分不同模型的值
+    model_name = "Model"
+    # 可选的翻译缓存（TranslationCache），为None时每次都直接请求模型
+    cache = None
+    # 单个请求中文本原文的最大字符数，超过时在句子边界切分后分别翻译；None表示不切分
+    max_chunk_chars = None
+    # 是否支持流式返回（make_stream_request），不支持时 request 忽略 on_partial 回调
+    supports_streaming = False
+
+    def set_cache(self, cache):
+        """
+        设置翻译缓存，所有经由 request 的请求都会先查询缓存。
+
+        :param cache: TranslationCache实例，传入None表示不使用缓存。
+        """
+        self.cache = cache
+
     def make_text_prompt(self, text: str, target_language: str) -> str:
         """
         生成文本翻译提示。
@@ -17,17 +46,77 @@ class Model:
         """
         return f"翻译为{target_language}：{text}"
 
-    def make_table_prompt(self, table: str, target_language: str) -> str:
+    def make_table_prompt(self, cells: dict, target_language: str) -> str:
+        """
+        生成表格翻译提示。需要翻译的单元格以JSON对象发送，键为单元格在表格中的位置，要求模型返回键相同、值为译文的JSON对象，
+        返回结果由 split_table_translation 逐个单元格校验。
+
+        :param cells: 需要翻译的单元格 {单元格键: 原文}，见 TableContent.translatable_cell_keys；
+            同一个请求包含多个表格的单元格时，键以表格序号开头，例如 "t1r2c3"。
+        :param target_language: 目标语言。
+        :return: 返回一个字符串，包含翻译提示信息。
+        """
+        table = json.dumps(cells, ensure_ascii=False, indent=0)
+        return (f"将以下JSON对象中每个表格单元格的文本翻译为{target_language}。键为单元格在表格中的位置，例如 r2c3 表示第2行第3列；"
+                f"包含多个表格时键以表格序号开头，例如 t1r2c3 表示第1个表格的第2行第3列。"
+                f"请返回一个JSON对象，使用与原对象完全相同的键，值为对应单元格的译文；不要增加、删除、合并或拆分任何键，也不要添加其他内容。"
+                f"\n原表格数据：\n{table}")
+
+    def split_table_translation(self, translation: str, cells: dict) -> dict:
+        """
+        按表格翻译协议解析翻译结果，只返回通过校验的单元格，缺失或格式不对的单元格可以单独重新请求。
+
+        :param translation: 模型返回的翻译结果。
+        :param cells: 请求的单元格 {单元格键: 原文}。
+        :return: {单元格键: 译文}。
+        """
+        return parse_cell_translations(translation, cells)
+
+    @METRICS.timed("prompt")
+    def make_batch_text_prompt(self, texts: list, target_language: str) -> str:
         """
-        生成表格翻译提示。
+        生成批量文本翻译提示，每段文本用带编号的分段标记包裹，要求模型按相同标记逐段返回译文。
 
-        :param table: 需要翻译的表格字符串。
+        :param texts: 需要翻译的文本字符串列表。
         :param target_language: 目标语言。
-        :return: 返回一个字符串，包含翻译提示信息，要求保持表格格式。
+        :return: 返回一个字符串，包含批量翻译提示信息。
         """
-        return f"将以下表格数据翻译成{target_language}，并确保翻译后的数据是cvs结构。请确保保持原始的数据结构，包括列名、行数据以及它们之间的对齐方式。例如：以逗号分隔的值列表（CSV），且不包含多余的空格或间隔字符。\n原表格数据：\n{table}"
-        # return f"翻译为{target_language}，保持格式一致（间距,空格，分隔符），以表格形式返回：\n{table}"
+        segments = "\n".join(f'<seg id="{idx}">{text}</seg>' for idx, text in enumerate(texts, 1))
+        return (f"将以下{len(texts)}段文本逐段翻译为{target_language}。每段文本包含在<seg id=\"编号\">和</seg>之间，"
+                f"请对每段译文使用相同的标记和编号包裹后按顺序返回，不要合并、拆分或遗漏任何一段，也不要添加其他内容。\n{segments}")
 
+    def split_batch_translation(self, translation: str, count: int):
+        """
+        按分段标记将批量翻译结果拆分为各段译文。
+
+        :param translation: 模型返回的批量翻译结果。
+        :param count: 请求中的文本段数。
+        :return: 按编号排列的译文列表；编号缺失、重复或多余时返回None。
+        """
+        segments = {}
+        for idx, text in BATCH_SEGMENT_PATTERN.findall(translation):
+            idx = int(idx)
+            if idx in segments:
+                return None
+            segments[idx] = text.strip()
+        if sorted(segments) != list(range(1, count + 1)):
+            return None
+        return [segments[idx] for idx in range(1, count + 1)]
+
+    def split_partial_batch_translation(self, partial: str) -> dict:
+        """
+        从流式返回的部分批量翻译结果中提取各段已收到的译文，包括尚未结束的最后一段。
+
+        :param partial: 目前为止收到的批量翻译结果。
+        :return: {编号: 已收到的译文}。
+        """
+        segments = {int(idx): text.strip() for idx, text in BATCH_SEGMENT_PATTERN.findall(partial)}
+        match = PARTIAL_SEGMENT_PATTERN.search(partial)
+        if match is not None:
+            segments[int(match.group(1))] = match.group(2).strip()
+        return segments
+
+    @METRICS.timed("prompt")
     def translate_prompt(self, content, target_language: str) -> str:
         """
         根据内容类型生成对应的翻译提示。
@@ -41,7 +130,7 @@ class Model:
             return self.make_text_prompt(content.original, target_language)
         elif content.content_type == ContentType.TABLE:
             # 如果内容类型为表格，则调用make_table_prompt生成表格翻译提示
-            return self.make_table_prompt(content.get_original_as_str(), target_language)
+            return self.make_table_prompt(content.translatable_cell_keys(), target_language)
 
     def make_request(self, prompt):
         """
@@ -50,4 +139,150 @@ class Model:
         :param prompt: 包含翻译提示信息的字符串。
         :return: 需要子类实现，抛出NotImplementedError表示方法必须在子类中被重写。
         """
-        raise NotImplementedError("子类必须实现 make_request 方法")
\ No newline at end of file
+        raise NotImplementedError("子类必须实现 make_request 方法")
+
+    def make_stream_request(self, prompt, on_partial):
+        """
+        以流式方式请求翻译，每收到一部分译文就调用 on_partial。最终返回的译文与 make_request 相同。
+
+        :param prompt: 包含翻译提示信息的字符串。
+        :param on_partial: 回调函数，参数为目前为止收到的译文。
+        :return: 需要支持流式返回的子类实现，返回值与 make_request 相同。
+        """
+        raise NotImplementedError("支持流式返回的子类必须实现 make_stream_request 方法")
+
+    async def make_request_async(self, prompt):
+        """
+        make_request 的异步版本。默认在线程池中调用 make_request，有异步客户端的子类应重写该方法，
+        使大量并发请求在同一个事件循环中等待，而不是各占一个线程。
+
+        :param prompt: 包含翻译提示信息的字符串。
+        :return: 一个元组，包含翻译结果和表示请求是否成功的布尔值。
+        """
+        return await asyncio.to_thread(self.make_request, prompt)
+
+    async def make_stream_request_async(self, prompt, on_partial):
+        """
+        make_stream_request 的异步版本。默认在线程池中调用 make_stream_request，on_partial 在该线程中调用。
+
+        :param prompt: 包含翻译提示信息的字符串。
+        :param on_partial: 回调函数，参数为目前为止收到的译文。
+        :return: 一个元组，包含翻译结果和表示请求是否成功的布尔值。
+        """
+        return await asyncio.to_thread(self.make_stream_request, prompt, on_partial)
+
+    async def aclose(self):
+        """
+        关闭在当前事件循环中创建的异步客户端。事件循环关闭前调用，默认没有需要关闭的资源。
+        """
+
+    def request(self, prompt, validator=None, on_partial=None):
+        """
+        先查询翻译缓存，未命中时调用 make_request 并将成功的结果写入缓存。
+        同时记录请求数、耗时、失败数以及输入输出的字节数和估算令牌数。
+
+        :param prompt: 包含翻译提示信息的字符串。
+        :param validator: 可选，校验翻译结果是否可用的函数；校验不通过的结果不会写入缓存，也不会从缓存返回。
+        :param on_partial: 可选，接收部分译文的回调函数。模型支持流式返回时改为调用 make_stream_request，
+            每收到一部分译文调用一次；命中缓存时以完整译文调用一次。
+        :return: 一个元组，包含翻译结果和表示请求是否成功的布尔值。
+        """
+        translation = self._cached(prompt, validator, on_partial)
+        if translation is not None:
+            return translation, True
+
+        self._count_request(prompt)
+        try:
+            with METRICS.timer("request"):
+                if on_partial is not None and self.supports_streaming:
+                    translation, status = self.make_stream_request(prompt, self._first_output_timer(on_partial))
+                else:
+                    translation, status = self.make_request(prompt)
+        except Exception:
+            METRICS.inc("request_failures", model=self.model_name)
+            raise
+        self._record_result(prompt, translation, status, validator)
+        return translation, status
+
+    async def request_async(self, prompt, validator=None, on_partial=None):
+        """
+        request 的异步版本，缓存、校验和指标的处理与 request 相同，未命中缓存时调用 make_request_async
+        （流式返回时调用 make_stream_request_async）。
+
+        :param prompt: 包含翻译提示信息的字符串。
+        :param validator: 可选，校验翻译结果是否可用的函数。
+        :param on_partial: 可选，接收部分译文的回调函数。
+        :return: 一个元组，包含翻译结果和表示请求是否成功的布尔值。
+        """
+        translation = self._cached(prompt, validator, on_partial)
+        if translation is not None:
+            return translation, True
+
+        self._count_request(prompt)
+        # 同一个线程中并发等待的请求互不嵌套，直接记录耗时，不使用按线程去重的 METRICS.timer
+        started_at = time.perf_counter()
+        try:
+            if on_partial is not None and self.supports_streaming:
+                translation, status = await self.make_stream_request_async(prompt, self._first_output_timer(on_partial))
+            else:
+                translation, status = await self.make_request_async(prompt)
+        except Exception:
+            METRICS.inc("request_failures", model=self.model_name)
+            raise
+        finally:
+            METRICS.observe("request", time.perf_counter() - started_at)
+        self._record_result(prompt, translation, status, validator)
+        return translation, status
+
+    def _cached(self, prompt, validator=None, on_partial=None):
+        """
+        查询翻译缓存，命中且通过校验时记录命中数，并以完整译文调用一次 on_partial。
+
+        :return: 缓存的译文，未命中时返回None。
+        """
+        if self.cache is None:
+            return None
+        translation = self.cache.get(self.model_name, prompt)
+        if translation is None or (validator is not None and not validator(translation)):
+            return None
+        METRICS.inc("cache_hits", model=self.model_name)
+        if on_partial is not None:
+            on_partial(translation)
+        return translation
+
+    def _count_request(self, prompt):
+        """
+        记录发往模型的请求数以及输入的字节数和估算令牌数。
+        """
+        METRICS.inc("requests", model=self.model_name)
+        METRICS.inc("request_bytes_in", len(prompt.encode("utf-8")), model=self.model_name)
+        METRICS.inc("request_tokens_in", estimate_tokens(prompt), model=self.model_name)
+
+    def _record_result(self, prompt, translation, status, validator=None):
+        """
+        记录请求结果的输出字节数和估算令牌数（失败时记录失败数），并将成功且通过校验的结果写入缓存。
+        """
+        if status:
+            METRICS.inc("request_bytes_out", len(translation.encode("utf-8")), model=self.model_name)
+            METRICS.inc("request_tokens_out", estimate_tokens(translation), model=self.model_name)
+        else:
+            METRICS.inc("request_failures", model=self.model_name)
+        if status and self.cache is not None and (validator is None or validator(translation)):
+            self.cache.put(self.model_name, prompt, translation)
+
+    @staticmethod
+    def _first_output_timer(on_partial):
+        """
+        包装部分译文回调，记录从发出请求到收到第一部分译文的耗时（first_output 阶段）。
+        """
+        started_at = time.perf_counter()
+        first = True
+
+        def callback(partial: str):
+            nonlocal first
+            if first:
+                first = False
+                METRICS.observe("first_output", time.perf_counter() - started_at)
+            on_partial(partial)
+
+        return callback
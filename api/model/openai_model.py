@@ -1,13 +1,13 @@
 
-import requests
-import simplejson
+import asyncio
 import time
 import os
 import openai
 
 from model import Model
-from utils import LOG
-from openai import OpenAI
+from model.rate_limiter import RateLimiter, estimate_tokens, parse_retry_after
+from utils import LOG, METRICS
+from openai import AsyncOpenAI, OpenAI
 
 class OpenAIModel(Model):
     """
@@ -16,23 +16,40 @@ class OpenAIModel(Model):
     参数:
     - model: 字符串，指定使用的OpenAI模型名称。
     - api_key: 字符串，OpenAI的API密钥。
+    - max_tokens: 整数，通用补全模型单次生成的最大令牌数。
+    - max_chunk_chars: 整数，单个请求中文本原文的最大字符数，超过时切分后分别翻译。
+    - rate_limiter: RateLimiter，所有并发请求共享的限流器，默认为不限速、只负责退避重试的限流器。
     """
 
-    def __init__(self, model: str, api_key: str):
+    # 支持通过SSE流式返回生成的文本，见 make_stream_request
+    supports_streaming = True
+
+    def __init__(self, model: str, api_key: str, max_tokens: int = 1024, max_chunk_chars: int = None, rate_limiter: RateLimiter = None):
         """
         初始化OpenAIModel实例。
 
         参数:
         - model: 字符串，指定使用的OpenAI模型名称。
         - api_key: 字符串，OpenAI的API密钥。
+        - max_tokens: 整数，通用补全模型单次生成的最大令牌数。
+        - max_chunk_chars: 整数，单个请求中文本原文的最大字符数，超过时切分后分别翻译。
+        - rate_limiter: RateLimiter，所有并发请求共享的限流器。
         """
         self.model = model
-        # 使用环境变量中的API密钥初始化OpenAI客户端
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.model_name = f"OpenAIModel:{model}"
+        self.max_tokens = max_tokens
+        self.max_chunk_chars = max_chunk_chars
+        self.rate_limiter = rate_limiter or RateLimiter()
+        # 使用环境变量中的API密钥初始化OpenAI客户端，重试由 rate_limiter 统一控制
+        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        # 异步客户端的连接池绑定到创建它的事件循环，在首次发送异步请求时按事件循环创建
+        self._async_client = None
+        self._async_client_loop = None
 
     def make_request(self, prompt):
         """
-        向OpenAI发送请求，获取模型生成的响应。
+        向OpenAI发送请求，获取模型生成的响应。发送前经过共享限流器，
+        遇到限流、连接错误或服务端错误时按指数退避重试。
 
         参数:
         - prompt: 字符串，给模型的输入提示。
@@ -40,47 +57,283 @@ class OpenAIModel(Model):
         返回:
         - 一个元组，包含模型生成的文本和一个布尔值，表示请求是否成功。
         """
-        attempts = 0  # 初始化重试次数
-        while attempts < 3:  # 最多重试3次
-            try:
-                # 根据模型类型发送不同的请求
-                if self.model == "gpt-3.5-turbo":
-                    # 对话模型的请求
-                    response = self.client.chat.completions.create(
-                        model=self.model,
-                        messages=[  # 构造对话消息
-                            {"role": "user", "content": prompt}
-                        ]
-                    )
-                    translation = response.choices[0].message.content.strip()  # 提取响应内容
-                else:
-                    # 通用模型的请求
-                    response = self.client.completions.create(
-                        model=self.model,
-                        prompt=prompt,
-                        max_tokens=150,  # 最大生成令牌数
-                        temperature=0  # 温度设置为0，得到最确定的结果
-                    )
-                    translation = response.choices[0].text.strip()  # 提取响应内容
+        return self._request_with_retries(prompt, lambda: self._complete(prompt))
+
+    def make_stream_request(self, prompt, on_partial):
+        """
+        以流式方式向OpenAI发送请求，每收到一段生成的文本就以目前为止的全部文本调用 on_partial。
+        限流和重试与 make_request 相同，最终返回的文本与非流式请求的处理方式一致。
+
+        参数:
+        - prompt: 字符串，给模型的输入提示。
+        - on_partial: 回调函数，参数为目前为止收到的文本。
+
+        返回:
+        - 一个元组，包含模型生成的文本和一个布尔值，表示请求是否成功。
+        """
+        return self._request_with_retries(prompt, lambda: self._complete_stream(prompt, on_partial))
+
+    async def make_request_async(self, prompt):
+        """
+        make_request 的异步版本，使用 AsyncOpenAI 发送请求，限流和重试与 make_request 相同。
+
+        参数:
+        - prompt: 字符串，给模型的输入提示。
+
+        返回:
+        - 一个元组，包含模型生成的文本和一个布尔值，表示请求是否成功。
+        """
+        return await self._request_with_retries_async(prompt, lambda: self._complete_async(prompt))
 
+    async def make_stream_request_async(self, prompt, on_partial):
+        """
+        make_stream_request 的异步版本，on_partial 在事件循环所在的线程中调用。
+
+        参数:
+        - prompt: 字符串，给模型的输入提示。
+        - on_partial: 回调函数，参数为目前为止收到的文本。
+
+        返回:
+        - 一个元组，包含模型生成的文本和一个布尔值，表示请求是否成功。
+        """
+        return await self._request_with_retries_async(prompt, lambda: self._complete_stream_async(prompt, on_partial))
+
+    async def aclose(self):
+        """
+        关闭当前事件循环中的异步客户端及其连接池。
+        """
+        if self._async_client is not None and self._async_client_loop is asyncio.get_running_loop():
+            client, self._async_client, self._async_client_loop = self._async_client, None, None
+            await client.close()
+
+    def _get_async_client(self) -> AsyncOpenAI:
+        """
+        返回当前事件循环的异步客户端，事件循环改变时重新创建。
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+            self._async_client_loop = loop
+        return self._async_client
+
+    def _complete(self, prompt) -> str:
+        """
+        发送一次非流式请求，返回生成的文本。
+        """
+        # 根据模型类型发送不同的请求
+        if self.model == "gpt-3.5-turbo":
+            # 对话模型的请求
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[  # 构造对话消息
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            return response.choices[0].message.content.strip()  # 提取响应内容
+
+        # 通用模型的请求
+        response = self.client.completions.create(
+            model=self.model,
+            prompt=prompt,
+            max_tokens=self.max_tokens,  # 最大生成令牌数
+            temperature=0  # 温度设置为0，得到最确定的结果
+        )
+        self._check_finish_reason(response.choices[0].finish_reason)
+        return response.choices[0].text.strip()  # 提取响应内容
+
+    def _complete_stream(self, prompt, on_partial) -> str:
+        """
+        发送一次流式请求，逐段拼接生成的文本并回调，返回完整的文本。
+        """
+        text = ""
+        finish_reason = None
+        if self.model == "gpt-3.5-turbo":
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True,
+            )
+        else:
+            stream = self.client.completions.create(
+                model=self.model,
+                prompt=prompt,
+                max_tokens=self.max_tokens,
+                temperature=0,
+                stream=True,
+            )
+        with stream:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                delta = choice.delta.content if self.model == "gpt-3.5-turbo" else choice.text
+                finish_reason = choice.finish_reason or finish_reason
+                if delta:
+                    text += delta
+                    on_partial(text)
+        if self.model != "gpt-3.5-turbo":
+            self._check_finish_reason(finish_reason)
+        return text.strip()
+
+    async def _complete_async(self, prompt) -> str:
+        """
+        发送一次异步的非流式请求，返回生成的文本。
+        """
+        client = self._get_async_client()
+        if self.model == "gpt-3.5-turbo":
+            response = await client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}]
+            )
+            return response.choices[0].message.content.strip()
+
+        response = await client.completions.create(
+            model=self.model,
+            prompt=prompt,
+            max_tokens=self.max_tokens,
+            temperature=0
+        )
+        self._check_finish_reason(response.choices[0].finish_reason)
+        return response.choices[0].text.strip()
+
+    async def _complete_stream_async(self, prompt, on_partial) -> str:
+        """
+        发送一次异步的流式请求，逐段拼接生成的文本并回调，返回完整的文本。
+        """
+        client = self._get_async_client()
+        text = ""
+        finish_reason = None
+        if self.model == "gpt-3.5-turbo":
+            stream = await client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True,
+            )
+        else:
+            stream = await client.completions.create(
+                model=self.model,
+                prompt=prompt,
+                max_tokens=self.max_tokens,
+                temperature=0,
+                stream=True,
+            )
+        async with stream:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                delta = choice.delta.content if self.model == "gpt-3.5-turbo" else choice.text
+                finish_reason = choice.finish_reason or finish_reason
+                if delta:
+                    text += delta
+                    on_partial(text)
+        if self.model != "gpt-3.5-turbo":
+            self._check_finish_reason(finish_reason)
+        return text.strip()
+
+    def _check_finish_reason(self, finish_reason):
+        if finish_reason == "length":
+            LOG.warning(f"生成内容达到 max_tokens={self.max_tokens} 上限被截断，请调小 max_chunk_chars 或调大 max_tokens")
+
+    def _request_with_retries(self, prompt, send):
+        """
+        经过共享限流器调用 send 发送请求，遇到限流、连接错误或服务端错误时按指数退避重试。
+
+        参数:
+        - prompt: 字符串，给模型的输入提示，用于估算令牌数。
+        - send: 发送一次请求并返回生成文本的函数。
+
+        返回:
+        - 一个元组，包含模型生成的文本和一个布尔值，表示请求是否成功。
+        """
+        attempts = 0  # 已重试次数
+        while True:
+            issued_at = self.rate_limiter.acquire(estimate_tokens(prompt) + self.max_tokens)
+            try:
+                translation = send()
+                self.rate_limiter.on_success()
                 return translation, True  # 成功返回响应和标志
-            except openai.RateLimitError as e:  # 处理速率限制错误
-                attempts += 1
-                if attempts < 3:
-                    LOG.warning("Rate limit reached. Waiting for 60 seconds before retrying.")
-                    time.sleep(60)  # 等待60秒后重试
-                else:
-                    raise Exception("Rate limit reached. Maximum attempts exceeded.")  # 超过最大重试次数，抛出异常
-            except openai.APIConnectionError as e:  # 处理API连接错误
-                print("The server could not be reached")
-                print(e.__cause__)  # 打印底层异常，可能是httpx库抛出的
-            except requests.exceptions.Timeout as e:  # 处理请求超时错误
-                # 这里省略了对该错误的处理代码
-                pass
-            except openai.APIStatusError as e:  # 处理其他API状态错误
-                print("Another non-200-range status code was received")
-                print(e.status_code)
-                print(e.response)
-            except Exception as e:  # 处理其他未知错误
-                raise Exception(f"发生了未知错误：{e}")
-        return "", False  # 如果所有尝试都失败，返回空字符串和False
\ No newline at end of file
+            except Exception as e:
+                retryable, retry_after = self._on_error(e, attempts, issued_at)
+                if not retryable:
+                    return "", False
+
+            attempts += 1
+            delay = self._retry_delay(attempts, retry_after)
+            if delay is None:
+                break
+            time.sleep(delay)
+        return "", False  # 如果所有尝试都失败，返回空字符串和False
+
+    async def _request_with_retries_async(self, prompt, send):
+        """
+        _request_with_retries 的异步版本，send 返回发送一次请求的协程，退避等待时不阻塞事件循环。
+
+        参数:
+        - prompt: 字符串，给模型的输入提示，用于估算令牌数。
+        - send: 返回协程的函数，协程发送一次请求并返回生成的文本。
+
+        返回:
+        - 一个元组，包含模型生成的文本和一个布尔值，表示请求是否成功。
+        """
+        attempts = 0
+        while True:
+            issued_at = await self.rate_limiter.acquire_async(estimate_tokens(prompt) + self.max_tokens)
+            try:
+                translation = await send()
+                self.rate_limiter.on_success()
+                return translation, True
+            except Exception as e:
+                retryable, retry_after = self._on_error(e, attempts, issued_at)
+                if not retryable:
+                    return "", False
+
+            attempts += 1
+            delay = self._retry_delay(attempts, retry_after)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+        return "", False
+
+    def _on_error(self, e: Exception, attempts: int, issued_at: float = None):
+        """
+        处理一次失败的请求：限流时通知限流器，请求本身有误时不再重试，未知错误直接抛出。
+
+        参数:
+        - e: 请求抛出的异常。
+        - attempts: 已重试次数。
+        - issued_at: 请求的发送时刻，见 RateLimiter.acquire。
+
+        返回:
+        - 一个元组，包含是否可以重试和服务端要求的等待秒数（可以为None）。
+        """
+        retry_after = None
+        if isinstance(e, openai.RateLimitError):  # 处理速率限制错误
+            retry_after = parse_retry_after(e.response.headers)
+            self.rate_limiter.on_rate_limited(retry_after, issued_at)
+            if attempts >= self.rate_limiter.max_retries:
+                raise Exception("Rate limit reached. Maximum attempts exceeded.")  # 超过最大重试次数，抛出异常
+            LOG.warning(f"Rate limit reached (retry-after: {retry_after}).")
+        elif isinstance(e, openai.APIConnectionError):  # 处理API连接错误（包括超时）
+            LOG.warning(f"The server could not be reached: {e.__cause__ or e}")
+        elif isinstance(e, openai.APIStatusError):  # 处理其他API状态错误
+            if e.status_code < 500 and e.status_code not in (408, 409):
+                # 请求本身有误，重试不会成功
+                LOG.error(f"Non-retryable status code {e.status_code} was received: {e.message}")
+                return False, None
+            retry_after = parse_retry_after(e.response.headers)
+            LOG.warning(f"Status code {e.status_code} was received, retrying.")
+        else:  # 处理其他未知错误
+            raise Exception(f"发生了未知错误：{e}")
+        return True, retry_after
+
+    def _retry_delay(self, attempts: int, retry_after: float = None):
+        """
+        计算第 attempts 次重试前的退避时间，超过最大重试次数时返回None。
+        """
+        if attempts > self.rate_limiter.max_retries:
+            return None
+        METRICS.inc("request_retries", model=self.model_name)
+        delay = self.rate_limiter.backoff_delay(attempts, retry_after)
+        LOG.warning(f"Retrying in {delay:.1f}s (attempt {attempts}/{self.rate_limiter.max_retries}).")
+        return delay
@@ -0,0 +1,200 @@
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from collections import deque
+
+from utils import LOG, METRICS
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的令牌数：ASCII字符约4个一个令牌，其他字符（如中文）约每个一个令牌。
+
+    :param text: 文本字符串。
+    :return: 估算的令牌数，至少为1。
+    """
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return max(1, ascii_chars // 4 + (len(text) - ascii_chars))
+
+
+def parse_retry_after(headers) -> float:
+    """
+    从HTTP响应头中解析服务端要求的等待时间，支持 retry-after-ms 以及秒数或HTTP日期形式的 retry-after。
+
+    :param headers: 响应头（类字典对象），可以为None。
+    :return: 等待的秒数；响应头中没有或无法解析时返回None。
+    """
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class TokenBucket:
+    """
+    令牌桶，按固定速率补充令牌。允许透支：请求量超过当前余量时先扣减，再等待欠额按速率补足，
+    因此大请求不会被小请求饿死，同时长期速率不超过设定值。
+
+    参数:
+    - rate_per_minute: float，每分钟补充的令牌数，桶容量同为该值。
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_minute = rate_per_minute
+        self.tokens = rate_per_minute
+        self.updated_at = time.monotonic()
+
+    def reserve(self, amount: float, scale: float = 1.0) -> float:
+        """
+        扣减令牌并返回需要等待的秒数。调用方需持有锁。
+
+        :param amount: 需要的令牌数。
+        :param scale: 速率缩放系数，触发限流后小于1。
+        :return: 需要等待的秒数，0表示无需等待。
+        """
+        rate = self.rate_per_minute * scale / 60
+        now = time.monotonic()
+        self.tokens = min(self.rate_per_minute, self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+        self.tokens -= amount
+        return -self.tokens / rate if self.tokens < 0 else 0.0
+
+
+class RateLimiter:
+    """
+    在所有并发请求之间共享的限流器：按每分钟请求数和令牌数限流，收到429时全局暂停并自动降速，
+    请求失败时按带随机抖动的指数退避计算重试间隔。
+
+    参数:
+    - requests_per_minute: float，每分钟请求数上限，None表示不限制（收到429后会按近一分钟的实际速率自动设定）。
+    - tokens_per_minute: float，每分钟令牌数上限，None表示不限制。
+    - max_retries: int，单个请求的最大重试次数。
+    - base_delay: float，指数退避的初始等待秒数。
+    - max_delay: float，单次退避的最大等待秒数。
+    """
+
+    # 收到429后速率缩放系数的乘数，以及每次成功后的恢复量和下限
+    DECREASE_FACTOR = 0.5
+    RECOVERY_STEP = 0.05
+    MIN_SCALE = 0.1
+    # 未设定请求速率时，收到429后估计出的请求速率下限（每分钟）
+    MIN_LEARNED_RPM = 60
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None,
+                 max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.scale = 1.0  # 当前速率占设定速率的比例
+        self.paused_until = 0.0  # 收到429后所有请求暂停到该时刻（time.monotonic）
+        self.reduced_at = float("-inf")  # 最近一次因429降速的时刻（time.monotonic）
+        self.rate_limited_count = 0  # 收到429的次数
+        self._recent_requests = deque()  # 近一分钟内的请求时刻，用于未设定速率时估算服务端容量
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 1) -> float:
+        """
+        在发送请求前调用，必要时阻塞直到满足限流条件。
+
+        :param tokens: 本次请求预计消耗的令牌数。
+        :return: 请求的发送时刻（time.monotonic），收到429时传给 on_rate_limited。
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return time.monotonic()
+
+    async def acquire_async(self, tokens: int = 1) -> float:
+        """
+        acquire 的异步版本，需要等待时只挂起当前协程，不阻塞事件循环。
+
+        :param tokens: 本次请求预计消耗的令牌数。
+        :return: 请求的发送时刻（time.monotonic）。
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return time.monotonic()
+
+    def _reserve(self, tokens: int) -> float:
+        """
+        扣减请求数和令牌数的额度，返回发送请求前需要等待的秒数。
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+            if self.request_bucket is not None:
+                wait = max(wait, self.request_bucket.reserve(1, self.scale))
+            if self.token_bucket is not None:
+                wait = max(wait, self.token_bucket.reserve(tokens, self.scale))
+            self._recent_requests.append(now + wait)
+            while self._recent_requests and self._recent_requests[0] < now - 60:
+                self._recent_requests.popleft()
+        return wait
+
+    def on_success(self):
+        """
+        请求成功后调用，逐步将速率恢复到设定值。
+        """
+        with self._lock:
+            if self.scale < 1.0:
+                self.scale = min(1.0, self.scale + self.RECOVERY_STEP)
+
+    def on_rate_limited(self, retry_after: float = None, issued_at: float = None):
+        """
+        收到429时调用：所有请求暂停到服务端要求的时刻，并降低后续的请求速率。
+        同一次过载往往使多个并发请求同时收到429，降速后只对之后发出的请求再次降速：
+        在最近一次降速之前发出的请求收到的429只触发暂停，不再降低速率。
+
+        :param retry_after: 服务端通过 Retry-After 要求的等待秒数，可以为None。
+        :param issued_at: 收到429的请求的发送时刻，即 acquire 的返回值；为None时总是降速。
+        """
+        with self._lock:
+            self.rate_limited_count += 1
+            METRICS.inc("rate_limited")
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            if issued_at is not None and issued_at < self.reduced_at:
+                return
+            self.reduced_at = time.monotonic()
+            if self.request_bucket is None:
+                # 未设定请求速率时，以近一分钟的实际请求数作为服务端容量的估计
+                observed = max(self.MIN_LEARNED_RPM, len(self._recent_requests))
+                self.request_bucket = TokenBucket(observed)
+                self.request_bucket.tokens = 0
+                LOG.warning(f"收到429，将请求速率上限设为每分钟 {observed} 次")
+            else:
+                self.scale = max(self.MIN_SCALE, self.scale * self.DECREASE_FACTOR)
+
+    def backoff_delay(self, attempt: int, retry_after: float = None) -> float:
+        """
+        计算第 attempt 次重试前的等待时间：带完全随机抖动的指数退避，且不短于服务端要求的等待时间。
+
+        :param attempt: 重试序号，从1开始。
+        :param retry_after: 服务端要求的等待秒数，可以为None。
+        :return: 等待的秒数。
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
@@ -0,0 +1,211 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+from utils import LOG, METRICS
+
+
+class Replica:
+    """
+    一个模型服务副本的状态和延迟统计。
+
+    参数:
+    - url: str，副本的请求URL。
+    - stream_url: str，可选，副本的流式接口URL。
+    - latency_window: int，保留的最近成功请求的延迟样本数。
+    """
+
+    def __init__(self, url: str, stream_url: Optional[str] = None, latency_window: int = 200):
+        self.url = url
+        self.stream_url = stream_url
+        self.outstanding = 0  # 进行中的请求数
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.latencies = deque(maxlen=latency_window)  # 最近成功请求的延迟（秒）
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+        self.hedges = 0  # 作为对冲请求发出的次数
+
+    def latency_percentile(self, q: float) -> Optional[float]:
+        """
+        返回最近成功请求延迟的分位数（秒），没有样本时返回None。
+
+        :param q: 分位数，0到1之间。
+        """
+        return _percentile(self.latencies, q)
+
+
+class ReplicaPool:
+    """
+    多个模型服务副本的负载均衡器，所有翻译线程共享。
+
+    - 按最少进行中请求数选择副本，相同时选择请求总数较少的副本。
+    - 副本连续失败（连接错误、超时、5xx）达到 max_failures 次时摘除；后台线程每隔 probe_interval 秒
+      对摘除的副本发送探测请求，成功后重新加入。所有副本都被摘除时仍选择其中最早摘除的副本，不让翻译停止。
+    - 对冲：请求的耗时超过所有副本最近成功请求延迟的 hedge_percentile 分位数时，由调用方向另一个延迟最低的健康副本再发一次请求，
+      取先返回的结果。样本数不足 hedge_min_samples 时不对冲。
+
+    参数:
+    - urls: List[str]，各副本的请求URL。
+    - stream_urls: List[str]，可选，与 urls 一一对应的流式接口URL。
+    - max_failures: int，连续失败多少次后摘除副本。
+    - probe_interval: float，探测摘除副本的间隔（秒）。
+    - hedge_percentile: float，触发对冲的延迟分位数（0到1之间），0表示不对冲。
+    - hedge_min_samples: int，启用对冲前至少需要的延迟样本数。
+    - latency_window: int，每个副本保留的最近延迟样本数。
+    - probe: 探测函数，参数为副本，返回副本是否健康。为None时摘除的副本在 probe_interval 秒后直接重新加入。
+    """
+
+    def __init__(self, urls: List[str], stream_urls: Optional[List[str]] = None, max_failures: int = 3, probe_interval: float = 5.0,
+                 hedge_percentile: float = 0.0, hedge_min_samples: int = 20, latency_window: int = 200,
+                 probe: Callable[[Replica], bool] = None):
+        if not urls:
+            raise ValueError("At least one model URL is required.")
+        if stream_urls is not None and len(stream_urls) != len(urls):
+            raise ValueError(f"Got {len(stream_urls)} stream URLs for {len(urls)} model URLs.")
+        if not 0 <= hedge_percentile < 1:
+            raise ValueError(f"hedge_percentile must be in [0, 1), got {hedge_percentile}")
+        self.replicas = [Replica(url, stream_urls[idx] if stream_urls else None, latency_window) for idx, url in enumerate(urls)]
+        self.max_failures = max(1, max_failures)
+        self.probe_interval = probe_interval
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.probe = probe
+        self._lock = threading.Lock()
+        self._ejected_at = {}  # {副本: 摘除时间}
+        self._stop_event = threading.Event()
+        self._prober = None
+
+    def acquire(self, exclude=(), hedge: bool = False) -> Optional[Replica]:
+        """
+        选择一个副本并将其进行中的请求数加一，请求结束后需要调用 release。
+
+        :param exclude: 不选择的副本，例如对冲时已在请求的副本。
+        :param hedge: 是否为对冲请求选择副本。对冲请求只发往健康的副本，优先选择最近延迟中位数最低的副本。
+        :return: 选中的副本；没有可选的副本时返回None。
+        """
+        with self._lock:
+            candidates = [replica for replica in self.replicas if replica not in exclude]
+            healthy = [replica for replica in candidates if replica.healthy]
+            if healthy and hedge:
+                replica = min(healthy, key=lambda r: (r.latency_percentile(0.5) or 0.0, r.outstanding))
+            elif healthy:
+                replica = min(healthy, key=lambda r: (r.outstanding, r.requests))
+            elif candidates and not hedge:
+                replica = min(candidates, key=lambda r: self._ejected_at.get(r, 0))
+            else:
+                return None
+            replica.outstanding += 1
+            replica.requests += 1
+            if hedge:
+                replica.hedges += 1
+            return replica
+
+    def release(self, replica: Replica, latency: float = None, ok: Optional[bool] = True):
+        """
+        结束一个请求，更新副本的延迟统计和健康状态。
+
+        :param replica: acquire 返回的副本。
+        :param latency: 请求耗时（秒），只记录成功的请求。
+        :param ok: True表示成功；False表示副本故障（连接错误、超时、5xx），连续失败过多时摘除；
+            None表示与副本健康无关的失败（例如请求本身有误或被限流）。
+        """
+        with self._lock:
+            replica.outstanding -= 1
+            if ok:
+                replica.consecutive_failures = 0
+                if latency is not None:
+                    replica.latencies.append(latency)
+                return
+            if ok is None:
+                return
+            replica.failures += 1
+            replica.consecutive_failures += 1
+            METRICS.inc("replica_failures", replica=replica.url)
+            if replica.healthy and replica.consecutive_failures >= self.max_failures:
+                self._eject(replica)
+
+    def _eject(self, replica: Replica):
+        """
+        摘除副本并确保探测线程在运行。调用方需持有锁。
+        """
+        replica.healthy = False
+        replica.ejections += 1
+        self._ejected_at[replica] = time.monotonic()
+        METRICS.inc("replica_ejections", replica=replica.url)
+        LOG.warning(f"副本 {replica.url} 连续失败 {replica.consecutive_failures} 次，暂时摘除")
+        if self._prober is None:
+            self._prober = threading.Thread(target=self._probe_loop, name="replica-prober", daemon=True)
+            self._prober.start()
+
+    def _probe_loop(self):
+        """
+        探测线程：定期探测摘除的副本，健康的副本重新加入。
+        """
+        while not self._stop_event.wait(self.probe_interval):
+            with self._lock:
+                ejected = [replica for replica in self.replicas if not replica.healthy]
+            for replica in ejected:
+                try:
+                    healthy = self.probe(replica) if self.probe is not None else True
+                except Exception as e:
+                    LOG.debug(f"探测副本 {replica.url} 失败：{e}")
+                    healthy = False
+                if healthy:
+                    with self._lock:
+                        replica.healthy = True
+                        replica.consecutive_failures = 0
+                        self._ejected_at.pop(replica, None)
+                    LOG.info(f"副本 {replica.url} 探测成功，重新加入")
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        返回触发对冲的等待时间（秒）：所有副本最近成功请求延迟的 hedge_percentile 分位数。
+        未启用对冲、只有一个副本或样本数不足时返回None。
+        """
+        if not self.hedge_percentile or len(self.replicas) < 2:
+            return None
+        with self._lock:
+            samples = [latency for replica in self.replicas for latency in replica.latencies]
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return _percentile(samples, self.hedge_percentile)
+
+    def stats(self) -> List[dict]:
+        """
+        汇总各副本的请求数、失败数、摘除次数、对冲次数和延迟分位数。
+        """
+        with self._lock:
+            return [{
+                "url": replica.url,
+                "healthy": replica.healthy,
+                "outstanding": replica.outstanding,
+                "requests": replica.requests,
+                "failures": replica.failures,
+                "ejections": replica.ejections,
+                "hedges": replica.hedges,
+                "latency_p50_ms": _to_ms(replica.latency_percentile(0.5)),
+                "latency_p95_ms": _to_ms(replica.latency_percentile(0.95)),
+            } for replica in self.replicas]
+
+    def close(self):
+        """
+        停止探测线程。
+        """
+        self._stop_event.set()
+
+
+def _percentile(samples, q: float) -> Optional[float]:
+    """
+    计算样本的分位数（最近秩法），没有样本时返回None。
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _to_ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
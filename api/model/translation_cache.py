@@ -0,0 +1,186 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from utils import LOG
+
+
+class TranslationCache:
+    """
+    基于SQLite单文件的持久化翻译缓存，按内容寻址并以LRU策略淘汰。
+
+    缓存键为 (模型名称, 提示词) 的SHA-256摘要。提示词由提示模板、目标语言和原文渲染而成，
+    因此任一项变化都会得到不同的键。
+
+    参数:
+    - path: str，缓存数据库文件路径。
+    - max_size_mb: float，缓存中译文的总大小上限（MB），超出后淘汰最久未访问的条目。
+    """
+
+    # 命中时只在内存中记录访问时间，累计到该数量后再批量写回数据库
+    TOUCH_FLUSH_THRESHOLD = 256
+
+    def __init__(self, path: str = "cache/translation_cache.sqlite3", max_size_mb: float = 256):
+        """
+        初始化翻译缓存，必要时创建数据库文件和表结构。
+
+        参数:
+        - path: str，缓存数据库文件路径。
+        - max_size_mb: float，缓存中译文的总大小上限（MB）。
+        """
+        self.path = path
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0  # 命中次数
+        self.misses = 0  # 未命中次数
+        self._lock = threading.Lock()  # 多个翻译线程共享同一连接
+        self._touched = {}  # 待写回的访问时间 {key: timestamp}
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, "
+            "translation TEXT NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON translations (last_access)")
+        self._conn.commit()
+        self._total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()[0]
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str) -> str:
+        """
+        生成缓存键。
+
+        :param model_name: 模型名称。
+        :param prompt: 完整的翻译提示词。
+        :return: 十六进制的SHA-256摘要。
+        """
+        digest = hashlib.sha256()
+        digest.update(model_name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, model_name: str, prompt: str):
+        """
+        查询缓存。
+
+        :param model_name: 模型名称。
+        :param prompt: 完整的翻译提示词。
+        :return: 命中时返回译文，否则返回None。
+        """
+        key = self.make_key(model_name, prompt)
+        with self._lock:
+            row = self._conn.execute("SELECT translation FROM translations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.TOUCH_FLUSH_THRESHOLD:
+                self._flush_touched()
+            return row[0]
+
+    def put(self, model_name: str, prompt: str, translation: str):
+        """
+        写入缓存，必要时按LRU淘汰旧条目。
+
+        :param model_name: 模型名称。
+        :param prompt: 完整的翻译提示词。
+        :param translation: 模型返回的译文。
+        """
+        key = self.make_key(model_name, prompt)
+        size = len(translation.encode("utf-8"))
+        with self._lock:
+            self._flush_touched()
+            old = self._conn.execute("SELECT size FROM translations WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (key, translation, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, translation, size, time.time()),
+            )
+            self._total_size += size - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def purge(self):
+        """
+        清空缓存中的所有条目。
+        """
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM translations")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+            self._total_size = 0
+        LOG.info(f"翻译缓存已清空: {self.path}")
+
+    def close(self):
+        """
+        写回未保存的访问时间并关闭数据库连接。
+        """
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
+
+    def stats(self) -> dict:
+        """
+        返回缓存的统计信息。
+
+        :return: 包含命中次数、未命中次数、命中率和当前大小的字典。
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size_bytes": self._total_size,
+        }
+
+    def log_stats(self):
+        """
+        将缓存统计信息输出到日志。
+        """
+        stats = self.stats()
+        LOG.info(
+            f"翻译缓存: 命中 {stats['hits']} 次, 未命中 {stats['misses']} 次, "
+            f"命中率 {stats['hit_rate']:.1%}, 大小 {stats['size_bytes']} 字节"
+        )
+
+    def _flush_touched(self):
+        """
+        将内存中记录的访问时间写回数据库。调用方需持有锁。
+        """
+        if not self._touched:
+            return
+        self._conn.executemany(
+            "UPDATE translations SET last_access = ? WHERE key = ?",
+            [(timestamp, key) for key, timestamp in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _evict(self):
+        """
+        当总大小超过上限时，按最久未访问顺序删除条目。调用方需持有锁。
+        """
+        while self._total_size > self.max_size_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM translations ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._total_size = 0
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM translations WHERE key = ?", (key,))
+                self._total_size -= size
+                if self._total_size <= self.max_size_bytes:
+                    break
@@ -0,0 +1 @@
+from .job_manager import JobManager, JobQueueFullError, TranslationJob
@@ -0,0 +1,328 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from model import Model
+from translator import PDFTranslator
+from translator.writer import format_partial_markdown
+from utils import LOG, METRICS
+
+
+class JobQueueFullError(Exception):
+    """
+    自定义异常类，表示翻译任务队列已满，调用方应稍后重试。
+
+    :param capacity: int, 队列中允许同时存在的未完成任务数
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        super().__init__(f"Job queue is full: {capacity} jobs are already queued or running.")
+
+
+class TranslationJob:
+    """
+    一个PDF翻译任务及其状态。
+
+    参数:
+    - job_id: str，任务ID。
+    - pdf_file_path: str，待翻译的PDF文件路径。
+    - output_file_path: str，翻译结果的保存路径。
+    - file_format: str，输出文件格式。
+    - target_language: str，目标语言。
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    def __init__(self, job_id: str, pdf_file_path: str, output_file_path: str, file_format: str, target_language: str):
+        self.job_id = job_id
+        self.pdf_file_path = pdf_file_path
+        self.output_file_path = output_file_path
+        self.file_format = file_format
+        self.target_language = target_language
+        self.status = self.QUEUED
+        self.pages_done = 0
+        self.total_pages = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.expires_at = None  # 结束后任务目录（包括翻译结果）的删除时刻
+        self.partials = {}  # 翻译中的页面的部分译文 {页码索引: {内容索引: 译文}}
+        self._partials_lock = threading.Lock()
+
+    def set_partial(self, page_idx: int, content_idx: int, text: str):
+        """
+        记录一个内容目前为止的译文，在翻译线程中调用。
+        """
+        with self._partials_lock:
+            if page_idx >= self.pages_done:
+                self.partials.setdefault(page_idx, {})[content_idx] = text
+
+    def set_progress(self, pages_done: int, total_pages):
+        """
+        更新进度，并丢弃已完成页面的部分译文（完整的页面已写入输出文件）。
+        """
+        with self._partials_lock:
+            self.pages_done = pages_done
+            self.total_pages = total_pages
+            for page_idx in [page_idx for page_idx in self.partials if page_idx < pages_done]:
+                del self.partials[page_idx]
+
+    def clear_partials(self):
+        """
+        丢弃全部部分译文，任务结束时调用。
+        """
+        with self._partials_lock:
+            self.partials = {}
+
+    def partial_markdown(self) -> str:
+        """
+        返回翻译中的页面目前为止的译文（Markdown）。只包含模型已经开始返回的文本内容。
+        """
+        with self._partials_lock:
+            pages = {page_idx: dict(texts) for page_idx, texts in self.partials.items()}
+        return format_partial_markdown(pages)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+    def to_dict(self) -> dict:
+        """
+        返回任务状态的字典表示，用于HTTP响应。
+        """
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "file_format": self.file_format,
+            "target_language": self.target_language,
+            "progress": {"pages_done": self.pages_done, "total_pages": self.total_pages},
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "expires_at": self.expires_at,
+        }
+
+
+class JobManager:
+    """
+    翻译任务管理器：用后台线程池执行翻译任务，HTTP请求只负责提交和查询，不会阻塞在模型调用上。
+    所有任务共享同一个模型实例（及其限流器、缓存和连接池）。未完成的任务数有上限，队列满时拒绝新任务。
+
+    参数:
+    - model: Model，所有任务共享的模型实例。
+    - workers: int，同时执行的任务数。
+    - max_queue: int，排队等待（不含执行中）的任务数上限。
+    - output_dir: str，上传文件和翻译结果的保存目录。
+    - translator_options: dict，创建 PDFTranslator 时使用的其他参数，例如并发数。
+    - max_finished_jobs: int，内存中保留的已结束任务数上限，超出时丢弃最早结束的任务记录。
+    - stream_partial: bool，模型支持流式返回时是否记录翻译中的页面的部分译文，供查询。
+    - result_ttl: float，任务结束后保留任务目录（包括翻译结果）的秒数，过期的任务连同目录一起删除；
+      客户端确认取得翻译结果（见 acknowledge）后只再保留 DOWNLOAD_GRACE 秒。启动时删除 output_dir 中超过该时长未修改的任务目录。
+    """
+
+    # 客户端确认取得翻译结果后继续保留的秒数，允许客户端重试下载
+    DOWNLOAD_GRACE = 60
+
+    def __init__(self, model: Model, workers: int = 2, max_queue: int = 16, output_dir: str = "jobs",
+                 translator_options: dict = None, max_finished_jobs: int = 1000, stream_partial: bool = True,
+                 result_ttl: float = 3600):
+        self.model = model
+        self.workers = workers
+        self.capacity = workers + max_queue
+        self.output_dir = output_dir
+        self.translator_options = translator_options or {}
+        self.max_finished_jobs = max_finished_jobs
+        self.stream_partial = stream_partial
+        self.result_ttl = result_ttl
+        self.jobs = OrderedDict()  # {job_id: TranslationJob}
+        self.unfinished = 0  # 排队和执行中的任务数
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job-worker")
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        self._remove_stale_dirs()
+
+    def job_dir(self, job_id: str) -> str:
+        """
+        返回任务的文件目录。
+        """
+        return os.path.join(self.output_dir, job_id)
+
+    def reserve(self) -> str:
+        """
+        预留一个任务位置并创建任务目录，供上传文件保存使用。
+
+        :return: 新任务的ID。
+        :raises JobQueueFullError: 未完成的任务数已达上限时抛出。
+        """
+        with self._lock:
+            if self.unfinished >= self.capacity:
+                raise JobQueueFullError(self.capacity)
+            self.unfinished += 1
+            expired = self._forget_expired_jobs()
+        self._remove_dirs(expired)
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id))
+        return job_id
+
+    def release(self, job_id: str):
+        """
+        放弃一个已预留但未提交的任务位置，并删除其任务目录。
+        """
+        with self._lock:
+            self.unfinished -= 1
+        self._remove_dirs([job_id])
+
+    def submit(self, job_id: str, pdf_file_path: str, file_format: str = "markdown", target_language: str = "中文") -> TranslationJob:
+        """
+        提交一个已预留位置的翻译任务，任务在后台线程池中执行。
+
+        :param job_id: reserve 返回的任务ID。
+        :param pdf_file_path: 待翻译的PDF文件路径。
+        :param file_format: 输出文件格式。
+        :param target_language: 目标语言。
+        :return: 新建的翻译任务。
+        """
+        extension = "md" if file_format.lower() == "markdown" else "pdf"
+        output_file_path = os.path.join(self.job_dir(job_id), f"translated.{extension}")
+        job = TranslationJob(job_id, pdf_file_path, output_file_path, file_format, target_language)
+        with self._lock:
+            self.jobs[job_id] = job
+        self._executor.submit(self._run, job)
+        LOG.info(f"翻译任务已提交: {job_id}")
+        return job
+
+    def get(self, job_id: str) -> TranslationJob:
+        """
+        查询任务，不存在或已过期时返回None。
+        """
+        with self._lock:
+            expired = self._forget_expired_jobs()
+            job = self.jobs.get(job_id)
+        self._remove_dirs(expired)
+        return job
+
+    def acknowledge(self, job_id: str) -> bool:
+        """
+        客户端确认已取得翻译结果后调用，任务在 DOWNLOAD_GRACE 秒后过期删除。
+        下载本身不缩短保留时间，重试或预取的下载请求不会让结果在客户端读取完之前过期。
+
+        :param job_id: 任务ID。
+        :return: 是否已设置过期时间；任务不存在或尚未结束时返回False。
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.expires_at is None:
+                return False
+            job.expires_at = min(job.expires_at, time.time() + self.DOWNLOAD_GRACE)
+            return True
+
+    def remove(self, job_id: str) -> bool:
+        """
+        删除已结束的任务记录及其任务目录，例如翻译结果已被下载之后。
+
+        :param job_id: 任务ID。
+        :return: 是否删除；任务不存在或尚未结束时返回False。
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or not job.finished:
+                return False
+            del self.jobs[job_id]
+        self._remove_dirs([job_id])
+        LOG.info(f"翻译任务已删除: {job_id}")
+        return True
+
+    def shutdown(self, wait: bool = True):
+        """
+        停止接受新任务并关闭线程池。
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _run(self, job: TranslationJob):
+        """
+        在后台线程中执行翻译任务并更新状态。
+        """
+        job.status = TranslationJob.RUNNING
+        job.started_at = time.time()
+
+        try:
+            translator = PDFTranslator(self.model, **self.translator_options)
+            translator.translate_pdf(job.pdf_file_path, job.file_format, job.target_language,
+                                     output_file_path=job.output_file_path, progress_callback=job.set_progress,
+                                     partial_callback=job.set_partial if self.stream_partial else None)
+            job.status = TranslationJob.SUCCEEDED
+        except Exception as e:
+            LOG.error(f"翻译任务失败: {job.job_id}: {e}")
+            job.error = str(e)
+            job.status = TranslationJob.FAILED
+        finally:
+            job.clear_partials()
+            job.finished_at = time.time()
+            job.expires_at = job.finished_at + self.result_ttl
+            METRICS.inc("jobs_finished", status=job.status)
+            # 上传的PDF只在翻译时使用
+            self._remove_file(job.pdf_file_path)
+            with self._lock:
+                self.unfinished -= 1
+                forgotten = self._forget_finished_jobs() + self._forget_expired_jobs()
+            self._remove_dirs(forgotten)
+
+    def _forget_finished_jobs(self) -> list:
+        """
+        已结束的任务记录超过上限时，丢弃最早提交的已结束任务。调用方需持有锁。
+
+        :return: 被丢弃的任务ID列表，其任务目录由调用方在锁外删除。
+        """
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        forgotten = finished[:max(0, len(finished) - self.max_finished_jobs)]
+        for job_id in forgotten:
+            del self.jobs[job_id]
+        return forgotten
+
+    def _forget_expired_jobs(self) -> list:
+        """
+        丢弃已过期的任务记录。调用方需持有锁。
+
+        :return: 过期的任务ID列表，其任务目录由调用方在锁外删除。
+        """
+        now = time.time()
+        expired = [job_id for job_id, job in self.jobs.items() if job.expires_at is not None and job.expires_at <= now]
+        for job_id in expired:
+            del self.jobs[job_id]
+        return expired
+
+    def _remove_dirs(self, job_ids):
+        """
+        删除任务目录。
+        """
+        for job_id in job_ids:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+            METRICS.inc("job_dirs_removed")
+
+    def _remove_stale_dirs(self):
+        """
+        删除 output_dir 中超过 result_ttl 未修改的任务目录，例如服务重启前留下的目录。
+        """
+        deadline = time.time() - self.result_ttl
+        stale = [name for name in os.listdir(self.output_dir)
+                 if os.path.isdir(self.job_dir(name)) and os.path.getmtime(self.job_dir(name)) < deadline]
+        if stale:
+            LOG.info(f"删除 {len(stale)} 个过期的任务目录")
+            self._remove_dirs(stale)
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            os.remove(path)
+        except OSError as e:
+            LOG.warning(f"无法删除文件 {path}: {e}")
@@ -1 +1,4 @@
-from .pdf_translator import PDFTranslator
\ No newline at end of file
+from .pdf_translator import PDFTranslator
+from .batch_translator import BatchTranslator, collect_books
+from .content_filter import ContentFilter, create_content_filter
+from .segment_index import SegmentIndex, segment_index_options
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from concurrent import futures
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Optional
+
+from utils import LOG
+
+
+class AsyncExecutor:
+    """
+    在一个事件循环中并发执行翻译协程的执行器，可替代一本书独占的 ThreadPoolExecutor。
+    submit 可以从任意线程调用，返回 concurrent.futures.Future；所有请求都在事件循环所在的线程中等待，
+    进行中的请求数可以达到数百个，而不需要同样多的线程。
+
+    参数:
+    - max_in_flight: int，同时进行中的协程数上限。
+    - loop: 可选，已在其他线程中运行的事件循环，例如 translate_pdf_async 调用方的事件循环；
+      为None时创建新的事件循环并在后台线程中运行，shutdown 时关闭。
+    - on_close: 可选，返回协程的函数，关闭自建的事件循环之前在其中执行，例如关闭模型的异步客户端。
+    """
+
+    def __init__(self, max_in_flight: int, loop: Optional[asyncio.AbstractEventLoop] = None,
+                 on_close: Callable[[], Awaitable[None]] = None):
+        self.max_in_flight = max(1, max_in_flight)
+        self.on_close = on_close
+        self.in_flight = 0  # 进行中的协程数，只在事件循环所在的线程中修改
+        self.peak_in_flight = 0  # 进行中的协程数的峰值
+        self.pending = set()  # 尚未结束的协程的 Future，结束时移除，只用于 shutdown 时取消和等待
+        self._lock = threading.Lock()
+        self._cancelling = False  # shutdown(cancel_futures=True) 之后尚未开始的协程不再执行
+        self._semaphore = None  # 在事件循环中首次使用时创建
+        self._thread = None
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=loop.run_forever, name="translator-loop", daemon=True)
+            self._thread.start()
+        self.loop = loop
+
+    def submit(self, fn: Callable[..., Awaitable], *args) -> Future:
+        """
+        在事件循环中执行 fn(*args) 返回的协程。
+
+        :param fn: 协程函数。
+        :param args: 函数参数。
+        :return: Future，协程的结果。
+        """
+        future = asyncio.run_coroutine_threadsafe(self._run(fn, *args), self.loop)
+        with self._lock:
+            self.pending.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def _discard(self, future: Future):
+        with self._lock:
+            self.pending.discard(future)
+
+    async def _run(self, fn: Callable[..., Awaitable], *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        async with self._semaphore:
+            # 取消进行中的协程会释放信号量，此时尚未收到取消的排队协程不应开始执行
+            if self._cancelling:
+                raise asyncio.CancelledError()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                return await fn(*args)
+            finally:
+                self.in_flight -= 1
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        """
+        结束执行器。自建的事件循环在已提交的协程全部结束后关闭。
+
+        :param wait: 是否等待已提交的协程全部结束。
+        :param cancel_futures: 是否取消尚未完成的协程。
+        """
+        with self._lock:
+            pending = list(self.pending)
+        if cancel_futures:
+            self._cancelling = True
+            for future in pending:
+                future.cancel()
+        if wait:
+            futures.wait(pending)
+        if self._thread is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self._drain(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self._thread = None
+        if self.peak_in_flight > 1:
+            LOG.debug(f"异步翻译请求的并发峰值: {self.peak_in_flight}")
+
+    async def _drain(self):
+        """
+        等待事件循环中其余的任务（包括被取消的协程）结束，然后执行 on_close。
+        """
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.on_close is not None:
+            await self.on_close()
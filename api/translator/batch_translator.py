@@ -0,0 +1,149 @@
+import glob
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from model import Model
+from translator.fair_executor import FairExecutor
+from translator.pdf_translator import PDFTranslator
+from utils import LOG
+
+
+def _is_translated_output(path: str) -> bool:
+    return path.lower().endswith("_translated.pdf")
+
+
+def collect_books(source: str) -> List[str]:
+    """
+    根据目录、通配符或清单文件收集要翻译的PDF文件。
+
+    参数:
+    - source: str，以下三种之一：
+      目录，翻译其中（含子目录）所有的 .pdf 文件（扩展名不区分大小写）；
+      通配符，例如 "books/*.pdf"；
+      目录和通配符中以 _translated.pdf 结尾的文件是之前翻译的输出（见 Writer），会被跳过。
+      清单文件（非 .pdf 结尾的文件），每行一个PDF路径，空行和 # 开头的行被忽略，相对路径相对于清单文件所在目录。
+
+    返回:
+    - List[str]，去重并保持顺序的PDF文件路径列表。
+    """
+    if os.path.isdir(source):
+        paths = sorted(glob.glob(os.path.join(source, "**", "*.[pP][dD][fF]"), recursive=True))
+        paths = [path for path in paths if not _is_translated_output(path)]
+    elif os.path.isfile(source) and not source.lower().endswith(".pdf"):
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+        paths = [os.path.join(base_dir, line) for line in lines if line and not line.startswith("#")]
+    else:
+        paths = [path for path in sorted(glob.glob(source, recursive=True)) if not _is_translated_output(path)]
+
+    books = list(dict.fromkeys(os.path.normpath(path) for path in paths))
+    if not books:
+        raise FileNotFoundError(f"No PDF files found in {source}")
+    return books
+
+
+class BookResult:
+    """
+    批量翻译中单本书的结果。
+
+    参数:
+    - pdf_file_path: str，PDF文件路径。
+    """
+
+    def __init__(self, pdf_file_path: str):
+        self.pdf_file_path = pdf_file_path
+        self.status = "pending"  # pending / succeeded / failed
+        self.pages = 0
+        self.elapsed = 0.0
+        self.error = None
+
+
+class BatchTranslator:
+    """
+    批量翻译多个PDF文件。所有书共享同一个模型实例（及其限流器、缓存和连接池）和同一个翻译线程池，
+    总吞吐量只受API配额限制，而不是逐本顺序翻译。
+
+    参数:
+    - model: Model，所有书共享的模型实例。
+    - concurrency: int，所有书合计的并发请求数上限。
+    - fairness: str，各书之间分配并发的策略，"round_robin" 或 "fifo"，见 FairExecutor。
+    - max_books: int，同时解析和翻译的书数上限，用于限制内存占用。
+    - translator_options: dict，创建 PDFTranslator 时使用的其他参数，例如 batch_max_chars、checkpoint_dir。
+    """
+
+    def __init__(self, model: Model, concurrency: int = 1, fairness: str = "round_robin", max_books: int = 4,
+                 translator_options: dict = None):
+        self.model = model
+        self.concurrency = max(1, concurrency)
+        self.fairness = fairness
+        self.max_books = max(1, max_books)
+        self.translator_options = translator_options or {}
+
+    def translate_books(self, pdf_file_paths: List[str], file_format: str = "PDF", target_language: str = "中文",
+                        resume: bool = False) -> List[BookResult]:
+        """
+        翻译多个PDF文件，翻译结果按单本翻译时的默认路径保存。单本书失败不影响其他书。
+
+        参数:
+        - pdf_file_paths: List[str]，PDF文件路径列表。
+        - file_format: str，输出文件格式。
+        - target_language: str，目标语言。
+        - resume: bool，是否从各书的检查点恢复已完成的翻译。
+
+        返回:
+        - List[BookResult]，与 pdf_file_paths 一一对应的结果。
+        """
+        results = [BookResult(path) for path in pdf_file_paths]
+        executor = FairExecutor(self.concurrency, self.fairness)
+        started_at = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_books, thread_name_prefix="book") as books:
+                for result in results:
+                    books.submit(self._translate_book, executor, result, file_format, target_language, resume)
+        finally:
+            executor.shutdown()
+
+        self.log_summary(results, time.perf_counter() - started_at)
+        return results
+
+    def _translate_book(self, executor: FairExecutor, result: BookResult, file_format: str, target_language: str, resume: bool):
+        """
+        翻译一本书并记录结果，在书级线程中执行。
+        """
+        def on_progress(pages_done, total_pages):
+            result.pages = pages_done
+
+        LOG.info(f"开始翻译: {result.pdf_file_path}")
+        started_at = time.perf_counter()
+        try:
+            translator = PDFTranslator(self.model, executor=executor, **self.translator_options)
+            translator.translate_pdf(result.pdf_file_path, file_format, target_language, resume=resume, progress_callback=on_progress)
+            result.status = "succeeded"
+        except Exception as e:
+            LOG.error(f"翻译失败: {result.pdf_file_path}: {e}")
+            result.status = "failed"
+            result.error = str(e)
+        finally:
+            result.elapsed = time.perf_counter() - started_at
+
+    @staticmethod
+    def log_summary(results: List[BookResult], elapsed: float):
+        """
+        输出每本书的翻译结果汇总。
+
+        参数:
+        - results: List[BookResult]，各书的结果。
+        - elapsed: float，批量翻译的总耗时（秒）。
+        """
+        succeeded = sum(1 for result in results if result.status == "succeeded")
+        total_pages = sum(result.pages for result in results)
+        lines = [f"批量翻译完成: {succeeded}/{len(results)} 本成功，共 {total_pages} 页，耗时 {elapsed:.1f} 秒"]
+        for result in results:
+            line = f"  [{result.status}] {result.pdf_file_path}: {result.pages} 页, {result.elapsed:.1f} 秒"
+            if result.error:
+                line += f", 错误: {result.error}"
+            lines.append(line)
+        LOG.info("\n".join(lines))
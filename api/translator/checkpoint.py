@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+from collections import defaultdict
+from typing import Optional
+
+from book import ContentType
+from utils import LOG, METRICS
+
+
+def content_hash(content) -> str:
+    """
+    计算内容原文的摘要，用于在恢复翻译时确认检查点记录与当前内容一致。
+    表格按行列表序列化为JSON后计算，不经过 DataFrame 的字符串表示（后者会按列宽截断并依赖pandas的显示设置）。
+
+    :param content: 内容对象。
+    :return: 十六进制的SHA-1摘要。
+    """
+    if content.content_type == ContentType.TABLE:
+        original = json.dumps(content.original, ensure_ascii=False)
+    else:
+        original = content.original
+    return hashlib.sha1(original.encode("utf-8")).hexdigest()
+
+
+def book_hash(pdf_file_path: str, target_language: str) -> str:
+    """
+    计算书籍的摘要：PDF文件内容加上目标语言，同一本书翻译为不同语言时使用不同的检查点。
+
+    :param pdf_file_path: PDF文件路径。
+    :param target_language: 目标语言。
+    :return: 十六进制的SHA-256摘要。
+    """
+    digest = hashlib.sha256()
+    with open(pdf_file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    digest.update(b"\0")
+    digest.update(target_language.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class CheckpointJournal:
+    """
+    只追加写入的翻译检查点日志。每条记录保存一个内容的位置（页码、内容索引）、原文摘要和译文，
+    进程中断后可据此恢复已完成的翻译。
+
+    写入由后台线程完成：翻译线程只把记录放入队列，后台线程批量写入并定期刷新到磁盘，
+    不会拖慢翻译主循环。
+
+    增量翻译（diff模式）时同时读取上一版本的检查点：原文摘要与上一版本相同的内容直接复用上一版本的译文，
+    优先使用同一位置的记录，位置变化（例如插入或删除了页面）时使用摘要相同、位置最近的记录。
+
+    参数:
+    - pdf_file_path: str，PDF文件路径。
+    - target_language: str，目标语言。
+    - checkpoint_dir: str，检查点文件所在目录。
+    - resume: bool，是否保留已有的检查点以便恢复；为False时清空旧的检查点重新记录。
+    - previous: str，可选，上一版本的PDF文件路径或其检查点文件（.jsonl）路径。
+    """
+
+    # 后台线程最多间隔该秒数将缓冲的记录刷新到磁盘
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self, pdf_file_path: str, target_language: str, checkpoint_dir: str = "checkpoints", resume: bool = False,
+                 previous: Optional[str] = None):
+        if not os.path.exists(checkpoint_dir):
+            os.makedirs(checkpoint_dir)
+        self.path = os.path.join(checkpoint_dir, f"{book_hash(pdf_file_path, target_language)}.jsonl")
+        self.entries = self._load(self.path) if resume else {}  # {(page_idx, content_idx): {"hash": ..., "translation": ...}}
+        if resume:
+            LOG.info(f"从检查点恢复 {len(self.entries)} 条已完成的翻译: {self.path}")
+
+        self.previous = {}  # 上一版本的记录，格式与 entries 相同
+        self.previous_positions = defaultdict(list)  # {原文摘要: [上一版本中的 (页码, 内容索引)]}
+        self.previous_hits = 0  # 复用上一版本译文的内容数
+        if previous is not None:
+            self._load_previous(previous, target_language, checkpoint_dir)
+
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="checkpoint-writer", daemon=True)
+        self._writer.start()
+
+    @staticmethod
+    def _load(path: str) -> dict:
+        """
+        读取检查点文件，同一位置有多条记录时以最后一条为准。中断时写了一半的最后一行会被忽略。
+
+        :param path: 检查点文件路径。
+        :return: 以 (页码, 内容索引) 为键的记录字典。
+        """
+        entries = {}
+        if not os.path.exists(path):
+            return entries
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                entries[(record["page"], record["content"])] = {"hash": record["hash"], "translation": record["translation"]}
+        return entries
+
+    def _load_previous(self, previous: str, target_language: str, checkpoint_dir: str):
+        """
+        读取上一版本的检查点，并按原文摘要建立位置索引。
+
+        :param previous: 上一版本的PDF文件路径或其检查点文件路径。
+        :param target_language: 目标语言。
+        :param checkpoint_dir: 检查点文件所在目录。
+        """
+        path = previous if previous.endswith(".jsonl") else os.path.join(checkpoint_dir, f"{book_hash(previous, target_language)}.jsonl")
+        if not os.path.exists(path):
+            LOG.warning(f"未找到上一版本的检查点 {path}，将翻译全部内容")
+            return
+        self.previous = self._load(path)
+        for position, entry in sorted(self.previous.items()):
+            self.previous_positions[entry["hash"]].append(position)
+        LOG.info(f"读取上一版本的 {len(self.previous)} 条翻译: {path}")
+
+    def lookup(self, page_idx: int, content_idx: int, content):
+        """
+        查找某个位置已完成的翻译，原文摘要不一致时视为不存在。
+        本次运行的检查点中没有时，查找上一版本中原文相同的内容。
+
+        :param page_idx: 页码索引。
+        :param content_idx: 内容在页面中的索引。
+        :param content: 当前的内容对象。
+        :return: 已保存的译文，没有时返回None。
+        """
+        digest = content_hash(content)
+        entry = self.entries.get((page_idx, content_idx))
+        if entry is not None and entry["hash"] == digest:
+            return entry["translation"]
+        if not self.previous:
+            return None
+
+        entry = self.previous.get((page_idx, content_idx))
+        if entry is None or entry["hash"] != digest:
+            positions = self.previous_positions.get(digest)
+            if not positions:
+                return None
+            nearest = min(positions, key=lambda position: (abs(position[0] - page_idx), abs(position[1] - content_idx)))
+            entry = self.previous[nearest]
+        self.previous_hits += 1
+        METRICS.inc("contents_reused", source="previous_revision")
+        return entry["translation"]
+
+    def record(self, page_idx: int, content_idx: int, content, translation: str):
+        """
+        记录一个已完成的翻译。只把记录放入队列，由后台线程写入文件。
+        检查点中已有同一位置、同一原文的记录时不再重复写入；原文摘要不同的旧记录在恢复时被拒绝，需写入新记录覆盖。
+
+        :param page_idx: 页码索引。
+        :param content_idx: 内容在页面中的索引。
+        :param content: 内容对象。
+        :param translation: 传给 set_translation 的译文字符串。
+        """
+        digest = content_hash(content)
+        entry = self.entries.get((page_idx, content_idx))
+        if entry is not None and entry["hash"] == digest:
+            return
+        self._queue.put({"page": page_idx, "content": content_idx, "hash": digest, "translation": translation})
+
+    def close(self):
+        """
+        写入队列中剩余的记录，刷新到磁盘并关闭文件。
+        """
+        self._queue.put(None)
+        self._writer.join()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+    def _write_loop(self):
+        """
+        后台线程：从队列中取出记录写入文件，每隔 FLUSH_INTERVAL 秒或队列空闲时刷新一次。
+        """
+        while True:
+            try:
+                record = self._queue.get(timeout=self.FLUSH_INTERVAL)
+            except queue.Empty:
+                self._file.flush()
+                continue
+            if record is None:
+                return
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if self._queue.empty():
+                self._file.flush()
@@ -0,0 +1,207 @@
+import re
+from typing import Iterable, List, Optional, Tuple
+
+from book import ContentType
+
+# 罗马数字页码：2到99，全大写或全小写，不识别 C、D、M 开头的数字，避免 "mix"、"div"、"MD" 之类的普通单词被当作页码；
+# 单个字母（"I"、"V"、"x" 等）更常见于正文，也不识别
+ROMAN_NUMERAL = r'(?=[IVXL]{2})(?:XC|XL|L?X{0,3})(?:IX|IV|V?I{0,3})|(?=[ivxl]{2})(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3})'
+# 页码：纯数字、"Page 3"、"3 of 10"、"- 3 -"、"第3页"，以及单独成行的罗马数字
+PAGE_NUMBER_PATTERN = re.compile(
+    r'[-–— \t]*(?:(?i:page|p\.)\s*)?(?:\d{1,5}(?:\s*(?i:of|/)\s*\d{1,5})?|' + ROMAN_NUMERAL + r')[-–— \t]*'
+    r'|第\s*\d{1,5}\s*页(?:\s*/?\s*共\s*\d{1,5}\s*页)?'
+)
+# URL和电子邮件地址
+URL_PATTERN = re.compile(r'(?:[a-z][a-z0-9+.-]*://|www\.)\S+|[\w.+-]+@[\w-]+(?:\.[\w-]+)+', re.IGNORECASE)
+# 看起来像代码的行。只认代码特有的结构，不因行中出现运算符或 "#" 就判为代码，
+# 散文中常见的形式（"File -> Save"、"#1 bestseller"、"x >= 5"、"Total = 5 apples"、以冒号或分号结尾的句子）都不算：
+# 以左花括号结尾或只有右括号；以 "name(...);" 结尾的语句；带声明关键字的变量定义；复合赋值；
+# 值为字面量、调用、运算表达式或以分号结尾的赋值；整行的函数调用；单独成行的关键字；return 语句；
+# 导入和预处理指令；函数、类的定义；条件中带有运算符或括号的控制语句；for ... in ...: 循环
+CODE_LINE_PATTERN = re.compile(
+    r'.*\{\s*|\s*[})\]]+[;,)]*\s*'
+    r'|.*[\w.]\(.*\)\s*;\s*'
+    r'|\s*(?:var|let|const|int|float|double|char|bool|auto)\s+[A-Za-z_]\w*\s*=.*'
+    r'|\s*[A-Za-z_][\w.]*(?:\[[^\]]*\])?\s*(?:[-+*/%|&^]|\*\*|//|<<|>>)=\s*\S.*'
+    r'|\s*[A-Za-z_][\w.]*(?:\[[^\]]*\])?\s*=\s*'
+    r'(?:["\'\[{(].*|[A-Za-z_][\w.]*\s*[(\[].*|[^;]*;'
+    r'|[\w."\']+(?:\s*(?:[-+*/%<>|&^]|\*\*|//|<<|>>)\s*[\w."\'()]+)+)\s*'
+    r'|\s*[A-Za-z_][\w.]*\(.*\)\s*;?\s*'
+    r'|\s*(?:pass|break|continue|end|fi|done|else:|try:|finally:|return)\s*;?\s*'
+    r'|\s*return\s+(?:[\w.]+(?:\(.*\))?|.*[-+*/%<>=!&|(\[].*)\s*;?\s*'
+    r'|\s*(?:import\s+[\w.]+(?:\s+as\s+\w+)?(?:\s*,\s*[\w.]+)*|from\s+[\w.]+\s+import\s+[\w.*, ()]+|#include\s*[<"].*|#define\s+\w+.*)\s*;?\s*'
+    r'|\s*(?:def\s+\w+\s*\(.*\)\s*(?:->\s*[^:]+)?:|class\s+\w+\s*(?:\(.*\))?\s*[:{])\s*'
+    r'|\s*(?:if|elif|while|for|switch|catch|with|except)\b.*(?:[=<>!]=|[<>()\[\]]).*[:{]\s*'
+    r'|\s*for\s+\w+(?:\s*,\s*\w+)*\s+in\s+[\w.()\[\]]+\s*:\s*'
+)
+# 注释行：本身不能说明是代码，只在代码块中随前一行归入代码块。"#" 后须为空白，"#1" 之类的编号不算
+COMMENT_LINE_PATTERN = re.compile(r'\s*(?:#(?:\s|$)|//|/\*|\*/|\*(?:\s|$))')
+
+# 各文字的Unicode范围
+SCRIPT_RANGES = {
+    "han": ((0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xF900, 0xFAFF), (0x20000, 0x2A6DF)),
+    "kana": ((0x3040, 0x309F), (0x30A0, 0x30FF), (0x31F0, 0x31FF)),
+    "hangul": ((0x1100, 0x11FF), (0x3130, 0x318F), (0xAC00, 0xD7AF)),
+    "cyrillic": ((0x0400, 0x04FF), (0x0500, 0x052F)),
+    "arabic": ((0x0600, 0x06FF), (0x0750, 0x077F)),
+    "thai": ((0x0E00, 0x0E7F),),
+}
+# 目标语言使用的文字。拉丁字母语言与英文原文无法按文字区分，不做判断
+LANGUAGE_SCRIPTS = {
+    "中文": ("han",), "简体中文": ("han",), "繁体中文": ("han",), "chinese": ("han",),
+    "日文": ("han", "kana"), "日语": ("han", "kana"), "japanese": ("han", "kana"),
+    "韩文": ("hangul", "han"), "韩语": ("hangul", "han"), "korean": ("hangul", "han"),
+    "俄文": ("cyrillic",), "俄语": ("cyrillic",), "russian": ("cyrillic",),
+    "阿拉伯文": ("arabic",), "阿拉伯语": ("arabic",), "arabic": ("arabic",),
+    "泰文": ("thai",), "泰语": ("thai",), "thai": ("thai",),
+}
+
+
+def script_ratio(text: str, scripts: Iterable[str]) -> float:
+    """
+    计算文本的字母类字符中属于指定文字的比例。
+
+    :param text: 文本。
+    :param scripts: 文字名称，见 SCRIPT_RANGES。
+    :return: 比例（0到1），文本中没有字母类字符时返回0。
+    """
+    ranges = [char_range for script in scripts for char_range in SCRIPT_RANGES[script]]
+    letters = 0
+    matched = 0
+    for char in text:
+        if char.isalpha():
+            letters += 1
+            code = ord(char)
+            if any(low <= code <= high for low, high in ranges):
+                matched += 1
+    return matched / letters if letters else 0.0
+
+
+class ContentFilter:
+    """
+    翻译前的内容分类器：用廉价的规则识别无需翻译的内容，例如页码、数字、URL、代码和已经是目标语言的文本。
+    这些内容直接以原文作为译文，不请求模型。只处理文本内容，表格单元格在按单元格翻译时另行过滤。
+
+    参数:
+    - rules: 启用的规则列表，默认全部启用。可选 "page_number"、"numeric"、"url"、"code"、"target_script"。
+    - max_letter_ratio: float，"numeric" 规则中字母类字符占比不超过该值时视为数字内容。
+    - min_code_lines: int，"code" 规则中连续像代码的行数不少于该值时视为代码块。整个内容是一个代码块时直接使用原文；
+      文本中夹杂的代码块由调度器单独保留原文，其余文本照常翻译（见 code_blocks）。
+    - min_target_script_ratio: float，"target_script" 规则中目标语言文字占字母类字符的比例不低于该值时视为已是目标语言。
+    """
+
+    RULES = ("page_number", "numeric", "url", "code", "target_script")
+
+    def __init__(self, rules: Optional[Iterable[str]] = None, max_letter_ratio: float = 0.1, min_code_lines: int = 2,
+                 min_target_script_ratio: float = 0.8):
+        self.rules = tuple(rules) if rules is not None else self.RULES
+        unknown = set(self.rules) - set(self.RULES)
+        if unknown:
+            raise ValueError(f"Unknown content filter rules: {sorted(unknown)}")
+        self.max_letter_ratio = max_letter_ratio
+        self.min_code_lines = max(min_code_lines, 1)
+        self.min_target_script_ratio = min_target_script_ratio
+
+    def classify(self, content, target_language: str) -> Optional[str]:
+        """
+        判断内容是否无需翻译。
+
+        :param content: 内容对象。
+        :param target_language: 目标语言。
+        :return: 命中的规则名称；需要翻译时返回None。
+        """
+        if content.content_type != ContentType.TEXT:
+            return None
+        text = content.original.strip()
+        if not text:
+            return "numeric" if "numeric" in self.rules else None
+
+        for rule in self.rules:
+            if getattr(self, f"_is_{rule}")(text, target_language):
+                return rule
+        return None
+
+    def code_blocks(self, text: str) -> List[Tuple[bool, str]]:
+        """
+        将文本按行切分为代码块和普通文本块：连续不少于 min_code_lines 行像代码的行（见 CODE_LINE_PATTERN）构成代码块，
+        以 ":" 或 "{" 结尾的代码行之后缩进更深的行也算代码；其余的行按原顺序合并为普通文本块。
+        空行和注释行归入前一行所在的块，不计入代码行数。未启用 "code" 规则时整个文本是一个普通文本块。
+
+        :param text: 文本。
+        :return: [(是否为代码块, 块文本), ...]，各块以换行拼接即为原文。
+        """
+        lines = text.split("\n")
+        if "code" not in self.rules or len(lines) < self.min_code_lines:
+            return [(False, text)]
+
+        flags = []
+        neutral = []
+        # 最外层以 ":" 或 "{" 结尾的代码行的缩进，其后缩进更深的行是它的代码体
+        block_indent = None
+        for line in lines:
+            stripped = line.strip()
+            if not stripped or COMMENT_LINE_PATTERN.match(line):
+                flags.append(flags[-1] if flags else False)
+                neutral.append(True)
+                continue
+            indent = len(line) - len(line.lstrip())
+            if block_indent is not None and indent <= block_indent:
+                block_indent = None
+            is_code = block_indent is not None or CODE_LINE_PATTERN.fullmatch(line) is not None
+            if not is_code:
+                block_indent = None
+            elif block_indent is None and stripped.endswith((":", "{")):
+                block_indent = indent
+            flags.append(is_code)
+            neutral.append(False)
+        # 连续的代码行（不计空行和注释行）不足 min_code_lines 行时按普通文本处理
+        start = 0
+        while start < len(lines):
+            end = start
+            while end < len(lines) and flags[end] == flags[start]:
+                end += 1
+            if flags[start] and neutral[start:end].count(False) < self.min_code_lines:
+                flags[start:end] = [False] * (end - start)
+            start = end
+
+        blocks = []
+        for line, is_code in zip(lines, flags):
+            if blocks and blocks[-1][0] == is_code:
+                blocks[-1][1].append(line)
+            else:
+                blocks.append((is_code, [line]))
+        return [(is_code, "\n".join(block)) for is_code, block in blocks]
+
+    def _is_page_number(self, text: str, target_language: str) -> bool:
+        return len(text) <= 32 and PAGE_NUMBER_PATTERN.fullmatch(text) is not None
+
+    def _is_numeric(self, text: str, target_language: str) -> bool:
+        letters = sum(1 for char in text if char.isalpha())
+        return letters / len(text) <= self.max_letter_ratio
+
+    def _is_url(self, text: str, target_language: str) -> bool:
+        return all(URL_PATTERN.fullmatch(token.strip('<>()[],;')) for token in text.split())
+
+    def _is_code(self, text: str, target_language: str) -> bool:
+        blocks = self.code_blocks(text)
+        return len(blocks) == 1 and blocks[0][0]
+
+    def _is_target_script(self, text: str, target_language: str) -> bool:
+        scripts = LANGUAGE_SCRIPTS.get(target_language.strip().lower())
+        return scripts is not None and script_ratio(text, scripts) >= self.min_target_script_ratio
+
+
+def create_content_filter(config: dict) -> Optional[ContentFilter]:
+    """
+    根据配置文件的 ContentFilter 段创建内容分类器。
+
+    参数:
+    - config: dict，加载后的配置。
+
+    返回:
+    - ContentFilter，配置中禁用时返回None。
+    """
+    filter_config = dict(config.get('ContentFilter', {}))
+    if not filter_config.pop('enabled', True):
+        return None
+    return ContentFilter(**filter_config)
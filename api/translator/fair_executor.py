@@ -0,0 +1,167 @@
+import itertools
+import threading
+from collections import OrderedDict, deque
+from concurrent import futures
+from concurrent.futures import Future
+
+from utils import LOG
+
+
+class FairExecutor:
+    """
+    在多本书之间共享的翻译线程池。每本书通过 queue() 获得自己的任务队列，
+    工作线程按公平策略从各队列中取任务执行，总并发数不超过 max_workers。
+
+    参数:
+    - max_workers: int，工作线程数，即所有书合计的并发请求数上限。
+    - fairness: str，取任务的策略。"round_robin" 轮流从每本书的队列中取一个任务，
+      各书平分并发；"fifo" 按提交顺序执行，先提交的书先完成。
+    """
+
+    POLICIES = ("round_robin", "fifo")
+
+    def __init__(self, max_workers: int, fairness: str = "round_robin"):
+        if fairness not in self.POLICIES:
+            raise ValueError(f"Unsupported fairness policy: {fairness}")
+        self.fairness = fairness
+        self.queues = OrderedDict()  # {key: deque[(sequence, future, fn, args)]}，按轮转顺序排列
+        self._sequence = itertools.count()  # 全局提交序号，fifo 策略按该序号取任务
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._keys = itertools.count()
+        self._threads = []
+        for i in range(max(1, max_workers)):
+            thread = threading.Thread(target=self._work_loop, name=f"translator-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def queue(self) -> "BookQueue":
+        """
+        为一本书创建任务队列。
+
+        :return: BookQueue，接口与 ThreadPoolExecutor 的 submit/shutdown 相同。
+        """
+        return BookQueue(self, next(self._keys))
+
+    def submit(self, key, fn, *args) -> Future:
+        """
+        向指定队列提交一个任务。
+
+        :param key: 队列的键。
+        :param fn: 要执行的函数。
+        :param args: 函数参数。
+        :return: Future，任务的结果。
+        """
+        future = Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot submit after shutdown")
+            self.queues.setdefault(key, deque()).append((next(self._sequence), future, fn, args))
+            self._condition.notify()
+        return future
+
+    def cancel(self, key) -> int:
+        """
+        取消指定队列中尚未开始的任务。
+
+        :param key: 队列的键。
+        :return: 取消的任务数。
+        """
+        with self._condition:
+            tasks = self.queues.pop(key, ())
+        for _, future, _, _ in tasks:
+            future.cancel()
+        return len(tasks)
+
+    def shutdown(self, wait: bool = True):
+        """
+        停止接受新任务，已提交的任务执行完后工作线程退出。
+
+        :param wait: 是否等待工作线程退出。
+        """
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _next_task(self):
+        """
+        按公平策略取出下一个任务，没有任务时返回None。调用方需持有锁。
+        """
+        if not self.queues:
+            return None
+        if self.fairness == "fifo":
+            key = min(self.queues, key=lambda k: self.queues[k][0][0])
+        else:
+            # 取队首的书，取完后移到队尾
+            key = next(iter(self.queues))
+            self.queues.move_to_end(key)
+        tasks = self.queues[key]
+        task = tasks.popleft()
+        if not tasks:
+            del self.queues[key]
+        return task
+
+    def _work_loop(self):
+        """
+        工作线程：按公平策略取任务执行，直到关闭且没有剩余任务。
+        """
+        while True:
+            with self._condition:
+                task = self._next_task()
+                while task is None:
+                    if self._shutdown:
+                        return
+                    self._condition.wait()
+                    task = self._next_task()
+            _, future, fn, args = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                LOG.debug(f"翻译任务出错: {e}")
+                future.set_exception(e)
+
+
+class BookQueue:
+    """
+    一本书在共享线程池中的任务队列，可替代该书独占的 ThreadPoolExecutor。
+
+    参数:
+    - executor: FairExecutor，共享线程池。
+    - key: 队列的键。
+    """
+
+    def __init__(self, executor: FairExecutor, key):
+        self.executor = executor
+        self.key = key
+        self.pending = set()  # 尚未结束的任务，结束时移除，不保留已完成任务的结果
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args) -> Future:
+        future = self.executor.submit(self.key, fn, *args)
+        with self._lock:
+            self.pending.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def _discard(self, future: Future):
+        with self._lock:
+            self.pending.discard(future)
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        """
+        结束该书的任务队列，共享线程池继续为其他书工作。
+
+        :param wait: 是否等待该书已提交的任务全部结束。
+        :param cancel_futures: 是否取消该书尚未开始的任务。
+        """
+        if cancel_futures:
+            self.executor.cancel(self.key)
+        if wait:
+            with self._lock:
+                pending = list(self.pending)
+            futures.wait(pending)
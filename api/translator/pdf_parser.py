@@ -1,20 +1,32 @@
-import pdfplumber
-from typing import Optional
+import math
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
 from book import Book, Page, Content, ContentType, TableContent
 from translator.exceptions import PageOutOfRangeException
-from utils import LOG
+from utils import LOG, METRICS
 
 
 class PDFParser:
     """
     PDF解析器类，用于解析PDF文件并提取文本和表格内容。
+
+    参数:
+    - workers: int，解析使用的进程数，默认为1（在当前进程中逐页解析）。
     """
 
-    def __init__(self):
+    # 多进程模式下每个分片的最大页数，分片越小负载越均衡、流水线模式下缓冲的页面越少
+    MAX_SHARD_PAGES = 16
+
+    def __init__(self, workers: int = 1):
         """
         初始化PDF解析器。
+
+        参数:
+        - workers: int，解析使用的进程数，默认为1（在当前进程中逐页解析）。
         """
-        pass
+        self.workers = max(1, workers)
 
     def parse_pdf(self, pdf_file_path: str, pages: Optional[int] = None) -> Book:
         """
@@ -28,48 +40,153 @@ class PDFParser:
         - Book，包含解析得到的文本和表格内容的书对象。
         """
         book = Book(pdf_file_path)
+        for page in self.iter_pages(pdf_file_path, pages):
+            book.add_page(page)
+        return book
+
+    @METRICS.timed_iter("parse")
+    def iter_pages(self, pdf_file_path: str, pages: Optional[int] = None) -> Iterator[Page]:
+        """
+        逐页解析PDF文件，每解析完一页就产出对应的Page对象，不在内存中保留已产出的页面。
+
+        参数:
+        - pdf_file_path: str，PDF文件的路径。
+        - pages: Optional[int]，要解析的页码范围。None表示解析所有页，否则解析从第一页到指定页。
+
+        返回:
+        - Iterator[Page]，按页码顺序产出的页面对象。
+        """
+        import pdfplumber
 
         with pdfplumber.open(pdf_file_path) as pdf:
             # 检查指定页码范围是否超出PDF实际页数
             if pages is not None and pages > len(pdf.pages):
                 raise PageOutOfRangeException(len(pdf.pages), pages)
 
-            # 根据是否指定了页码范围，确定要解析的页码列表
-            if pages is None:
-                pages_to_parse = pdf.pages
-            else:
-                pages_to_parse = pdf.pages[:pages]
-
-            for pdf_page in pages_to_parse:
-                page = Page()
-
-                # 提取原始文本内容和表格内容
-                raw_text = pdf_page.extract_text()
-                tables = pdf_page.extract_tables()
-
-                # 从原始文本中移除表格内容
-                for table_data in tables:
-                    for row in table_data:
-                        for cell in row:
-                            raw_text = raw_text.replace(cell, "", 1)
-
-                # 处理文本内容
-                if raw_text:
-                    # 清理文本，移除空行和首尾空白字符
-                    raw_text_lines = raw_text.splitlines()
-                    cleaned_raw_text_lines = [line.strip() for line in raw_text_lines if line.strip()]
-                    cleaned_raw_text = "\n".join(cleaned_raw_text_lines)
-
-                    text_content = Content(content_type=ContentType.TEXT, original=cleaned_raw_text)
-                    page.add_content(text_content)
-                    LOG.debug(f"[raw_text]\n {cleaned_raw_text}")
-
-                # 处理表格内容
-                if tables:
-                    table = TableContent(tables)
-                    page.add_content(table)
-                    LOG.debug(f"[table]\n{table}")
-
-                book.add_page(page)
-
-        return book
\ No newline at end of file
+            # 根据是否指定了页码范围，确定要解析的页码数量
+            page_count = len(pdf.pages) if pages is None else pages
+
+            if self.workers == 1 or page_count <= 1:
+                for page_idx in range(page_count):
+                    yield self._parse_pdf_page(pdf.pages[page_idx])
+                return
+
+        yield from self._iter_pages_parallel(pdf_file_path, page_count)
+
+    def _iter_pages_parallel(self, pdf_file_path: str, page_count: int) -> Iterator[Page]:
+        """
+        将页码范围切分为连续的分片，由多个进程分别打开PDF解析，再按页码顺序合并产出。
+        同时提交的分片数有上限，避免解析远快于翻译时结果在内存中堆积。
+
+        参数:
+        - pdf_file_path: str，PDF文件的路径。
+        - page_count: int，要解析的页数。
+
+        返回:
+        - Iterator[Page]，按页码顺序产出的页面对象。
+        """
+        shard_size = max(1, min(self.MAX_SHARD_PAGES, math.ceil(page_count / (self.workers * 4))))
+        shards = deque((start, min(start + shard_size, page_count)) for start in range(0, page_count, shard_size))
+        LOG.debug(f"使用 {self.workers} 个进程解析 {page_count} 页，共 {len(shards)} 个分片")
+
+        # 解析进程以 spawn 方式启动：当前进程中已有翻译、限流等线程在运行，fork 会把它们持有的锁一并复制到子进程中，可能导致死锁
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            pending = deque()
+            while shards or pending:
+                while shards and len(pending) < self.workers * 2:
+                    start, stop = shards.popleft()
+                    pending.append(executor.submit(_parse_page_range, pdf_file_path, start, stop))
+                yield from pending.popleft().result()
+
+    def _parse_pdf_page(self, pdf_page) -> Page:
+        """
+        解析单个PDF页面，并释放pdfplumber为该页缓存的布局对象，避免内存随页数增长。
+
+        参数:
+        - pdf_page: pdfplumber的页面对象。
+
+        返回:
+        - Page，包含该页文本和表格内容的页面对象。
+        """
+        try:
+            return self._parse_page(pdf_page)
+        finally:
+            pdf_page.close()
+
+    def _parse_page(self, pdf_page) -> Page:
+        """
+        解析单个PDF页面，提取文本和表格内容。
+
+        参数:
+        - pdf_page: pdfplumber的页面对象。
+
+        返回:
+        - Page，包含该页文本和表格内容的页面对象。
+        """
+        page = Page()
+
+        # 先定位表格，再只对表格区域以外的对象提取文本，表格中的文字不会混入正文
+        found_tables = pdf_page.find_tables()
+        tables = [table.extract() for table in found_tables]
+        table_bboxes = [table.bbox for table in found_tables]
+        if table_bboxes:
+            pdf_page = pdf_page.filter(lambda obj: not _in_any_bbox(obj, table_bboxes))
+        raw_text = pdf_page.extract_text()
+
+        # 处理文本内容
+        if raw_text:
+            # 清理文本，移除空行和首尾空白字符
+            raw_text_lines = raw_text.splitlines()
+            cleaned_raw_text_lines = [line.strip() for line in raw_text_lines if line.strip()]
+            cleaned_raw_text = "\n".join(cleaned_raw_text_lines)
+
+            text_content = Content(content_type=ContentType.TEXT, original=cleaned_raw_text)
+            page.add_content(text_content)
+            LOG.debug(f"[raw_text]\n {cleaned_raw_text}")
+
+        # 处理表格内容，每个表格作为一个独立的内容
+        for table_data in tables:
+            if not table_data:
+                continue
+            table = TableContent(table_data)
+            page.add_content(table)
+            LOG.debug(f"[table]\n{table}")
+
+        return page
+
+
+def _in_any_bbox(obj, bboxes) -> bool:
+    """
+    判断页面对象的中心点是否落在任一区域内。
+
+    参数:
+    - obj: dict，pdfplumber的页面对象，包含 x0、x1、top、bottom。
+    - bboxes: 区域列表，每项为 (x0, top, x1, bottom)。
+
+    返回:
+    - bool，是否落在某个区域内。
+    """
+    if "x0" not in obj or "top" not in obj:
+        return False
+    x = (obj["x0"] + obj["x1"]) / 2
+    y = (obj["top"] + obj["bottom"]) / 2
+    return any(x0 <= x <= x1 and top <= y <= bottom for x0, top, x1, bottom in bboxes)
+
+
+def _parse_page_range(pdf_file_path: str, start: int, stop: int) -> List[Page]:
+    """
+    在工作进程中打开PDF并解析 [start, stop) 范围内的页面。
+
+    参数:
+    - pdf_file_path: str，PDF文件的路径。
+    - start: int，起始页索引（包含）。
+    - stop: int，结束页索引（不包含）。
+
+    返回:
+    - List[Page]，按页码顺序排列的页面对象。
+    """
+    import pdfplumber
+
+    parser = PDFParser()
+    with pdfplumber.open(pdf_file_path) as pdf:
+        return [parser._parse_pdf_page(pdf.pages[page_idx]) for page_idx in range(start, stop)]
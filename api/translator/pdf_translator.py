@@ -1,55 +1,1165 @@
-from typing import Optional
+import asyncio
+import functools
+import queue
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Iterable, Iterator, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from book import Book, Page, Content, ContentType
 from model import Model
+from translator.async_executor import AsyncExecutor
+from translator.checkpoint import CheckpointJournal
+from translator.content_filter import ContentFilter
+from translator.fair_executor import FairExecutor
 from translator.pdf_parser import PDFParser
+from translator.segment_index import DIGITS_PATTERN, SegmentIndex, segment_key
+from translator.text_chunker import TextChunker
 from translator.writer import Writer
-from utils import LOG
+from utils import LOG, METRICS
 
 class PDFTranslator:
     """
     PDF翻译器类，用于将PDF文件中的文本内容翻译成指定语言，并将翻译结果保存到新的PDF文件中。
-    
+
     参数:
     - model: Model类型的实例，用于执行翻译任务。
+    - concurrency: int，同时进行中的翻译请求数上限，默认为1（顺序执行）。
+    - streaming: bool，是否使用“解析→翻译→写入”流水线模式，默认为False。
+    - queue_size: int，流水线模式下已解析待翻译、以及翻译中尚未写出的页面数上限。
+    - parse_workers: int，解析PDF使用的进程数，默认为1。
+    - batch_max_chars: int，批量翻译时单个请求中原文的字符数上限，0表示不打包。
+    - checkpoint_dir: str，检查点目录；设置后每个内容翻译完成即写入检查点，可在中断后恢复。
+    - executor: FairExecutor，可选，多本书共享的翻译线程池；设置后并发数由共享线程池决定，concurrency 不再生效。
+    - content_filter: ContentFilter，可选，翻译前识别无需翻译的内容（页码、数字、URL、代码、已是目标语言的文本），直接以原文作为译文。
+    - render_workers: int，渲染PDF输出使用的进程数，默认为1。
+    - pdf_chunk_pages: int，PDF输出按块渲染时每块的页数。
+    - segment_options: dict，可选，SegmentIndex 的参数；设置后每本书建立重复片段索引，启用批量翻译时页眉页脚只翻译一次，近似重复的段落复用已有译文。
+    - async_requests: bool，是否以协程方式发送翻译请求：所有请求在一个事件循环线程中并发等待，concurrency 为进行中的请求数上限，
+      可以设置到数百。设置了 executor 时不生效。
     """
-    def __init__(self, model: Model):
+
+    # 表格翻译结果中缺失或格式不对的单元格最多重新请求的轮数，之后由调度器逐个单元格重试
+    TABLE_RETRIES = 2
+    def __init__(self, model: Model, concurrency: int = 1, streaming: bool = False, queue_size: int = 8, parse_workers: int = 1, batch_max_chars: int = 0,
+                 checkpoint_dir: str = None, executor: FairExecutor = None,
+                 content_filter: ContentFilter = None, render_workers: int = 1, pdf_chunk_pages: int = 32, segment_options: dict = None,
+                 async_requests: bool = False):
         """
         初始化PDF翻译器实例。
-        
+
         参数:
         - model: Model类型的实例，用于执行翻译任务。
+        - concurrency: int，同时进行中的翻译请求数上限，默认为1（顺序执行）。
+        - streaming: bool，是否使用“解析→翻译→写入”流水线模式，默认为False。
+        - queue_size: int，流水线模式下已解析待翻译、以及翻译中尚未写出的页面数上限。
+        - parse_workers: int，解析PDF使用的进程数，默认为1。
+        - batch_max_chars: int，批量翻译时单个请求中原文的字符数上限，0表示不打包。
+        - checkpoint_dir: str，检查点目录；设置后每个内容翻译完成即写入检查点，可在中断后恢复。
+        - executor: FairExecutor，可选，多本书共享的翻译线程池；设置后并发数由共享线程池决定，concurrency 不再生效。
+        - content_filter: ContentFilter，可选，翻译前识别无需翻译的内容（页码、数字、URL、代码、已是目标语言的文本），直接以原文作为译文。
+        - render_workers: int，渲染PDF输出使用的进程数，默认为1。
+        - pdf_chunk_pages: int，PDF输出按块渲染时每块的页数。
+        - segment_options: dict，可选，SegmentIndex 的参数；设置后每本书建立重复片段索引，启用批量翻译时页眉页脚只翻译一次，近似重复的段落复用已有译文。
+        - async_requests: bool，是否以协程方式发送翻译请求，进行中的请求数上限为 concurrency。设置了 executor 时不生效。
         """
         self.model = model
-        self.pdf_parser = PDFParser()  # PDF解析器实例
-        self.writer = Writer()  # 文本写入器实例
+        self.concurrency = max(1, concurrency)  # 并发请求数上限，至少为1
+        self.streaming = streaming
+        self.queue_size = max(1, queue_size)
+        self.batch_max_chars = batch_max_chars
+        self.chunker = TextChunker(model.max_chunk_chars)  # 按模型配置切分过长的文本
+        self.checkpoint_dir = checkpoint_dir
+        self.executor = executor
+        self.content_filter = content_filter
+        self.segment_options = segment_options
+        self.async_requests = async_requests
+        self.pdf_parser = PDFParser(workers=parse_workers)  # PDF解析器实例
+        self.writer = Writer(render_workers=render_workers, pdf_chunk_pages=pdf_chunk_pages)  # 文本写入器实例
 
-    def translate_pdf(self, pdf_file_path: str, file_format: str = 'PDF', target_language: str = '中文', output_file_path: str = None, pages: Optional[int] = None):
+    def translate_pdf(self, pdf_file_path: str, file_format: str = 'PDF', target_language: str = '中文', output_file_path: str = None, pages: Optional[int] = None,
+                      resume: bool = False, progress_callback: Callable[[int, Optional[int]], None] = None,
+                      partial_callback: Callable[[int, int, str], None] = None, previous: Optional[str] = None):
         """
         翻译PDF文件，并将翻译结果保存到指定路径。
-        
+
         参数:
         - pdf_file_path: 要翻译的PDF文件路径。
         - file_format: 输出文件格式，默认为'PDF'。
         - target_language: 目标语言，默认为'中文'。
         - output_file_path: 保存翻译结果的文件路径，如果未指定，则不保存。
         - pages: 要翻译的PDF页面范围，可选参数，如果未指定，则翻译所有页面。
-        
+        - resume: 是否从检查点恢复已完成的翻译，只将尚未翻译的内容发送给模型。需要设置 checkpoint_dir。
+        - progress_callback: 可选，每完成一页调用一次，参数为已完成页数和总页数（流水线模式下总页数未知，为None）。
+        - partial_callback: 可选，模型支持流式返回时，文本内容每收到一部分译文调用一次，参数为页码索引、内容索引和目前为止的译文。
+          在翻译线程中调用，需要是线程安全的。表格不流式返回；最终写入页面的译文与不设置时相同。
+        - previous: 可选，增量翻译：上一版本的PDF文件路径或其检查点文件路径。与上一版本原文相同的内容复用上一版本的译文，
+          只将新增或修改的内容发送给模型。需要设置 checkpoint_dir，且上一版本翻译时也记录了检查点。
+
         返回值:
         无
         """
-        # 解析PDF文件
-        self.book = self.pdf_parser.parse_pdf(pdf_file_path, pages)
-
-        # 遍历并翻译每一页的内容
-        for page_idx, page in enumerate(self.book.pages):
-            for content_idx, content in enumerate(page.contents):
-                # 为当前内容生成翻译提示，并进行翻译
-                prompt = self.model.translate_prompt(content, target_language)
-                LOG.debug(prompt)
-                translation, status = self.model.make_request(prompt)
-                LOG.info(translation)
-                
-                # 直接更新页面内容的翻译
-                self.book.pages[page_idx].contents[content_idx].set_translation(translation, status)
-
-        # 保存翻译后的书籍
-        self.writer.save_translated_book(self.book, output_file_path, file_format)
\ No newline at end of file
+        self._translate_pdf(pdf_file_path, file_format, target_language, output_file_path, pages, resume, progress_callback, partial_callback, previous)
+
+    async def translate_pdf_async(self, pdf_file_path: str, file_format: str = 'PDF', target_language: str = '中文', output_file_path: str = None,
+                                  pages: Optional[int] = None, resume: bool = False, progress_callback: Callable[[int, Optional[int]], None] = None,
+                                  partial_callback: Callable[[int, int, str], None] = None, previous: Optional[str] = None):
+        """
+        translate_pdf 的asyncio版本：翻译请求以协程方式在调用方的事件循环中并发执行，进行中的请求数不超过 concurrency，
+        不受 async_requests 设置的影响。解析、调度和写出等阻塞的工作在默认线程池的一个线程中进行，不阻塞事件循环。
+        参数与 translate_pdf 相同，progress_callback 在该工作线程中调用，partial_callback 在事件循环中调用。
+        模型的异步客户端绑定在调用方的事件循环上，不再使用时可以 await model.aclose() 关闭。
+
+        返回值:
+        无
+        """
+        await asyncio.to_thread(self._translate_pdf, pdf_file_path, file_format, target_language, output_file_path, pages, resume,
+                                progress_callback, partial_callback, previous, asyncio.get_running_loop())
+
+    def _translate_pdf(self, pdf_file_path: str, file_format: str, target_language: str, output_file_path: Optional[str], pages: Optional[int],
+                       resume: bool, progress_callback: Callable[[int, Optional[int]], None], partial_callback: Callable[[int, int, str], None],
+                       previous: Optional[str], request_loop: Optional[asyncio.AbstractEventLoop] = None):
+        """
+        translate_pdf 的实现。request_loop 不为None时，翻译请求以协程方式提交到该事件循环（见 _TranslationScheduler）。
+        """
+        journal = None
+        if self.checkpoint_dir is not None:
+            journal = CheckpointJournal(pdf_file_path, target_language, self.checkpoint_dir, resume=resume, previous=previous)
+        elif resume or previous is not None:
+            LOG.warning("未设置检查点目录，无法恢复翻译或复用上一版本的译文，将翻译全部内容")
+
+        try:
+            if self.streaming:
+                self._translate_pdf_streaming(pdf_file_path, file_format, target_language, output_file_path, pages, journal, progress_callback, partial_callback,
+                                              request_loop)
+                return
+
+            # 解析PDF文件
+            self.book = self.pdf_parser.parse_pdf(pdf_file_path, pages)
+
+            # 整本书解析完成后建立重复片段索引
+            segment_index = self._create_segment_index()
+            if segment_index is not None:
+                for page in self.book.pages:
+                    segment_index.add_page(page)
+
+            # 翻译每一页的内容，结果直接写回页面内容
+            on_page_done = self._with_progress(None, progress_callback, len(self.book.pages))
+            self._translate_pages(self.book.pages, target_language, on_page_done, journal=journal, partial_callback=partial_callback,
+                                  segment_index=segment_index, request_loop=request_loop)
+
+            # 保存翻译后的书籍
+            self.writer.save_translated_book(self.book, output_file_path, file_format)
+        finally:
+            if journal is not None:
+                journal.close()
+
+    def _create_segment_index(self) -> Optional[SegmentIndex]:
+        """
+        为一本书创建新的重复片段索引，未设置 segment_options 时返回None。
+        """
+        return SegmentIndex(**self.segment_options) if self.segment_options is not None else None
+
+    def _translate_content(self, content, target_language: str, on_partial: Callable[[str], None] = None):
+        """
+        为单个内容生成翻译提示并请求模型翻译。
+
+        参数:
+        - content: 待翻译的内容对象。
+        - target_language: 目标语言。
+        - on_partial: 可选，接收部分译文的回调函数。
+
+        返回:
+        - 一个元组，包含翻译结果和表示请求是否成功的布尔值。
+        """
+        prompt = self.model.translate_prompt(content, target_language)
+        LOG.debug(prompt)
+        translation, status = self.model.request(prompt, on_partial=on_partial)
+        LOG.info(translation)
+        return translation, status
+
+    async def _translate_content_async(self, content, target_language: str, on_partial: Callable[[str], None] = None):
+        """
+        _translate_content 的异步版本。
+
+        参数:
+        - content: 待翻译的内容对象。
+        - target_language: 目标语言。
+        - on_partial: 可选，接收部分译文的回调函数。
+
+        返回:
+        - 一个元组，包含翻译结果和表示请求是否成功的布尔值。
+        """
+        prompt = self.model.translate_prompt(content, target_language)
+        LOG.debug(prompt)
+        translation, status = await self.model.request_async(prompt, on_partial=on_partial)
+        LOG.info(translation)
+        return translation, status
+
+    def _translate_batch(self, contents, target_language: str, on_partials: list = None):
+        """
+        将多段文本内容打包为一个请求翻译，再按分段标记拆回各段译文。
+        返回的分段与请求不一致时，退回为逐条翻译。
+
+        参数:
+        - contents: 待翻译的文本内容对象列表。
+        - target_language: 目标语言。
+        - on_partials: 可选，与 contents 一一对应的部分译文回调函数（可以为None）。流式返回时按分段标记分发给各段。
+
+        返回:
+        - 列表，与 contents 一一对应的 (翻译结果, 是否成功) 元组。
+        """
+        on_partials = on_partials or [None] * len(contents)
+        prompt, validator, on_partial = self._prepare_batch(contents, target_language, on_partials)
+        translation, status = self.model.request(prompt, validator=validator, on_partial=on_partial)
+        segments = self.model.split_batch_translation(translation, len(contents)) if status else None
+        if segments is None:
+            LOG.warning(f"批量翻译的返回结果无法拆分为 {len(contents)} 段，改为逐条翻译")
+            return [self._translate_content(content, target_language, callback) for content, callback in zip(contents, on_partials)]
+
+        LOG.info(translation)
+        return [(segment, True) for segment in segments]
+
+    async def _translate_batch_async(self, contents, target_language: str, on_partials: list = None):
+        """
+        _translate_batch 的异步版本，退回为逐条翻译时各条并发请求。
+
+        参数:
+        - contents: 待翻译的文本内容对象列表。
+        - target_language: 目标语言。
+        - on_partials: 可选，与 contents 一一对应的部分译文回调函数（可以为None）。
+
+        返回:
+        - 列表，与 contents 一一对应的 (翻译结果, 是否成功) 元组。
+        """
+        on_partials = on_partials or [None] * len(contents)
+        prompt, validator, on_partial = self._prepare_batch(contents, target_language, on_partials)
+        translation, status = await self.model.request_async(prompt, validator=validator, on_partial=on_partial)
+        segments = self.model.split_batch_translation(translation, len(contents)) if status else None
+        if segments is None:
+            LOG.warning(f"批量翻译的返回结果无法拆分为 {len(contents)} 段，改为逐条翻译")
+            return list(await asyncio.gather(*(
+                self._translate_content_async(content, target_language, callback) for content, callback in zip(contents, on_partials)
+            )))
+
+        LOG.info(translation)
+        return [(segment, True) for segment in segments]
+
+    def _translate_table_cells(self, cells: dict, target_language: str) -> dict:
+        """
+        按表格翻译协议翻译一组单元格。返回结果逐个单元格校验，缺失或格式不对的单元格只将这些单元格重新请求，
+        最多 TABLE_RETRIES 轮，已通过校验的单元格不会重新请求。
+
+        参数:
+        - cells: {单元格键: 原文}，见 TableContent.translatable_cell_keys。
+        - target_language: 目标语言。
+
+        返回:
+        - dict，{单元格键: (翻译结果, 是否成功)}，包括 cells 中的每个键；仍未翻译的单元格为 (原文, False)。
+        """
+        results = {}
+        pending = cells
+        for _ in range(self.TABLE_RETRIES + 1):
+            prompt, validator = self._prepare_table(pending, target_language)
+            translation, status = self.model.request(prompt, validator=validator)
+            pending = self._merge_table_translation(pending, translation if status else "", results)
+            if not pending:
+                break
+        results.update((key, (cell, False)) for key, cell in pending.items())
+        return results
+
+    async def _translate_table_cells_async(self, cells: dict, target_language: str) -> dict:
+        """
+        _translate_table_cells 的异步版本。
+
+        参数:
+        - cells: {单元格键: 原文}。
+        - target_language: 目标语言。
+
+        返回:
+        - dict，{单元格键: (翻译结果, 是否成功)}。
+        """
+        results = {}
+        pending = cells
+        for _ in range(self.TABLE_RETRIES + 1):
+            prompt, validator = self._prepare_table(pending, target_language)
+            translation, status = await self.model.request_async(prompt, validator=validator)
+            pending = self._merge_table_translation(pending, translation if status else "", results)
+            if not pending:
+                break
+        results.update((key, (cell, False)) for key, cell in pending.items())
+        return results
+
+    def _prepare_table(self, cells: dict, target_language: str):
+        """
+        生成表格翻译的提示，以及只接受全部单元格都通过校验的结果的校验函数（部分缺失的结果不写入缓存）。
+
+        返回:
+        - 一个元组 (提示, 校验函数)。
+        """
+        prompt = self.model.make_table_prompt(cells, target_language)
+        LOG.debug(prompt)
+
+        def validator(result: str) -> bool:
+            return len(self.model.split_table_translation(result, cells)) == len(cells)
+
+        return prompt, validator
+
+    def _merge_table_translation(self, cells: dict, translation: str, results: dict) -> dict:
+        """
+        将一次表格请求中通过校验的单元格译文加入 results。
+
+        参数:
+        - cells: 本次请求的单元格 {单元格键: 原文}。
+        - translation: 模型返回的翻译结果，请求失败时为空字符串。
+        - results: 累积的结果 {单元格键: (翻译结果, True)}。
+
+        返回:
+        - dict，缺失或格式不对、需要重新请求的单元格 {单元格键: 原文}。
+        """
+        translated = self.model.split_table_translation(translation, cells)
+        LOG.info(translation)
+        results.update((key, (text, True)) for key, text in translated.items())
+        missing = {key: cell for key, cell in cells.items() if key not in translated}
+        if missing:
+            METRICS.inc("table_cells_missing", len(missing))
+            LOG.warning(f"表格翻译结果中 {len(missing)}/{len(cells)} 个单元格缺失或格式不对，只重新请求这些单元格")
+        return missing
+
+    def _prepare_batch(self, contents, target_language: str, on_partials: list):
+        """
+        生成批量翻译的提示、校验返回结果能否拆分的函数，以及按分段标记将部分译文分发给各段的回调。
+
+        返回:
+        - 一个元组 (提示, 校验函数, 部分译文回调)，各段都没有回调时部分译文回调为None。
+        """
+        texts = [content.original for content in contents]
+        prompt = self.model.make_batch_text_prompt(texts, target_language)
+        LOG.debug(prompt)
+        on_partial = None
+        if any(callback is not None for callback in on_partials):
+            def on_partial(partial: str):
+                for idx, text in self.model.split_partial_batch_translation(partial).items():
+                    if 1 <= idx <= len(on_partials) and on_partials[idx - 1] is not None:
+                        on_partials[idx - 1](text)
+
+        def validator(result: str) -> bool:
+            return self.model.split_batch_translation(result, len(texts)) is not None
+
+        return prompt, validator, on_partial
+
+    def _translate_pages(self, pages: Iterable[Page], target_language: str, on_page_done: Callable[[Page], None] = None, window_size: Optional[int] = None,
+                         journal: CheckpointJournal = None, partial_callback: Callable[[int, int, str], None] = None,
+                         segment_index: SegmentIndex = None, request_loop: Optional[asyncio.AbstractEventLoop] = None):
+        """
+        使用线程池翻译页面内容，进行中的请求数不超过 self.concurrency。
+        启用批量翻译时，相邻的短文本内容（可跨页）会被打包为一个请求。
+
+        每个翻译结果按其原始位置写回，set_translation 仅在当前线程中按页码顺序调用，
+        因此输出与顺序执行完全一致。
+
+        参数:
+        - pages: 可迭代的页面对象，按页码顺序产出。
+        - target_language: 目标语言。
+        - on_page_done: 可选，每页翻译完成后按页码顺序调用的回调函数。
+        - window_size: 可选，已提交翻译、尚未完成的页面数上限；为None时不限制。
+        - journal: 可选，检查点日志。检查点中已有的内容直接恢复，不再请求模型；新完成的翻译写入检查点。
+        - partial_callback: 可选，文本内容的部分译文回调，参数为页码索引、内容索引和目前为止的译文。
+        - segment_index: 可选，本书的重复片段索引，见 _TranslationScheduler。
+        - request_loop: 可选，以协程方式发送翻译请求的事件循环，见 _TranslationScheduler。
+        无需翻译的内容（见 content_filter）直接以原文作为译文。
+        """
+        scheduler = _TranslationScheduler(self, target_language, segment_index, request_loop)
+        window = deque()  # 已提交翻译、尚未完成的页面，按页码顺序排列
+        restored = 0  # 从检查点恢复的内容数
+        passed_through = 0  # 无需翻译、直接使用原文的内容数
+        passed_through_chars = 0
+        try:
+            for page_idx, page in enumerate(pages):
+                slots = []
+                for content_idx, content in enumerate(page.contents):
+                    rule = self.content_filter.classify(content, target_language) if self.content_filter is not None else None
+                    if rule is not None:
+                        slots.append(_Slot.completed((content.original, True)))
+                        METRICS.inc("contents_passed_through", rule=rule)
+                        METRICS.inc("chars_passed_through", len(content.original), rule=rule)
+                        passed_through += 1
+                        passed_through_chars += len(content.original)
+                        continue
+                    translation = journal.lookup(page_idx, content_idx, content) if journal is not None else None
+                    if translation is not None:
+                        slots.append(_Slot.completed((translation, True)))
+                        restored += 1
+                    else:
+                        on_partial = functools.partial(partial_callback, page_idx, content_idx) if partial_callback is not None else None
+                        slots.append(scheduler.submit(content, on_partial))
+                window.append((page_idx, page, slots))
+
+                # 完成已翻译完的页面；窗口已满时提交缓冲的批量请求，并阻塞等待最早提交的页面
+                while window:
+                    if all(slot.done() for slot in window[0][2]):
+                        self._finish_page(*window.popleft(), on_page_done, journal)
+                    elif window_size is not None and len(window) >= window_size:
+                        scheduler.flush()
+                        self._finish_page(*window.popleft(), on_page_done, journal)
+                    else:
+                        break
+                scheduler.compact()
+
+            scheduler.flush()
+            while window:
+                self._finish_page(*window.popleft(), on_page_done, journal)
+
+            reused = journal.previous_hits if journal is not None else 0
+            if restored > reused:
+                LOG.info(f"{restored - reused} 个内容从检查点恢复，未重新请求模型")
+            if reused:
+                LOG.info(f"{reused} 个内容与上一版本相同，复用上一版本的译文")
+            if passed_through:
+                LOG.info(f"{passed_through} 个内容（共 {passed_through_chars} 个字符）无需翻译，直接使用原文")
+            if scheduler.code_chars:
+                LOG.info(f"文本中 {scheduler.code_chars} 个字符的代码块保留原文，未翻译")
+            if segment_index is not None:
+                saved = scheduler.baseline.requests - scheduler.text_requests
+                if saved > 0:
+                    METRICS.inc("requests_saved", saved)
+                LOG.info(f"识别出 {segment_index.segment_count()} 个页眉页脚片段，{scheduler.segments_reused} 个重复和近似重复的片段复用已有译文；"
+                         f"文本请求 {scheduler.text_requests} 次，不使用重复片段索引时为 {scheduler.baseline.requests} 次")
+        except BaseException:
+            # 任一请求失败时取消尚未开始的请求，再将异常抛给调用方
+            scheduler.shutdown(cancel_futures=True)
+            raise
+        scheduler.shutdown()
+
+    def _finish_page(self, page_idx: int, page: Page, slots, on_page_done: Callable[[Page], None] = None, journal: CheckpointJournal = None):
+        """
+        等待一页的全部翻译完成，将翻译结果写回页面内容，并把成功的翻译写入检查点。
+
+        参数:
+        - page_idx: 页码索引。
+        - page: 页面对象。
+        - slots: 与 page.contents 一一对应的翻译结果位置。
+        - on_page_done: 可选，该页完成后调用的回调函数。
+        - journal: 可选，检查点日志。
+        """
+        for content_idx, (content, slot) in enumerate(zip(page.contents, slots)):
+            translation, status = slot.result()
+            content.set_translation(translation, status)
+            if journal is not None and content.status:
+                journal.record(page_idx, content_idx, content, translation)
+
+        if on_page_done is not None:
+            on_page_done(page)
+
+    def _translate_pdf_streaming(self, pdf_file_path: str, file_format: str, target_language: str, output_file_path: Optional[str], pages: Optional[int],
+                                 journal: CheckpointJournal = None, progress_callback: Callable[[int, Optional[int]], None] = None,
+                                 partial_callback: Callable[[int, int, str], None] = None, request_loop: Optional[asyncio.AbstractEventLoop] = None):
+        """
+        以流水线方式翻译PDF：后台线程逐页解析并放入有界队列，当前线程取出页面提交翻译，
+        按页码顺序将完成的页面写入输出流（Markdown按页追加，PDF按块渲染）。内存中同时存在的页面数与书的总页数无关。
+
+        参数:
+        - pdf_file_path: 要翻译的PDF文件路径。
+        - file_format: 输出文件格式。
+        - target_language: 目标语言。
+        - output_file_path: 保存翻译结果的文件路径。
+        - pages: 要翻译的PDF页面范围。
+        - journal: 可选，检查点日志。
+        - progress_callback: 可选，每完成一页调用一次的进度回调。
+        - partial_callback: 可选，文本内容的部分译文回调。
+        - request_loop: 可选，以协程方式发送翻译请求的事件循环。
+        """
+        self.book = Book(pdf_file_path)
+        stream = self.writer.open_page_stream(file_format, pdf_file_path, output_file_path)
+
+        page_queue = queue.Queue(maxsize=self.queue_size)
+        stop_event = threading.Event()
+        producer = threading.Thread(
+            target=self._produce_pages,
+            args=(pdf_file_path, pages, page_queue, stop_event),
+            name="pdf-parser",
+            daemon=True,
+        )
+        producer.start()
+
+        on_page_done = self._with_progress(stream.write_page, progress_callback, None)
+        # 流水线模式下页面流经时逐页建立重复片段索引
+        segment_index = self._create_segment_index()
+        pages_iter = self._consume_pages(page_queue)
+        if segment_index is not None:
+            pages_iter = segment_index.observe(pages_iter)
+        try:
+            self._translate_pages(pages_iter, target_language, on_page_done, self.queue_size, journal, partial_callback, segment_index, request_loop)
+        except BaseException:
+            stop_event.set()
+            stream.abort()
+            raise
+
+        producer.join()
+        stream.close()
+
+    @staticmethod
+    def _with_progress(on_page_done: Optional[Callable[[Page], None]], progress_callback: Optional[Callable[[int, Optional[int]], None]], total_pages: Optional[int]):
+        """
+        在每页完成的回调之后追加进度回调。
+
+        参数:
+        - on_page_done: 可选，原有的每页完成回调。
+        - progress_callback: 可选，进度回调，参数为已完成页数和总页数。
+        - total_pages: 总页数，未知时为None。
+
+        返回:
+        - 组合后的每页完成回调；两者都为None时返回None。
+        """
+        if progress_callback is None:
+            return on_page_done
+
+        pages_done = 0
+
+        def callback(page: Page):
+            nonlocal pages_done
+            if on_page_done is not None:
+                on_page_done(page)
+            pages_done += 1
+            progress_callback(pages_done, total_pages)
+
+        return callback
+
+    @staticmethod
+    def _consume_pages(page_queue: queue.Queue) -> Iterator[Page]:
+        """
+        从页面队列中依次取出解析好的页面，直到遇到结束标记；解析线程出错时抛出其异常。
+
+        参数:
+        - page_queue: 页面队列。
+
+        返回:
+        - Iterator[Page]，按页码顺序产出的页面对象。
+        """
+        while True:
+            item = page_queue.get()
+            if item is _END_OF_PAGES:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def _produce_pages(self, pdf_file_path: str, pages: Optional[int], page_queue: queue.Queue, stop_event: threading.Event):
+        """
+        解析线程：逐页解析PDF并放入有界队列，队列满时阻塞，从而限制已解析未翻译的页面数。
+        解析出错时将异常放入队列，由翻译线程抛出。
+
+        参数:
+        - pdf_file_path: 要翻译的PDF文件路径。
+        - pages: 要翻译的PDF页面范围。
+        - page_queue: 页面队列。
+        - stop_event: 翻译线程出错时设置，通知解析线程提前退出。
+        """
+        try:
+            for page in self.pdf_parser.iter_pages(pdf_file_path, pages):
+                if not self._put_page(page_queue, page, stop_event):
+                    return
+            self._put_page(page_queue, _END_OF_PAGES, stop_event)
+        except Exception as e:
+            self._put_page(page_queue, e, stop_event)
+
+    @staticmethod
+    def _put_page(page_queue: queue.Queue, item, stop_event: threading.Event) -> bool:
+        """
+        将元素放入队列，队列满时等待，直到放入成功或收到停止通知。
+
+        返回:
+        - bool，是否成功放入。
+        """
+        while not stop_event.is_set():
+            try:
+                page_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+
+# 解析线程放入队列的结束标记
+_END_OF_PAGES = object()
+
+
+def _join_partials(on_partial: Callable[[str], None], count: int, separators: list = None, initial: list = None) -> list:
+    """
+    为切分翻译的各块创建部分译文回调，任一块收到译文时，将各块目前为止的译文按顺序拼接后传给 on_partial。
+    各块可能在不同的翻译线程中同时返回。
+
+    参数:
+    - on_partial: 整段内容的部分译文回调。
+    - count: 块数。
+    - separators: 可选，相邻两块之间的分隔符，默认为换行。
+    - initial: 可选，各块一开始的译文，例如直接使用原文的代码块；默认均为空。
+
+    返回:
+    - 列表，与各块一一对应的回调函数。
+    """
+    parts = list(initial) if initial is not None else [""] * count
+    separators = separators or ["\n"] * (count - 1)
+    lock = threading.Lock()
+
+    def make_callback(index: int):
+        def callback(partial: str):
+            with lock:
+                parts[index] = partial
+                on_partial(_join_chunks(parts, separators))
+        return callback
+
+    return [make_callback(index) for index in range(count)]
+
+
+def _join_chunks(parts: list, separators: list) -> str:
+    """
+    按原文中的分隔符拼接各块的译文，略去空的块。
+    """
+    text = ""
+    for idx, part in enumerate(parts):
+        if part:
+            text = f"{text}{separators[idx - 1]}{part}" if text else part
+    return text
+
+
+class _BatchCounter:
+    """
+    按 _TranslationScheduler._submit 的批量规则累计文本块，只计算请求数，不提交请求。
+    用于估算不使用重复片段索引时的请求数。
+    """
+    __slots__ = ("budget", "max_items", "requests", "items", "chars")
+
+    def __init__(self, budget: int, max_items: int):
+        self.budget = budget
+        self.max_items = max_items
+        self.requests = 0
+        self.items = 0
+        self.chars = 0
+
+    def add(self, chars: int):
+        if self.budget <= 0 or chars >= self.budget:
+            self.requests += 1
+            return
+        if self.chars + chars > self.budget:
+            self.flush()
+        self.items += 1
+        self.chars += chars
+        if self.items >= self.max_items:
+            self.flush()
+
+    def flush(self):
+        if self.items:
+            self.requests += 1
+        self.items = 0
+        self.chars = 0
+
+
+class _Slot:
+    """
+    单个内容的翻译结果在某个翻译任务中的位置。批量翻译和表格翻译时多个内容共享同一任务，
+    按 index（批量请求中的序号或表格单元格的键）取各自的结果。
+    """
+    __slots__ = ("future", "index")
+
+    def __init__(self, future=None, index=None):
+        self.future = future
+        self.index = index
+
+    @classmethod
+    def completed(cls, result) -> "_Slot":
+        """
+        创建一个已有结果、不需要请求模型的位置，例如从检查点恢复的翻译。
+        """
+        future = Future()
+        future.set_result(result)
+        return cls(future)
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def result(self):
+        result = self.future.result()
+        return result if self.index is None else result[self.index]
+
+    def compact(self):
+        """
+        已完成的批量请求中的位置只保留自身的结果，不再引用整个请求的结果。
+        """
+        if self.index is not None and self.done():
+            result = self.result()
+            self.future = Future()
+            self.future.set_result(result)
+            self.index = None
+
+
+class _ChunkedSlot:
+    """
+    被切分为多块翻译的文本内容的结果位置，各块完成后按原顺序、以原文中的分隔符拼接为整段译文。
+    """
+    __slots__ = ("slots", "separators")
+
+    def __init__(self, slots, separators: list = None):
+        self.slots = slots
+        self.separators = separators or ["\n"] * (len(slots) - 1)  # 相邻两块之间的分隔符，默认为换行
+
+    def done(self) -> bool:
+        return all(slot.done() for slot in self.slots)
+
+    def result(self):
+        results = [slot.result() for slot in self.slots]
+        translation = _join_chunks([translation for translation, _ in results], self.separators)
+        return translation, all(status for _, status in results)
+
+    def compact(self):
+        for slot in self.slots:
+            slot.compact()
+
+
+class _TableSlot:
+    """
+    按单元格翻译的表格内容的结果位置。结果为 {单元格原文: 译文}，
+    翻译失败的单元格在取结果时单独重试一次，成功的单元格不会重新请求。
+    """
+    __slots__ = ("scheduler", "slots")
+
+    def __init__(self, scheduler: "_TranslationScheduler", slots: dict):
+        self.scheduler = scheduler
+        self.slots = slots  # {单元格原文: 结果位置}
+
+    def done(self) -> bool:
+        return all(slot.done() for slot in self.slots.values())
+
+    def result(self):
+        translations = {}
+        failed = []
+        for cell, slot in self.slots.items():
+            translation, status = slot.result()
+            if status:
+                translations[cell] = translation
+            else:
+                failed.append(cell)
+
+        if failed:
+            LOG.warning(f"表格中 {len(failed)} 个单元格翻译失败，只重试这些单元格")
+            for cell, (translation, status) in zip(failed, self.scheduler.retry_cells(failed)):
+                if status:
+                    translations[cell] = translation
+        return translations, len(translations) == len(self.slots)
+
+
+class _NumberedSegmentSlot:
+    """
+    与已提交的页眉页脚只有数字不同的行的结果位置。取结果时将已有译文中的数字按顺序替换为本行的数字；
+    已有译文中的数字与原文不一致（例如被翻译为中文数字）时，单独翻译本行。
+    """
+    __slots__ = ("scheduler", "line", "source_line", "source_slot")
+
+    def __init__(self, scheduler: "_TranslationScheduler", line: str, source_line: str, source_slot):
+        self.scheduler = scheduler
+        self.line = line
+        self.source_line = source_line
+        self.source_slot = source_slot
+
+    def done(self) -> bool:
+        return self.source_slot.done()
+
+    def result(self):
+        translation, status = self.source_slot.result()
+        if status and DIGITS_PATTERN.findall(translation) == DIGITS_PATTERN.findall(self.source_line):
+            numbers = iter(DIGITS_PATTERN.findall(self.line))
+            self.scheduler._reused("numbered_segment")
+            return DIGITS_PATTERN.sub(lambda _: next(numbers), translation), True
+        return self.scheduler.translate_now(self.line)
+
+
+class _TranslationScheduler:
+    """
+    将内容提交到线程池翻译。启用批量翻译时，短文本内容先在缓冲区中累积，
+    达到字符预算或条数上限、或调用 flush 时再作为一个请求提交。
+    表格按单元格翻译：需要翻译的单元格按表格翻译协议（以单元格位置为键的JSON对象）分组提交，
+    同一本书中相同的单元格只提交一次，数字、日期和空单元格不提交。
+    设置了重复片段索引时，启用批量翻译的情况下文本首尾的页眉页脚拆出后按行提交，相同的行只提交一次；
+    与已提交的段落相同或近似重复的正文直接复用其结果位置。这些结果位置按最近使用的顺序最多保留索引的 max_entries 个，
+    所在的页面写回后压缩为只保存自身的结果（见 compact）。
+    以协程方式发送请求时（设置了 request_loop 或翻译器的 async_requests），请求提交到 AsyncExecutor 的事件循环，
+    结果位置同样是 concurrent.futures.Future，调度和写回的逻辑与线程池相同。
+
+    参数:
+    - translator: PDFTranslator实例，提供翻译方法和并发、批量配置。
+    - target_language: 目标语言。
+    - segment_index: SegmentIndex，可选，本书的重复片段索引。
+    - request_loop: 可选，已在运行的事件循环；设置后翻译请求以协程方式在其中执行。
+    """
+
+    # 单个批量请求最多包含的内容条数
+    MAX_BATCH_ITEMS = 32
+    # 单个表格请求最多包含的单元格数
+    MAX_TABLE_CELLS = 64
+
+    def __init__(self, translator: "PDFTranslator", target_language: str, segment_index: SegmentIndex = None,
+                 request_loop: asyncio.AbstractEventLoop = None):
+        self.translator = translator
+        self.target_language = target_language
+        self.segment_index = segment_index
+        if translator.executor is not None:
+            self.executor = translator.executor.queue()
+        elif request_loop is not None:
+            self.executor = AsyncExecutor(translator.concurrency, request_loop)
+        elif translator.async_requests:
+            # 自建的事件循环在本书翻译结束时关闭，同时关闭模型在其中创建的异步客户端
+            self.executor = AsyncExecutor(translator.concurrency, on_close=translator.model.aclose)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=translator.concurrency, thread_name_prefix="translator")
+        # 提交给执行器的翻译函数：事件循环中执行协程函数，线程池中执行同步函数
+        if isinstance(self.executor, AsyncExecutor):
+            self.translate_content = translator._translate_content_async
+            self.translate_batch = translator._translate_batch_async
+            self.translate_table = translator._translate_table_cells_async
+        else:
+            self.translate_content = translator._translate_content
+            self.translate_batch = translator._translate_batch
+            self.translate_table = translator._translate_table_cells
+        self.batch = []  # 待提交的 (content, slot, on_partial)
+        self.batch_chars = 0
+        self.cell_slots = {}  # 本书中已提交的表格单元格 {单元格原文: 结果位置}
+        self.tables = 0  # 本书中已提交的表格数，用于生成单元格的键
+        self.table_batch = {}  # 待提交的表格单元格 {单元格键: (单元格原文, 结果位置)}
+        self.table_batch_chars = 0
+        self.segment_slots = OrderedDict()  # 本书中已提交的页眉页脚 {行原文: 结果位置}
+        self.numbered_slots = OrderedDict()  # 含数字的页眉页脚 {匹配键: (第一次出现的行原文, 结果位置)}
+        self.paragraph_slots = OrderedDict()  # 本书中已提交的正文 {代表段落原文: 结果位置}
+        self.uncompacted = []  # 加入上面各表、尚未压缩的结果位置
+        self.segments_reused = 0  # 复用已有结果、未提交的片段数
+        self.text_requests = 0  # 实际提交的文本请求数，批量请求计一次
+        self.baseline = _BatchCounter(translator.batch_max_chars, self.MAX_BATCH_ITEMS)  # 不使用重复片段索引时的文本请求数
+        self.code_chars = 0  # 文本中保留原文的代码块字符数
+
+    def submit(self, content, on_partial: Callable[[str], None] = None):
+        """
+        提交一个内容进行翻译。超过模型长度上限的文本先在句子边界切分，各块独立翻译。
+
+        :param content: 待翻译的内容对象。
+        :param on_partial: 可选，文本内容的部分译文回调；切分翻译时参数为各块目前为止的译文按顺序拼接的结果。
+            拆出页眉页脚时只包括正文的译文。
+        :return: 该内容的翻译结果位置。
+        """
+        if content.content_type == ContentType.TABLE:
+            return self._submit_table(content)
+        if content.content_type == ContentType.TEXT and self.segment_index is not None:
+            self._count_baseline(content.original)
+            # 拆出的页眉页脚是很短的独立请求，只有批量翻译时才能并入其他请求，否则只会增加请求数
+            if self.translator.batch_max_chars > 0:
+                return self._submit_segmented(content, on_partial)
+            return self._submit_paragraph(content, on_partial)
+        return self._submit_text(content, on_partial)
+
+    def _submit_segmented(self, content, on_partial: Callable[[str], None] = None):
+        """
+        用重复片段索引拆出文本首尾的页眉页脚，各行与正文分别提交，完成后按原顺序拼接。
+
+        :param content: 文本内容对象。
+        :param on_partial: 可选，正文的部分译文回调。
+        :return: 该内容的翻译结果位置。
+        """
+        head, body, tail = self.segment_index.split(content.original)
+        if not head and not tail:
+            return self._submit_paragraph(content, on_partial)
+
+        slots = [self._submit_segment(line) for line in head]
+        if body:
+            slots.append(self._submit_paragraph(Content(ContentType.TEXT, body), on_partial))
+        slots.extend(self._submit_segment(line) for line in tail)
+        return _ChunkedSlot(slots)
+
+    def _submit_segment(self, line: str):
+        """
+        提交一行页眉页脚，本书中已提交过的相同的行直接复用其结果；只有数字不同的行（例如带页码的页脚）
+        复用第一次出现时的译文并替换其中的数字。无需翻译的行（例如纯页码）直接使用原文。
+
+        :param line: 一行原文。
+        :return: 该行的翻译结果位置。
+        """
+        slot = self._recall(self.segment_slots, line)
+        if slot is not None:
+            self._reused("repeated_segment")
+            return slot
+        source = self._recall(self.numbered_slots, segment_key(line))
+        if source is not None:
+            return _NumberedSegmentSlot(self, line, *source)
+
+        segment = Content(ContentType.TEXT, line)
+        content_filter = self.translator.content_filter
+        rule = content_filter.classify(segment, self.target_language) if content_filter is not None else None
+        if rule is not None:
+            METRICS.inc("contents_passed_through", rule=rule)
+            METRICS.inc("chars_passed_through", len(line), rule=rule)
+            slot = _Slot.completed((line, True))
+        else:
+            slot = self._submit(segment)
+        self._remember(self.segment_slots, line, slot)
+        if DIGITS_PATTERN.search(line):
+            self._remember(self.numbered_slots, segment_key(line), (line, slot))
+        return slot
+
+    def _submit_paragraph(self, content, on_partial: Callable[[str], None] = None):
+        """
+        提交一段正文，与已提交的段落相同或近似重复时直接复用其结果位置。
+
+        :param content: 文本内容对象。
+        :param on_partial: 可选，部分译文回调。复用已有结果时不回调。
+        :return: 该段落的翻译结果位置。
+        """
+        representative = self.segment_index.match(content.original)
+        slot = self._recall(self.paragraph_slots, representative) if representative is not None else None
+        if slot is not None:
+            self._reused("duplicate" if representative == content.original else "near_duplicate")
+            return slot
+        # 代表段落的结果位置已被淘汰时重新提交。新的结果位置只登记在本段原文下，不冒充代表段落的译文
+        slot = self._submit_text(content, on_partial)
+        self._remember(self.paragraph_slots, content.original, slot)
+        return slot
+
+    def _recall(self, slots: OrderedDict, key):
+        """
+        从结果位置表中取出一项并标记为最近使用。
+
+        :param slots: 结果位置表。
+        :param key: 键。
+        :return: 对应的值，没有时返回None。
+        """
+        value = slots.get(key)
+        if value is not None:
+            slots.move_to_end(key)
+        return value
+
+    def _remember(self, slots: OrderedDict, key, value):
+        """
+        将一项加入结果位置表，超过索引的 max_entries 时淘汰最久未用到的一项。
+
+        :param slots: 结果位置表。
+        :param key: 键。
+        :param value: 结果位置，或 (行原文, 结果位置) 元组。
+        """
+        slots[key] = value
+        slots.move_to_end(key)
+        if len(slots) > self.segment_index.max_entries:
+            slots.popitem(last=False)
+        if slots is not self.numbered_slots:
+            self.uncompacted.append(value)
+
+    def compact(self):
+        """
+        压缩已完成的结果位置：批量请求中的位置只保留自身的结果，使已写回的页面不再通过各表引用整个请求的结果。
+        每写回一页调用一次。
+        """
+        pending = []
+        for slot in self.uncompacted:
+            if slot.done():
+                slot.compact()
+            else:
+                pending.append(slot)
+        self.uncompacted = pending
+
+    def _reused(self, reason: str):
+        self.segments_reused += 1
+        METRICS.inc("segments_reused", reason=reason)
+
+    def _count_baseline(self, text: str):
+        """
+        按不使用重复片段索引时的提交方式（代码块保留原文，其余文本按长度上限切分）把文本计入基准请求数。
+
+        :param text: 内容原文。
+        """
+        content_filter = self.translator.content_filter
+        blocks = content_filter.code_blocks(text) if content_filter is not None else [(False, text)]
+        for is_code, block in blocks:
+            if not is_code:
+                for chunk in self.translator.chunker.split(block):
+                    self.baseline.add(len(chunk))
+
+    def translate_now(self, text: str):
+        """
+        立即单独翻译一段文本并等待结果，用于无法复用已有译文的片段。
+
+        :param text: 原文。
+        :return: (翻译结果, 是否成功) 元组。
+        """
+        self.text_requests += 1
+        return self.executor.submit(self.translate_content, Content(ContentType.TEXT, text), self.target_language).result()
+
+    def _submit_text(self, content, on_partial: Callable[[str], None] = None):
+        """
+        提交一个文本内容。文本中夹杂的代码块（见 ContentFilter.code_blocks）直接使用原文，其余部分照常翻译。
+
+        :param content: 待翻译的内容对象。
+        :param on_partial: 可选，部分译文回调；参数中的代码块为原文，与最终的译文一致。
+        :return: 该内容的翻译结果位置。
+        """
+        content_filter = self.translator.content_filter
+        if content.content_type != ContentType.TEXT or content_filter is None:
+            return self._submit_chunks(content, on_partial)
+        blocks = content_filter.code_blocks(content.original)
+        if len(blocks) == 1 and not blocks[0][0]:
+            return self._submit_chunks(content, on_partial)
+
+        texts = [block for is_code, block in blocks if not is_code]
+        on_partials = [None] * len(blocks)
+        if on_partial is not None:
+            on_partials = _join_partials(on_partial, len(blocks), initial=[block if is_code else "" for is_code, block in blocks])
+        slots = []
+        for (is_code, block), callback in zip(blocks, on_partials):
+            if is_code:
+                self.code_chars += len(block)
+                METRICS.inc("chars_passed_through", len(block), rule="code")
+                slots.append(_Slot.completed((block, True)))
+            else:
+                slots.append(self._submit_chunks(Content(ContentType.TEXT, block), callback))
+        LOG.debug(f"文本中 {len(blocks) - len(texts)} 个代码块保留原文，其余 {len(texts)} 段照常翻译")
+        return _ChunkedSlot(slots)
+
+    def _submit_chunks(self, content, on_partial: Callable[[str], None] = None):
+        """
+        提交一个内容，文本超过模型长度上限时先切分。
+
+        :param content: 待翻译的内容对象。
+        :param on_partial: 可选，部分译文回调。
+        :return: 该内容的翻译结果位置。
+        """
+        if content.content_type == ContentType.TEXT:
+            chunks, separators = self.translator.chunker.split_with_separators(content.original)
+            if len(chunks) > 1:
+                LOG.debug(f"文本长度 {len(content.original)} 超过上限，切分为 {len(chunks)} 块翻译")
+                on_partials = _join_partials(on_partial, len(chunks), separators) if on_partial is not None else [None] * len(chunks)
+                slots = [self._submit(Content(ContentType.TEXT, chunk), callback) for chunk, callback in zip(chunks, on_partials)]
+                return _ChunkedSlot(slots, separators)
+        return self._submit(content, on_partial)
+
+    def _submit_table(self, content) -> _TableSlot:
+        """
+        按表格翻译协议提交表格中需要翻译的单元格，本书中已提交过的相同单元格直接复用其结果。
+        单元格的键以本书中的表格序号开头（例如 t3r2c1），多个表格的单元格可以在同一个请求中翻译：
+        启用批量翻译时尚未提交的单元格先在表格缓冲区中累积，调用 flush 时再提交；否则每个表格结束时立即提交。
+
+        :param content: 表格内容对象。
+        :return: 该表格的翻译结果位置。
+        """
+        self.tables += 1
+        slots = {}
+        for key, cell in content.translatable_cell_keys().items():
+            slot = self.cell_slots.get(cell)
+            if slot is None:
+                slot = self.cell_slots[cell] = _Slot(index=f"t{self.tables}{key}")
+                self._buffer_cell(cell, slot)
+            slots[cell] = slot
+        if self.translator.batch_max_chars <= 0:
+            self._flush_tables()
+        return _TableSlot(self, slots)
+
+    def _buffer_cell(self, cell: str, slot: _Slot):
+        """
+        将单元格放入表格缓冲区。单个表格请求的原文字符数不超过批量翻译的字符预算和模型的长度上限，
+        单元格数不超过 MAX_TABLE_CELLS，放不下时先提交缓冲区。
+
+        :param cell: 单元格原文。
+        :param slot: 单元格的结果位置，index 为单元格的键。
+        """
+        budgets = [budget for budget in (self.translator.batch_max_chars, self.translator.chunker.max_chars) if budget and budget > 0]
+        if self.table_batch and (len(self.table_batch) >= self.MAX_TABLE_CELLS
+                                 or (budgets and self.table_batch_chars + len(cell) > min(budgets))):
+            self._flush_tables()
+        self.table_batch[slot.index] = (cell, slot)
+        self.table_batch_chars += len(cell)
+
+    def _flush_tables(self):
+        """
+        将表格缓冲区中的单元格作为一个表格请求提交。
+        """
+        if not self.table_batch:
+            return
+        cells = {key: cell for key, (cell, _) in self.table_batch.items()}
+        future = self.executor.submit(self.translate_table, cells, self.target_language)
+        for _, slot in self.table_batch.values():
+            slot.future = future
+        self.table_batch = {}
+        self.table_batch_chars = 0
+
+    def retry_cells(self, cells):
+        """
+        逐个重新翻译失败的单元格，成功的结果替换本书中该单元格的结果位置，供后续表格复用。
+        已由其他表格重试成功的单元格直接使用其结果，不再重新请求。
+
+        :param cells: 单元格原文列表。
+        :return: 与 cells 一一对应的 (翻译结果, 是否成功) 元组列表。
+        """
+        futures = {}
+        for cell in cells:
+            slot = self.cell_slots.get(cell)
+            if slot is None or not slot.done() or not slot.result()[1]:
+                futures[cell] = self.executor.submit(self.translate_content, Content(ContentType.TEXT, cell), self.target_language)
+        results = []
+        for cell in cells:
+            if cell not in futures:
+                results.append(self.cell_slots[cell].result())
+                continue
+            result = futures[cell].result()
+            if result[1]:
+                self.cell_slots[cell] = _Slot.completed(result)
+            results.append(result)
+        return results
+
+    def _submit(self, content, on_partial: Callable[[str], None] = None) -> _Slot:
+        """
+        提交一个不需要再切分的内容，可批量的短文本先放入缓冲区。
+
+        :param content: 待翻译的内容对象。
+        :param on_partial: 可选，部分译文回调。
+        :return: 该内容的翻译结果位置。
+        """
+        budget = self.translator.batch_max_chars
+        if budget <= 0 or content.content_type != ContentType.TEXT or len(content.original) >= budget:
+            self.text_requests += 1
+            return _Slot(self.executor.submit(self.translate_content, content, self.target_language, on_partial))
+
+        if self.batch_chars + len(content.original) > budget:
+            self._flush_batch()
+        slot = _Slot()
+        self.batch.append((content, slot, on_partial))
+        self.batch_chars += len(content.original)
+        if len(self.batch) >= self.MAX_BATCH_ITEMS:
+            self._flush_batch()
+        return slot
+
+    def flush(self):
+        """
+        提交文本缓冲区和表格缓冲区中累积的内容。
+        """
+        self._flush_batch()
+        self._flush_tables()
+        self.baseline.flush()
+
+    def _flush_batch(self):
+        """
+        将文本缓冲区中累积的内容作为一个请求提交；只有一条时按普通请求提交。
+        """
+        if not self.batch:
+            return
+        self.text_requests += 1
+        contents = [content for content, _, _ in self.batch]
+        on_partials = [on_partial for _, _, on_partial in self.batch]
+        if len(contents) == 1:
+            self.batch[0][1].future = self.executor.submit(self.translate_content, contents[0], self.target_language, on_partials[0])
+        else:
+            future = self.executor.submit(self.translate_batch, contents, self.target_language, on_partials)
+            for index, (_, slot, _) in enumerate(self.batch):
+                slot.future = future
+                slot.index = index
+        self.batch = []
+        self.batch_chars = 0
+
+    def shutdown(self, cancel_futures: bool = False):
+        """
+        关闭线程池或事件循环执行器。
+
+        :param cancel_futures: 是否取消尚未开始的请求。
+        """
+        self.executor.shutdown(wait=True, cancel_futures=cancel_futures)
@@ -0,0 +1,240 @@
+import re
+from collections import OrderedDict, defaultdict
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from book import ContentType, Page
+
+# 归一化时合并的空白字符
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# 页眉页脚中随页变化的数字（页码、章节号）
+DIGITS_PATTERN = re.compile(r'\d+')
+
+
+def normalize_text(text: str) -> str:
+    """
+    归一化文本：合并空白字符并转换为小写。
+
+    :param text: 文本。
+    :return: 归一化后的文本。
+    """
+    return WHITESPACE_PATTERN.sub(' ', text).strip().lower()
+
+
+def segment_key(line: str) -> str:
+    """
+    页眉页脚的匹配键：在归一化的基础上将数字替换为 #，使 "Chapter 3 · Page 12" 与 "Chapter 3 · Page 13" 视为同一片段。
+
+    :param line: 一行文本。
+    :return: 匹配键。
+    """
+    return DIGITS_PATTERN.sub('#', normalize_text(line))
+
+
+class SegmentIndex:
+    """
+    一本书的重复片段索引，用于减少重复翻译。每本书使用一个新的实例。
+
+    - 页眉、页脚、版权行等在多页的首尾重复出现的行：按位置（页首或页尾）和出现的页数识别，
+      从页面文本中拆出后，相同的行在整本书中只翻译一次。只拆出完整的重复块：紧接在检查范围之外的一行也在重复时
+      （例如折成三行的版权声明只检查了两行），说明重复块超出了检查范围，不拆分，避免把一句话从中间切开。
+    - 近似重复的段落：用字符n-gram的Jaccard相似度查找此前出现过的段落，相似度不低于阈值、且其中的数字完全相同时复用其译文
+      （只有数字不同的段落，例如 "40 degrees" 与 "60 degrees"，必须分别翻译）。
+      每个段落的n-gram集合压缩为MinHash签名并按段（band）建立索引，查找时只对签名中至少一段相同的候选段落计算精确的相似度。
+
+    参数:
+    - min_repeats: int，一行至少在多少页的首尾出现才视为页眉页脚。
+    - edge_lines: int，每页的首尾各检查多少行。
+    - max_segment_chars: int，页眉页脚的最大字符数，更长的行视为正文。
+    - similarity: float，近似重复段落的Jaccard相似度阈值，1表示只复用归一化后完全相同的段落。
+    - ngram: int，计算相似度使用的字符n-gram长度。
+    - min_paragraph_chars: int，参与近似匹配的段落的最小字符数，更短的段落只复用完全相同的译文。
+    - max_entries: int，页眉页脚统计、段落和n-gram集合各自最多保留的条目数，超出时淘汰最久未用到的条目，
+      使流水线模式下的内存占用与书的长度无关。被淘汰的段落再次出现时按新段落处理。
+    """
+
+    # MinHash签名的长度，以及每个索引段包含的签名值个数。相似度为0.95的段落至少一段相同的概率接近1，
+    # 相似度为0.5的段落约为40%，不相关的段落几乎不会成为候选
+    SIGNATURE_SIZE = 32
+    BAND_ROWS = 4
+
+    def __init__(self, min_repeats: int = 3, edge_lines: int = 2, max_segment_chars: int = 120, similarity: float = 0.95,
+                 ngram: int = 3, min_paragraph_chars: int = 80, max_entries: int = 4096):
+        if not 0 < similarity <= 1:
+            raise ValueError(f"similarity must be in (0, 1], got {similarity}")
+        self.min_repeats = max(2, min_repeats)
+        self.edge_lines = max(1, edge_lines)
+        self.max_segment_chars = max_segment_chars
+        self.similarity = similarity
+        self.ngram = max(1, ngram)
+        self.min_paragraph_chars = min_paragraph_chars
+        self.max_entries = max(1, max_entries)
+
+        # 以下各表按最近使用的顺序排列，超过 max_entries 时从头部淘汰
+        self.segment_pages = OrderedDict()  # {(位置, 匹配键): 出现的页数}
+        self.paragraphs = OrderedDict()  # {归一化的段落: 代表段落原文}
+        self.shingles = OrderedDict()  # {段落编号: (n-gram集合, 代表段落原文, 索引段列表)}
+        self.bands = defaultdict(set)  # {(段序号, 签名段): {段落编号}}
+        self._next_id = 0
+
+    def add_page(self, page: Page):
+        """
+        统计页面文本首尾各行的出现次数，比 edge_lines 多统计一行，用于判断重复块是否超出检查范围。同一页中重复的行只计一次。
+
+        :param page: 页面对象。
+        """
+        seen = set()
+        for content in page.contents:
+            if content.content_type != ContentType.TEXT:
+                continue
+            lines = content.original.split("\n")
+            for position, edge in (("head", lines[:self.edge_lines + 1]), ("tail", lines[-self.edge_lines - 1:])):
+                for line in edge:
+                    if len(line) <= self.max_segment_chars:
+                        seen.add((position, segment_key(line)))
+        for key in seen:
+            self.segment_pages[key] = self.segment_pages.pop(key, 0) + 1
+        while len(self.segment_pages) > self.max_entries:
+            self.segment_pages.popitem(last=False)
+
+    def observe(self, pages: Iterable[Page]) -> Iterator[Page]:
+        """
+        在页面流经时逐页统计，用于流水线模式：页眉页脚在出现 min_repeats 次之后的页面中才能识别。
+
+        :param pages: 按页码顺序产出的页面对象。
+        :return: 原样产出的页面对象。
+        """
+        for page in pages:
+            self.add_page(page)
+            yield page
+
+    def is_segment(self, position: str, line: str) -> bool:
+        """
+        判断一行是否为指定位置的重复片段。
+
+        :param position: "head" 或 "tail"。
+        :param line: 一行文本。
+        :return: 是否为重复片段。
+        """
+        return len(line) <= self.max_segment_chars and self.segment_pages.get((position, segment_key(line)), 0) >= self.min_repeats
+
+    def split(self, text: str) -> Tuple[List[str], str, List[str]]:
+        """
+        将页面文本拆分为页首的重复片段、正文和页尾的重复片段。
+
+        :param text: 页面文本，按行分隔。
+        :return: (页首片段列表, 正文, 页尾片段列表)，正文可能为空字符串。
+        """
+        lines = text.split("\n")
+        head = 0
+        while head < min(self.edge_lines, len(lines)) and self.is_segment("head", lines[head]):
+            head += 1
+        if head == self.edge_lines and head < len(lines) and self.is_segment("head", lines[head]):
+            head = 0
+        tail = len(lines)
+        while tail > max(head, len(lines) - self.edge_lines) and self.is_segment("tail", lines[tail - 1]):
+            tail -= 1
+        if len(lines) - tail == self.edge_lines and tail > head and self.is_segment("tail", lines[tail - 1]):
+            tail = len(lines)
+        return lines[:head], "\n".join(lines[head:tail]), lines[tail:]
+
+    def match(self, text: str) -> Optional[str]:
+        """
+        查找与段落相同或近似重复的已有段落；没有时将该段落加入索引。
+
+        :param text: 段落原文。
+        :return: 已有的代表段落原文；没有匹配时返回None。
+        """
+        normalized = normalize_text(text)
+        representative = self.paragraphs.get(normalized)
+        if representative is not None:
+            self.paragraphs.move_to_end(normalized)
+            return representative
+        best = self._match_similar(normalized, text)
+        # 近似重复的段落记录其代表段落，再次出现时直接返回同一个代表段落
+        self.paragraphs[normalized] = best if best is not None else text
+        if len(self.paragraphs) > self.max_entries:
+            self.paragraphs.popitem(last=False)
+        return best
+
+    def _match_similar(self, normalized: str, text: str) -> Optional[str]:
+        """
+        用MinHash索引查找近似重复的已有段落；没有时将该段落的n-gram集合加入索引。
+
+        :param normalized: 归一化的段落。
+        :param text: 段落原文。
+        :return: 相似度最高的已有段落原文；没有达到阈值的段落时返回None。
+        """
+        if self.similarity >= 1 or len(normalized) < self.min_paragraph_chars:
+            return None
+        shingles = frozenset(normalized[i:i + self.ngram] for i in range(len(normalized) - self.ngram + 1))
+        if not shingles:
+            return None
+        bands = self._bands(shingles)
+        numbers = DIGITS_PATTERN.findall(normalized)
+        best, best_id, best_similarity = None, None, self.similarity
+        candidates = {paragraph_id for band in bands for paragraph_id in self.bands.get(band, ())}
+        for paragraph_id in candidates:
+            other, other_text, _ = self.shingles[paragraph_id]
+            # 数字不同的段落译文也不同，不能复用
+            if DIGITS_PATTERN.findall(other_text) != numbers:
+                continue
+            # 长度过滤：集合大小相差过多时相似度不可能达到阈值
+            if not self.similarity * len(shingles) <= len(other) <= len(shingles) / self.similarity:
+                continue
+            shared = len(shingles & other)
+            similarity = shared / (len(shingles) + len(other) - shared)
+            if similarity >= best_similarity:
+                best, best_id, best_similarity = other_text, paragraph_id, similarity
+        if best is not None:
+            self.shingles.move_to_end(best_id)
+            return best
+
+        paragraph_id = self._next_id
+        self._next_id += 1
+        self.shingles[paragraph_id] = (shingles, text, bands)
+        for band in bands:
+            self.bands[band].add(paragraph_id)
+        if len(self.shingles) > self.max_entries:
+            evicted_id, (_, _, evicted_bands) = self.shingles.popitem(last=False)
+            for band in evicted_bands:
+                members = self.bands[band]
+                members.discard(evicted_id)
+                if not members:
+                    del self.bands[band]
+        return None
+
+    def _bands(self, shingles: frozenset) -> list:
+        """
+        计算n-gram集合的MinHash签名（单次哈希、按哈希值分桶取最小值），并切分为索引段。
+
+        :param shingles: n-gram集合。
+        :return: [(段序号, 签名段), ...]。
+        """
+        signature = [None] * self.SIGNATURE_SIZE
+        for shingle in shingles:
+            value, bucket = divmod(hash(shingle), self.SIGNATURE_SIZE)
+            if signature[bucket] is None or value < signature[bucket]:
+                signature[bucket] = value
+        return [(start, tuple(signature[start:start + self.BAND_ROWS])) for start in range(0, self.SIGNATURE_SIZE, self.BAND_ROWS)]
+
+    def segment_count(self) -> int:
+        """
+        返回目前识别出的重复片段（按位置和匹配键）的个数。
+        """
+        return sum(1 for count in self.segment_pages.values() if count >= self.min_repeats)
+
+
+def segment_index_options(config: dict) -> Optional[dict]:
+    """
+    根据配置文件的 SegmentIndex 段生成创建 SegmentIndex 的参数，每本书用这些参数创建各自的索引。
+
+    参数:
+    - config: dict，加载后的配置。
+
+    返回:
+    - dict，配置中禁用时返回None。
+    """
+    options = dict(config.get('SegmentIndex', {}))
+    if not options.pop('enabled', True):
+        return None
+    return options
@@ -0,0 +1,113 @@
+import re
+from typing import List, Tuple
+
+# 句子边界：西文句末标点（可带一个右引号或右括号）之后的空白处，或中文句末标点之后
+SENTENCE_BOUNDARY_PATTERN = re.compile(
+    r'((?:(?<=[.!?;…])|(?<=[.!?;…]["\'”’)\]]))\s+'
+    r'|(?<=[。！？；])(?![”’」』）])\s*)'
+)
+# 行边界：解析器输出的文本按行分隔，不含空行
+LINE_BOUNDARY_PATTERN = re.compile(r'(\s*\n\s*)')
+
+
+class TextChunker:
+    """
+    文本分块器，在句子和行的边界处将过长的文本切分为不超过指定长度的块，块内保留原文的分隔符（换行或空格）。
+
+    参数:
+    - max_chars: int，每块的最大字符数。为None或不大于0时不切分。
+    """
+
+    def __init__(self, max_chars: int = None):
+        """
+        初始化文本分块器。
+
+        参数:
+        - max_chars: int，每块的最大字符数。为None或不大于0时不切分。
+        """
+        self.max_chars = max_chars if max_chars and max_chars > 0 else None
+
+    def split(self, text: str) -> List[str]:
+        """
+        将文本切分为若干块，优先在句子边界切分，其次在行边界，最后在空白处或按长度硬切分。
+
+        参数:
+        - text: str，要切分的文本。
+
+        返回:
+        - List[str]，按原文顺序排列的文本块；文本不超过长度上限时只包含原文本身。
+        """
+        return self.split_with_separators(text)[0]
+
+    def split_with_separators(self, text: str) -> Tuple[List[str], List[str]]:
+        """
+        与 split 相同，同时返回相邻两块之间原文中的分隔符，用于按原样拼接各块的译文。
+
+        参数:
+        - text: str，要切分的文本。
+
+        返回:
+        - 一个元组 (文本块列表, 分隔符列表)，分隔符比文本块少一个；分隔符含换行时为 "\\n"，否则为原文中的空白（可能为空字符串）。
+        """
+        if self.max_chars is None or len(text) <= self.max_chars:
+            return [text], []
+
+        # 相邻片段合并为尽量大的块，块内片段之间保留原文的分隔符
+        chunks = []
+        separators = []
+        current = ""
+        for separator, piece in self._split_pieces(text.strip()):
+            if current and len(current) + len(separator) + len(piece) > self.max_chars:
+                chunks.append(current)
+                separators.append("\n" if "\n" in separator else separator)
+                current = piece
+            else:
+                current = f"{current}{separator}{piece}" if current else piece
+        if current:
+            chunks.append(current)
+        return chunks, separators
+
+    def _split_pieces(self, text: str) -> List[Tuple[str, str]]:
+        """
+        将文本切分为句子，过长的句子继续在行边界、空白处或按长度切分。
+
+        参数:
+        - text: str，去掉首尾空白的文本。
+
+        返回:
+        - List[Tuple[str, str]]，(与前一片段之间的分隔符, 片段) 列表，每个片段都不超过长度上限；第一个片段的分隔符为空字符串。
+        """
+        pieces = []
+        for separator, sentence in _with_separators(SENTENCE_BOUNDARY_PATTERN.split(text)):
+            if len(sentence) <= self.max_chars:
+                pieces.append((separator, sentence))
+                continue
+            for line_separator, line in _with_separators(LINE_BOUNDARY_PATTERN.split(sentence)):
+                # 句子的第一行沿用句子之前的分隔符
+                separator, line_separator = "", separator or line_separator
+                while len(line) > self.max_chars:
+                    cut = line.rfind(" ", 0, self.max_chars + 1)
+                    if cut <= 0:
+                        cut = self.max_chars
+                    pieces.append((line_separator, line[:cut]))
+                    rest = line[cut:]
+                    line = rest.lstrip()
+                    line_separator = rest[:len(rest) - len(line)]
+                if line:
+                    pieces.append((line_separator, line))
+        return pieces
+
+
+def _with_separators(parts: List[str]) -> List[Tuple[str, str]]:
+    """
+    将 re.split（带一个捕获组）的结果 [片段, 分隔符, 片段, ...] 转换为 [(分隔符, 片段), ...]，略去空片段。
+    """
+    result = []
+    separator = ""
+    for idx, part in enumerate(parts):
+        if idx % 2:
+            separator += part
+        elif part:
+            result.append((separator, part))
+            separator = ""
+    return result
@@ -1,25 +1,42 @@
+import multiprocessing
 import os
-from reportlab.lib import colors, pagesizes, units
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-)
+import shutil
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from book import Book, Page, ContentType
+from utils import LOG, METRICS
+
+# PDF输出使用的中文字体
+PDF_FONT_NAME = "SimSun"
+PDF_FONT_PATH = "../fonts/simsun.ttc"  # 请根据实际路径进行修改
+
+_registered_fonts = set()
+_font_lock = threading.Lock()
 
-from book import Book, ContentType
-from utils import LOG
 
 class Writer:
     """
     写入器类，用于将书籍内容保存为不同格式的文件。
+
+    参数:
+    - render_workers: int，渲染PDF使用的进程数，默认为1（在当前进程中渲染）。
+    - pdf_chunk_pages: int，PDF按块渲染时每块的页数，同时在内存中缓冲的页面数不超过该值。
     """
-    def __init__(self):
+    def __init__(self, render_workers: int = 1, pdf_chunk_pages: int = 32):
         """
         初始化写入器。
+
+        :param render_workers: 渲染PDF使用的进程数，默认为1（在当前进程中渲染）。
+        :param pdf_chunk_pages: PDF按块渲染时每块的页数。
         """
-        pass
+        self.render_workers = max(1, render_workers)
+        self.pdf_chunk_pages = max(1, pdf_chunk_pages)
 
+    @METRICS.timed("write")
     def save_translated_book(self, book: Book, output_file_path: str = None, file_format: str = "PDF"):
         """
         将翻译后的书籍内容保存为指定格式的文件。
@@ -43,58 +60,9 @@ class Writer:
         :param book: 要保存的书籍对象。
         :param output_file_path: 输出文件路径，默认为None，如果为None，则基于原PDF文件路径生成。
         """
-        if output_file_path is None:
-            output_file_path = book.pdf_file_path.replace('.pdf', f'_translated.pdf')
-
-        LOG.info(f"pdf_file_path: {book.pdf_file_path}")
-        LOG.info(f"开始翻译: {output_file_path}")
-
-        # 注册中文字体
-        font_path = "../fonts/simsun.ttc"  # 请根据实际路径进行修改
-        pdfmetrics.registerFont(TTFont("SimSun", font_path))
-
-        # 创建新的段落样式，使用SimSun字体
-        simsun_style = ParagraphStyle('SimSun', fontName='SimSun', fontSize=12, leading=14)
-
-        # 创建PDF文档
-        doc = SimpleDocTemplate(output_file_path, pagesize=pagesizes.letter)
-        styles = getSampleStyleSheet()
-        story = []
-
-        # 遍历页面和内容
-        for page in book.pages:
-            for content in page.contents:
-                if content.status:
-                    if content.content_type == ContentType.TEXT:
-                        # 将翻译后的文本添加到PDF中
-                        text = content.translation
-                        para = Paragraph(text, simsun_style)
-                        story.append(para)
-
-                    elif content.content_type == ContentType.TABLE:
-                        # 将表格添加到PDF中
-                        table = content.translation
-                        table_style = TableStyle([
-                            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                            ('FONTNAME', (0, 0), (-1, 0), 'SimSun'),  # 更改表头字体为 "SimSun"
-                            ('FONTSIZE', (0, 0), (-1, 0), 14),
-                            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                            ('FONTNAME', (0, 1), (-1, -1), 'SimSun'),  # 更改表格中的字体为 "SimSun"
-                            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                        ])
-                        pdf_table = Table(table.values.tolist())
-                        pdf_table.setStyle(table_style)
-                        story.append(pdf_table)
-            # 在每个页面后添加分页符，除了最后一页
-            if page != book.pages[-1]:
-                story.append(PageBreak())
-
-        # 将翻译后的书籍作为新的PDF文件保存
-        doc.build(story)
-        LOG.info(f"翻译完成: {output_file_path}")
+        with self.open_pdf_stream(book.pdf_file_path, output_file_path) as stream:
+            for page in book.pages:
+                stream.write_page(page)
 
     def _save_translated_book_markdown(self, book: Book, output_file_path: str = None):
         """
@@ -103,31 +71,344 @@ class Writer:
         :param book: 要保存的书籍对象。
         :param output_file_path: 输出文件路径，默认为None，如果为None，则基于原PDF文件路径生成。
         """
+        with self.open_markdown_stream(book.pdf_file_path, output_file_path) as stream:
+            for page in book.pages:
+                stream.write_page(page)
+
+    def open_page_stream(self, file_format: str, pdf_file_path: str, output_file_path: str = None):
+        """
+        按输出格式打开按页写入的输出流。
+
+        :param file_format: 输出文件格式，"PDF" 或 "Markdown"。
+        :param pdf_file_path: 原PDF文件路径。
+        :param output_file_path: 输出文件路径，默认为None，如果为None，则基于原PDF文件路径生成。
+        :return: MarkdownPageStream 或 PdfPageStream 实例。
+        :raises ValueError: 当指定的文件格式不受支持时。
+        """
+        if file_format.lower() == "pdf":
+            return self.open_pdf_stream(pdf_file_path, output_file_path)
+        if file_format.lower() == "markdown":
+            return self.open_markdown_stream(pdf_file_path, output_file_path)
+        raise ValueError(f"Unsupported file format: {file_format}")
+
+    def open_pdf_stream(self, pdf_file_path: str, output_file_path: str = None) -> "PdfPageStream":
+        """
+        打开一个按页写入的PDF输出流，页面按块渲染为临时的分段文件，关闭时合并为最终文件。
+
+        :param pdf_file_path: 原PDF文件路径。
+        :param output_file_path: 输出文件路径，默认为None，如果为None，则基于原PDF文件路径生成。
+        :return: PdfPageStream实例。
+        """
+        if output_file_path is None:
+            output_file_path = os.path.splitext(pdf_file_path)[0] + '_translated.pdf'
+        return PdfPageStream(pdf_file_path, output_file_path, self.pdf_chunk_pages, self.render_workers)
+
+    def open_markdown_stream(self, pdf_file_path: str, output_file_path: str = None) -> "MarkdownPageStream":
+        """
+        打开一个按页追加写入的Markdown输出流，用于流水线模式下边翻译边输出。
+
+        :param pdf_file_path: 原PDF文件路径。
+        :param output_file_path: 输出文件路径，默认为None，如果为None，则基于原PDF文件路径生成。
+        :return: MarkdownPageStream实例。
+        """
         if output_file_path is None:
-            output_file_path = book.pdf_file_path.replace('.pdf', f'_translated.md')
+            output_file_path = os.path.splitext(pdf_file_path)[0] + '_translated.md'
+        return MarkdownPageStream(pdf_file_path, output_file_path)
+
+
+def format_partial_markdown(pages: Dict[int, Dict[int, str]]) -> str:
+    """
+    将翻译中的页面的部分译文格式化为Markdown，页面和段落的分隔与 MarkdownPageStream 写出的完整页面一致。
+
+    :param pages: {页码索引: {内容索引: 目前为止的译文}}。
+    :return: Markdown字符串，按页码和内容顺序排列。
+    """
+    blocks = []
+    for page_idx in sorted(pages):
+        texts = pages[page_idx]
+        blocks.append(''.join(texts[content_idx] + '\n\n' for content_idx in sorted(texts)))
+    return '---\n\n'.join(blocks)
 
-        LOG.info(f"pdf_file_path: {book.pdf_file_path}")
+
+class MarkdownPageStream:
+    """
+    按页追加写入Markdown文件的输出流。每写完一页立即刷新到磁盘，运行过程中即可查看部分结果。
+
+    :param pdf_file_path: 原PDF文件路径。
+    :param output_file_path: 输出文件路径。
+    """
+    def __init__(self, pdf_file_path: str, output_file_path: str):
+        self.output_file_path = output_file_path
+        self.pages_written = 0
+
+        LOG.info(f"pdf_file_path: {pdf_file_path}")
         LOG.info(f"开始翻译: {output_file_path}")
-        with open(output_file_path, 'w', encoding='utf-8') as output_file:
-            # 遍历页面和内容
-            for page in book.pages:
-                for content in page.contents:
-                    if content.status:
-                        if content.content_type == ContentType.TEXT:
-                            # 将翻译后的文本添加到Markdown文件中
-                            text = content.translation
-                            output_file.write(text + '\n\n')
-
-                        elif content.content_type == ContentType.TABLE:
-                            # 将表格添加到Markdown文件中
-                            table = content.translation
-                            header = '| ' + ' | '.join(str(column) for column in table.columns) + ' |' + '\n'
-                            separator = '| ' + ' | '.join(['---'] * len(table.columns)) + ' |' + '\n'
-                            body = '\n'.join(['| ' + ' | '.join(str(cell) for cell in row) + ' |' for row in table.values.tolist()]) + '\n\n'
-                            output_file.write(header + separator + body)
-
-                # 在每个页面后添加分页符（水平分割线），除了最后一页
-                if page != book.pages[-1]:
-                    output_file.write('---\n\n')
-
-        LOG.info(f"翻译完成: {output_file_path}")
\ No newline at end of file
+        self.output_file = open(output_file_path, 'w', encoding='utf-8')
+
+    @METRICS.timed("write")
+    def write_page(self, page: Page):
+        """
+        将一页翻译后的内容追加到Markdown文件中。
+
+        :param page: 已完成翻译的页面对象。
+        """
+        # 在每个页面之间添加分页符（水平分割线）
+        if self.pages_written > 0:
+            self.output_file.write('---\n\n')
+
+        for content in page.contents:
+            if content.status:
+                if content.content_type == ContentType.TEXT:
+                    # 将翻译后的文本添加到Markdown文件中
+                    text = content.translation
+                    self.output_file.write(text + '\n\n')
+
+                elif content.content_type == ContentType.TABLE:
+                    # 将表格添加到Markdown文件中
+                    columns, *rows = content.translation
+                    header = '| ' + ' | '.join(str(column) for column in columns) + ' |' + '\n'
+                    separator = '| ' + ' | '.join(['---'] * len(columns)) + ' |' + '\n'
+                    body = '\n'.join(['| ' + ' | '.join(str(cell) for cell in row) + ' |' for row in rows]) + '\n\n'
+                    self.output_file.write(header + separator + body)
+
+        self.output_file.flush()
+        self.pages_written += 1
+
+    def close(self):
+        """
+        关闭输出文件。
+        """
+        if not self.output_file.closed:
+            self.output_file.close()
+            LOG.info(f"翻译完成: {self.output_file_path}")
+
+    def abort(self):
+        """
+        出错时关闭输出文件，保留已写出的部分结果，但不记录完成日志。
+        """
+        if not self.output_file.closed:
+            self.output_file.close()
+            LOG.warning(f"翻译中断，已写出 {self.pages_written} 页: {self.output_file_path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class PdfPageStream:
+    """
+    按页写入PDF文件的输出流。已完成的页面先转换为纯文本和表格行，每满 chunk_pages 页渲染为一个临时的分段PDF，
+    关闭时按顺序合并为最终文件。内存中只保留未渲染的页面，渲染可以在翻译进行中由多个进程并行完成。
+
+    :param pdf_file_path: 原PDF文件路径。
+    :param output_file_path: 输出文件路径。
+    :param chunk_pages: 每个分段的页数。
+    :param render_workers: 渲染使用的进程数，1表示在当前线程中渲染。
+    """
+    def __init__(self, pdf_file_path: str, output_file_path: str, chunk_pages: int = 32, render_workers: int = 1):
+        self.output_file_path = output_file_path
+        self.chunk_pages = max(1, chunk_pages)
+        self.render_workers = max(1, render_workers)
+        self.pages_written = 0
+        self.closed = False
+
+        LOG.info(f"pdf_file_path: {pdf_file_path}")
+        LOG.info(f"开始翻译: {output_file_path}")
+        self.parts_dir = tempfile.mkdtemp(prefix=".pdf_parts_", dir=os.path.dirname(os.path.abspath(output_file_path)))
+        self.part_paths = []
+        self.chunk = []  # 尚未渲染的页面，每页为 [(类型, 数据), ...]
+        self.pending = deque()  # 渲染中的分段
+        # 渲染进程以 spawn 方式启动，不从已运行翻译线程的当前进程 fork，避免子进程继承被其他线程持有的锁
+        self.executor = None
+        if self.render_workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=self.render_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    @METRICS.timed("write")
+    def write_page(self, page: Page):
+        """
+        将一页翻译后的内容加入当前分段，分段满页后提交渲染。
+
+        :param page: 已完成翻译的页面对象。
+        """
+        self.chunk.append(_page_elements(page))
+        self.pages_written += 1
+        # 多缓冲一页：只有确定分段的最后一页不是全书的最后一页，才能在其后添加分页符
+        if len(self.chunk) > self.chunk_pages:
+            chunk, self.chunk = self.chunk[:-1], self.chunk[-1:]
+            self._submit_chunk(chunk)
+
+    def _submit_chunk(self, chunk: List[List[Tuple[str, object]]]):
+        """
+        渲染一个不包含全书最后一页的分段。多进程渲染时同时渲染中的分段数有上限，避免翻译远快于渲染时页面在内存中堆积。
+
+        :param chunk: 分段中的页面。
+        """
+        part_path = os.path.join(self.parts_dir, f"part_{len(self.part_paths):05d}.pdf")
+        self.part_paths.append(part_path)
+        if self.executor is None:
+            _render_pdf_part(chunk, part_path, last=False)
+            return
+        while len(self.pending) >= self.render_workers * 2:
+            self.pending.popleft().result()
+        self.pending.append(self.executor.submit(_render_pdf_part, chunk, part_path, False))
+
+    @METRICS.timed("write")
+    def close(self):
+        """
+        渲染剩余页面，等待所有分段完成并合并为最终文件。
+        """
+        if self.closed:
+            return
+        try:
+            # 最后一个分段在当前进程中渲染，同时等待其他进程中的分段完成
+            part_path = os.path.join(self.parts_dir, f"part_{len(self.part_paths):05d}.pdf")
+            page_count = _render_pdf_part(self.chunk, part_path, last=True)
+            while self.pending:
+                self.pending.popleft().result()
+            # 只有一页空白页面的最后一个分段渲染后没有页面，除非整本书都没有其他页面，否则不合并
+            if page_count > 0 or not self.part_paths:
+                self.part_paths.append(part_path)
+            _concat_pdfs(self.part_paths, self.output_file_path)
+        finally:
+            self._cleanup()
+        LOG.info(f"翻译完成: {self.output_file_path}")
+
+    def abort(self):
+        """
+        出错时停止渲染并删除临时分段，不生成输出文件。
+        """
+        if self.closed:
+            return
+        self._cleanup()
+        LOG.warning(f"翻译中断，已写入 {self.pages_written} 页，未生成PDF文件: {self.output_file_path}")
+
+    def _cleanup(self):
+        self.closed = True
+        self.chunk = []
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+        self.pending.clear()
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def register_pdf_fonts():
+    """
+    注册PDF输出使用的中文字体。每个进程只注册一次，之后的调用直接返回。
+    """
+    if PDF_FONT_NAME in _registered_fonts:
+        return
+    with _font_lock:
+        if PDF_FONT_NAME in _registered_fonts:
+            return
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, PDF_FONT_PATH))
+        _registered_fonts.add(PDF_FONT_NAME)
+
+
+def _page_elements(page: Page) -> List[Tuple[str, object]]:
+    """
+    将页面中已翻译的内容转换为可在进程间传递的纯数据，之后不再引用页面对象。
+
+    :param page: 已完成翻译的页面对象。
+    :return: [("text", 译文) 或 ("table", 不含表头的行列表), ...]。
+    """
+    elements = []
+    for content in page.contents:
+        if content.status:
+            if content.content_type == ContentType.TEXT:
+                elements.append(("text", content.translation))
+            elif content.content_type == ContentType.TABLE and len(content.translation) > 1:
+                # 与原来写入 DataFrame.values 一致，PDF中的表格只包含数据行，不含表头
+                elements.append(("table", content.translation[1:]))
+    return elements
+
+
+def _render_pdf_part(pages: List[List[Tuple[str, object]]], part_path: str, last: bool = True) -> int:
+    """
+    将一个分段的页面渲染为PDF文件，可在工作进程中执行。每页之后添加分页符，全书的最后一页除外，
+    这样各分段合并后与一次性渲染整本书的页面完全一致。
+
+    :param pages: 分段中的页面，每页为 _page_elements 的返回值。
+    :param part_path: 分段PDF的保存路径。
+    :param last: 分段是否包含全书的最后一页。
+    :return: 渲染得到的页数。
+    """
+    # reportlab 只在输出PDF时导入，输出Markdown时不需要加载
+    from reportlab.lib import colors, pagesizes
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, PageBreak
+
+    register_pdf_fonts()
+
+    # 创建新的段落样式，使用SimSun字体
+    simsun_style = ParagraphStyle('SimSun', fontName=PDF_FONT_NAME, fontSize=12, leading=14)
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), PDF_FONT_NAME),  # 更改表头字体为 "SimSun"
+        ('FONTSIZE', (0, 0), (-1, 0), 14),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('FONTNAME', (0, 1), (-1, -1), PDF_FONT_NAME),  # 更改表格中的字体为 "SimSun"
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+
+    story = []
+    for page_idx, elements in enumerate(pages):
+        for kind, data in elements:
+            if kind == "text":
+                story.append(Paragraph(data, simsun_style))
+            else:
+                pdf_table = Table(data)
+                pdf_table.setStyle(table_style)
+                story.append(pdf_table)
+        if not last or page_idx != len(pages) - 1:
+            story.append(PageBreak())
+
+    doc = SimpleDocTemplate(part_path, pagesize=pagesizes.letter)
+    doc.build(story)
+    return doc.page
+
+
+def _concat_pdfs(part_paths: List[str], output_file_path: str):
+    """
+    按顺序合并分段PDF。只有一个分段时直接移动为输出文件。
+
+    :param part_paths: 分段PDF路径列表。
+    :param output_file_path: 输出文件路径。
+    """
+    if len(part_paths) == 1:
+        shutil.move(part_paths[0], output_file_path)
+        return
+
+    # pypdfium2 随 pdfplumber 一同安装
+    import pypdfium2 as pdfium
+
+    merged = pdfium.PdfDocument.new()
+    try:
+        for part_path in part_paths:
+            part = pdfium.PdfDocument(part_path)
+            try:
+                merged.import_pages(part)
+            finally:
+                part.close()
+        merged.save(output_file_path)
+    finally:
+        merged.close()
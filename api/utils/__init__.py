@@ -1,3 +1,4 @@
 from .argument_parser import ArgumentParser
 from .config_loader import ConfigLoader
-from .logger import LOG
\ No newline at end of file
+from .logger import LOG
+from .metrics import METRICS
@@ -23,12 +23,28 @@ class ArgumentParser:
         self.parser = argparse.ArgumentParser(description='Translate English PDF book to Chinese.')
         self.parser.add_argument('--config', type=str, default='config.yaml', help='Configuration file with model and API settings.')
         self.parser.add_argument('--model_type', type=str, required=True, choices=['GLMModel', 'OpenAIModel'], help='The type of translation model to use. Choose between "GLMModel" and "OpenAIModel".')        
-        self.parser.add_argument('--glm_model_url', type=str, help='The URL of the ChatGLM model URL.')
+        self.parser.add_argument('--glm_model_url', type=str, help='The URL of the ChatGLM model URL. Separate several replica URLs with commas.')
         self.parser.add_argument('--timeout', type=int, help='Timeout for the API request in seconds.')
         self.parser.add_argument('--openai_model', type=str, help='The model name of OpenAI Model. Required if model_type is "OpenAIModel".')
         self.parser.add_argument('--openai_api_key', type=str, help='The API key for OpenAIModel. Required if model_type is "OpenAIModel".')
         self.parser.add_argument('--book', type=str, help='PDF file to translate.')
+        self.parser.add_argument('--books', type=str, help='Batch mode: a directory, glob or manifest file (one PDF path per line) of PDFs to translate with one shared scheduler.')
+        self.parser.add_argument('--fairness', type=str, choices=['round_robin', 'fifo'], help='Batch mode: how concurrency is shared across books. round_robin interleaves books, fifo finishes books in order.')
+        self.parser.add_argument('--max_books', type=int, help='Batch mode: maximum number of books parsed and translated at the same time.')
         self.parser.add_argument('--file_format', type=str, help='The file format of translated book. Now supporting PDF and Markdown')
+        self.parser.add_argument('--concurrency', type=int, help='Maximum number of in-flight translation requests. Defaults to common.concurrency in config.yaml, which ships as 1 (sequential).')
+        self.parser.add_argument('--parse_workers', '--parse-workers', dest='parse_workers', type=int, help='Number of processes used to parse the PDF by page shards. Defaults to 1.')
+        self.parser.add_argument('--render_workers', type=int, help='Number of processes used to render PDF output by page chunks. Defaults to 1.')
+        self.parser.add_argument('--async_requests', action='store_true', help='Send translation requests as asyncio coroutines on one event-loop thread instead of one thread per request; --concurrency then bounds in-flight requests and can be set in the hundreds. Single-book mode only.')
+        self.parser.add_argument('--streaming', action='store_true', help='Parse, translate and write page by page with bounded memory. Markdown output is appended as pages finish, PDF output is rendered in page chunks.')
+        self.parser.add_argument('--batch_max_chars', type=int, help='Pack short text contents into one request up to this many characters. 0 disables batching.')
+        self.parser.add_argument('--resume', action='store_true', help='Resume an interrupted run from its checkpoint journal and only translate unfinished contents.')
+        self.parser.add_argument('--previous_book', type=str, help='Incremental mode: the previous revision of the book (or its checkpoint .jsonl). Contents unchanged since that revision reuse its translations; only new or changed contents are sent to the model.')
+        self.parser.add_argument('--no_cache', action='store_true', help='Bypass the persistent translation cache for this run.')
+        self.parser.add_argument('--no_content_filter', action='store_true', help='Send every content to the model, including page numbers, numbers, URLs, code and text already in the target language.')
+        self.parser.add_argument('--no_segment_index', action='store_true', help='Translate running headers, footers and near-duplicate paragraphs on every page instead of reusing translations within the book.')
+        self.parser.add_argument('--report', type=str, help='Write a JSON run report with per-stage timings and request counters to this path.')
+        self.parser.add_argument('--purge_cache', action='store_true', help='Delete all entries of the translation cache before translating.')
 
     def parse_arguments(self):
         """
@@ -0,0 +1,201 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StageStats:
+    """
+    单个阶段的耗时统计。
+    """
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+
+class Metrics:
+    """
+    线程安全的运行指标注册表：按阶段统计耗时，并按名称和标签累加计数器。
+    可以导出为JSON运行报告或Prometheus文本格式。
+
+    阶段耗时是各线程耗时之和，并发翻译时 request 阶段的总耗时可能大于运行的实际时间。
+    同一线程中嵌套进入同名阶段时只统计最外层，避免重复计时。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """
+        清空所有指标。
+        """
+        with self._lock:
+            self.started_at = time.time()
+            self.stages = {}  # {stage: StageStats}
+            self.counters = {}  # {(name, ((label, value), ...)): value}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """
+        累加计数器。
+
+        :param name: 计数器名称。
+        :param value: 增加的值。
+        :param labels: 可选的标签，不同标签组合分别计数。
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, stage: str, seconds: float):
+        """
+        记录某个阶段的一次耗时。
+
+        :param stage: 阶段名称。
+        :param seconds: 耗时（秒）。
+        """
+        with self._lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = StageStats()
+            stats.add(seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        """
+        统计 with 语句块耗时的上下文管理器。
+        """
+        active = self._active_stages()
+        if stage in active:
+            yield
+            return
+        active.add(stage)
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            active.discard(stage)
+            self.observe(stage, time.perf_counter() - started_at)
+
+    def timed(self, stage: str):
+        """
+        统计函数每次调用耗时的装饰器。
+        """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def timed_iter(self, stage: str):
+        """
+        统计生成器每产出一个元素耗时的装饰器，不包括调用方处理元素的时间。
+        """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                iterator = iter(fn(*args, **kwargs))
+                while True:
+                    started_at = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    self.observe(stage, time.perf_counter() - started_at)
+                    yield item
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> dict:
+        """
+        返回当前指标的字典表示。
+
+        :return: 包含运行时长、各阶段耗时和计数器的字典。
+        """
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": stats.count,
+                    "total_s": round(stats.total, 6),
+                    "avg_s": round(stats.total / stats.count, 6) if stats.count else 0.0,
+                    "max_s": round(stats.max, 6),
+                }
+                for stage, stats in sorted(self.stages.items())
+            }
+            counters = {}
+            for (name, labels), value in sorted(self.counters.items()):
+                if labels:
+                    label_key = ",".join(f"{label}={label_value}" for label, label_value in labels)
+                    counters.setdefault(name, {})[label_key] = value
+                else:
+                    counters[name] = value
+            return {"uptime_s": round(time.time() - self.started_at, 3), "stages": stages, "counters": counters}
+
+    def write_report(self, path: str, **extra):
+        """
+        将当前指标写入JSON运行报告。
+
+        :param path: 报告文件路径。
+        :param extra: 附加到报告中的其他字段，例如书名和模型。
+        """
+        report = {**extra, **self.snapshot()}
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    def to_prometheus(self, prefix: str = "ai_translator") -> str:
+        """
+        将当前指标导出为Prometheus文本格式。
+
+        :param prefix: 指标名称前缀。
+        :return: Prometheus文本格式的字符串。
+        """
+        with self._lock:
+            stages = sorted((stage, stats.count, stats.total, stats.max) for stage, stats in self.stages.items())
+            counters = sorted(self.counters.items())
+
+        lines = [
+            f"# TYPE {prefix}_stage_seconds_total counter",
+            *(f'{prefix}_stage_seconds_total{{stage="{stage}"}} {total}' for stage, _, total, _ in stages),
+            f"# TYPE {prefix}_stage_calls_total counter",
+            *(f'{prefix}_stage_calls_total{{stage="{stage}"}} {count}' for stage, count, _, _ in stages),
+            f"# TYPE {prefix}_stage_seconds_max gauge",
+            *(f'{prefix}_stage_seconds_max{{stage="{stage}"}} {max_seconds}' for stage, _, _, max_seconds in stages),
+        ]
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                declared.add(name)
+            label_str = ",".join(f'{label}="{_escape_label(label_value)}"' for label, label_value in labels)
+            lines.append(f"{prefix}_{name}_total{{{label_str}}} {value}" if label_str else f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def _active_stages(self) -> set:
+        active = getattr(self._local, "stages", None)
+        if active is None:
+            active = self._local.stages = set()
+        return active
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# 全局指标注册表
+METRICS = Metrics()
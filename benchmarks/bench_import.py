@@ -0,0 +1,78 @@
+"""
+冷启动导入耗时的基准测试：在全新的Python进程中导入各入口用到的模块，报告耗时的中位数，
+并列出加载了哪些较重的第三方库，防止新的顶层导入拖慢CLI和工作进程的启动。
+
+在仓库根目录运行:
+    python benchmarks/bench_import.py --repeat 5
+    python benchmarks/bench_import.py --json import_times.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+API_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+
+# 入口名称 -> 该入口启动时执行的导入语句
+ENTRY_POINTS = {
+    "cli": "from utils import ArgumentParser, ConfigLoader, LOG, METRICS\n"
+           "from model import create_cache, create_model\n"
+           "from translator import BatchTranslator, PDFTranslator, collect_books, create_content_filter, segment_index_options",
+    "cli+openai": "from model import OpenAIModel",
+    "cli+glm": "from model import GLMModel",
+    "parse_worker": "from translator.pdf_parser import _parse_page_range",
+    "service": "from service import JobManager\nimport app",
+}
+# 需要关注的较重的第三方库
+HEAVY_MODULES = ("pandas", "numpy", "PIL", "reportlab", "openai", "requests", "pdfplumber", "flask")
+
+PROBE = """
+import sys, time
+sys.path.insert(0, {api_dir!r})
+started_at = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - started_at
+print(elapsed, ",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def measure(imports: str, repeat: int) -> dict:
+    """
+    在 repeat 个全新进程中执行导入语句，返回耗时中位数和加载的较重的库。
+    """
+    samples = []
+    loaded = ""
+    for _ in range(repeat):
+        code = PROBE.format(api_dir=API_DIR, imports=imports, heavy=HEAVY_MODULES)
+        # 导入 utils 会在当前目录下创建日志目录，在 api 目录中运行与 main.py 的用法一致
+        output = subprocess.run([sys.executable, "-c", code], cwd=API_DIR, capture_output=True, text=True, check=True).stdout
+        elapsed, _, loaded = output.strip().splitlines()[-1].partition(" ")
+        samples.append(float(elapsed))
+    return {"median_ms": round(statistics.median(samples) * 1000, 1), "min_ms": round(min(samples) * 1000, 1), "heavy_modules": loaded.split(",") if loaded else []}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Cold-start import time of the CLI, model clients, parse workers and service.")
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreter runs per entry point.')
+    parser.add_argument('--json', type=str, help='Also write the results to this JSON file.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = {name: measure(imports, args.repeat) for name, imports in ENTRY_POINTS.items()}
+
+    width = max(len(name) for name in results)
+    print(f"{'entry'.ljust(width)}  median_ms  min_ms  heavy_modules")
+    for name, result in results.items():
+        print(f"{name.ljust(width)}  {str(result['median_ms']).ljust(9)}  {str(result['min_ms']).ljust(6)}  {','.join(result['heavy_modules'])}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Book/Page/Content 内存占用的基准测试：解析一本表格密集的合成PDF并为所有内容设置译文，
+用 tracemalloc 统计整本书常驻内存的每页字节数，并与旧的表示方式（实例带 __dict__，
+表格原文和译文都保存为 pandas DataFrame）对比。
+
+两种表示方式由同一份解析结果构建，单元格字符串由两者共享、不计入统计，差异只来自对象和表格的存储结构。
+
+在仓库根目录运行:
+    python benchmarks/bench_memory.py --pages 100 --table_density 1 --table_rows 20
+    python benchmarks/bench_memory.py --json memory.json
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(BENCHMARK_DIR), "api"))
+sys.path.append(BENCHMARK_DIR)
+
+from synthetic_pdf import generate_pdf
+
+from book import Book, Content, ContentType, Page, TableContent
+from translator.pdf_parser import PDFParser
+from utils import LOG
+
+
+class LegacyContent:
+    """
+    旧的内容表示：普通实例，表格的原文和译文保存为DataFrame。
+    """
+    def __init__(self, content_type, original, translation=None):
+        self.content_type = content_type
+        self.original = original
+        self.translation = translation
+        self.status = False
+
+
+class LegacyPage:
+    def __init__(self):
+        self.contents = []
+
+
+class LegacyBook:
+    def __init__(self, pdf_file_path):
+        self.pdf_file_path = pdf_file_path
+        self.pages = []
+
+
+def extract(book: Book) -> list:
+    """
+    从解析结果中取出与表示方式无关的数据：[[("text", 文本) 或 ("table", 行列表), ...], ...]。
+    """
+    return [
+        [("text", content.original) if content.content_type == ContentType.TEXT else ("table", content.original) for content in page.contents]
+        for page in book.pages
+    ]
+
+
+def translate_cell(cell: str, translations: dict) -> str:
+    # 译文只生成一次，由两种表示方式共享
+    return translations.setdefault(cell, f"[译]{cell}")
+
+
+def build_current(pdf_file_path: str, pages: list, translations: dict) -> Book:
+    book = Book(pdf_file_path)
+    for elements in pages:
+        page = Page()
+        for kind, value in elements:
+            if kind == "text":
+                content = Content(ContentType.TEXT, value)
+                content.set_translation(translate_cell(value, translations), True)
+            else:
+                content = TableContent(value)
+                content.set_translation({cell: translate_cell(cell, translations) for cell in content.translatable_cells()}, True)
+            page.add_content(content)
+        book.add_page(page)
+    return book
+
+
+def build_legacy(pdf_file_path: str, pages: list, translations: dict) -> LegacyBook:
+    import pandas as pd
+
+    book = LegacyBook(pdf_file_path)
+    for elements in pages:
+        page = LegacyPage()
+        for kind, value in elements:
+            if kind == "text":
+                content = LegacyContent(ContentType.TEXT, value, translate_cell(value, translations))
+            else:
+                translated = [[translate_cell(cell, translations) for cell in row] for row in value]
+                content = LegacyContent(ContentType.TABLE, pd.DataFrame(value),
+                                        pd.DataFrame(translated[1:], columns=translated[0]))
+            content.status = True
+            page.contents.append(content)
+        book.pages.append(page)
+    return book
+
+
+def measure(build, *args) -> int:
+    """
+    返回 build 构建的对象在垃圾回收后仍占用的字节数。
+    """
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = build(*args)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del result
+    return retained
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Retained memory per page of the in-memory book representation.")
+    parser.add_argument('--pages', type=int, default=50, help='Pages of the synthetic PDF.')
+    parser.add_argument('--paragraphs_per_page', type=int, default=4, help='Paragraphs per synthetic page.')
+    parser.add_argument('--table_density', type=float, default=1.0, help='Fraction of pages with a table.')
+    parser.add_argument('--table_rows', type=int, default=12, help='Rows per synthetic table.')
+    parser.add_argument('--table_cols', type=int, default=5, help='Columns per synthetic table.')
+    parser.add_argument('--json', type=str, help='Also write the results to this JSON file.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    LOG.remove()
+    LOG.add(sys.stderr, level="ERROR")
+
+    with tempfile.TemporaryDirectory(prefix="ai_translator_bench_") as work_dir:
+        pdf_file_path = os.path.join(work_dir, f"synthetic_{args.pages}p_{args.table_density:g}t.pdf")
+        generate_pdf(pdf_file_path, args.pages, args.paragraphs_per_page, args.table_density, args.table_rows, args.table_cols)
+        pages = extract(PDFParser().parse_pdf(pdf_file_path))
+
+    import pandas  # noqa: F401  导入开销不计入任何一种表示方式
+    translations = {}
+    build_current(pdf_file_path, pages, translations)  # 预先生成共享的译文字符串
+
+    page_count = len(pages)
+    tables = sum(kind == "table" for elements in pages for kind, _ in elements)
+    results = {}
+    for name, build in (("legacy", build_legacy), ("current", build_current)):
+        retained = measure(build, pdf_file_path, pages, translations)
+        results[name] = {"bytes": retained, "bytes_per_page": round(retained / page_count)}
+    results["reduction"] = round(1 - results["current"]["bytes"] / results["legacy"]["bytes"], 3)
+
+    print(f"pages: {page_count}, tables: {tables}")
+    for name in ("legacy", "current"):
+        print(f"{name.ljust(7)}  {results[name]['bytes_per_page']} bytes/page")
+    print(f"reduction: {results['reduction']:.1%}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "pages": page_count, "tables": tables, **results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
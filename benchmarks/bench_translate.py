@@ -0,0 +1,238 @@
+"""
+PDFTranslator.translate_pdf 的离线基准测试：启动本地模拟大模型服务，生成不同页数和表格密度的合成PDF，
+逐个翻译并报告页/秒、请求延迟的 p50/p95/p99、解析耗时和写入耗时。
+
+在仓库根目录运行:
+    python benchmarks/bench_translate.py --pages 10,50 --table_density 0,0.3 --latency lognormal:0.2,0.5 --concurrency 8
+    python benchmarks/bench_translate.py --model_type OpenAIModel --rate_limit_rate 0.05 --json bench.json
+    python benchmarks/bench_translate.py --replicas 3 --slow_replica_latency lognormal:0.5,1 --hedge_percentile 0.9
+    python benchmarks/bench_translate.py --pages 200 --latency const:1 --concurrency 256 --async_requests
+
+输出PDF时字体按相对路径 ../fonts/simsun.ttc 加载，需要在 api 目录中运行:
+    cd api && python ../benchmarks/bench_translate.py --file_format pdf --streaming --render_workers 2
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(BENCHMARK_DIR), "api"))
+sys.path.append(BENCHMARK_DIR)
+
+from mock_llm_server import MockLLMServer
+from synthetic_pdf import generate_pdf
+
+from model import GLMModel, OpenAIModel, RateLimiter
+from translator import PDFTranslator
+from utils import LOG
+
+
+def percentile(samples, q: float) -> float:
+    """
+    计算样本的百分位数（最近秩法），没有样本时返回0。
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class StageTimer:
+    """
+    线程安全的耗时累加器。
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.seconds += seconds
+            self.samples.append(seconds)
+
+    def wrap(self, fn):
+        def wrapper(*args, **kwargs):
+            started_at = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(time.perf_counter() - started_at)
+        return wrapper
+
+    def wrap_async(self, fn):
+        async def wrapper(*args, **kwargs):
+            started_at = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.add(time.perf_counter() - started_at)
+        return wrapper
+
+    def wrap_iterator(self, fn):
+        # 只累加生成下一个元素的耗时，不包括调用方处理元素的时间
+        def wrapper(*args, **kwargs):
+            iterator = iter(fn(*args, **kwargs))
+            while True:
+                started_at = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    self.add(time.perf_counter() - started_at)
+                    return
+                self.add(time.perf_counter() - started_at)
+                yield item
+        return wrapper
+
+
+def create_model(model_type: str, server_urls: list, hedge_percentile: float = 0.0, concurrency: int = 64):
+    # 基准测试只关心吞吐量：速率上限设得足够高，收到429时只按比例降速，而不是按实际速率重新估计上限
+    rate_limiter = RateLimiter(requests_per_minute=1_000_000, max_retries=8, base_delay=0.05, max_delay=1.0)
+    if model_type == "GLMModel":
+        return GLMModel(model_url=server_urls, timeout=30, rate_limiter=rate_limiter, pool_size=max(64, concurrency),
+                        hedge_percentile=hedge_percentile)
+    os.environ["OPENAI_BASE_URL"] = f"{server_urls[0]}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    return OpenAIModel(model="gpt-3.5-turbo", api_key="benchmark", rate_limiter=rate_limiter)
+
+
+def run_case(model, pdf_file_path: str, output_dir: str, args) -> dict:
+    """
+    翻译一个PDF并收集各阶段的耗时。
+    """
+    translator = PDFTranslator(model, concurrency=args.concurrency, streaming=args.streaming,
+                               batch_max_chars=args.batch_max_chars, parse_workers=args.parse_workers,
+                               render_workers=args.render_workers, pdf_chunk_pages=args.pdf_chunk_pages, async_requests=args.async_requests)
+    parse_timer, write_timer, request_timer = StageTimer(), StageTimer(), StageTimer()
+
+    # 在实例上包装各阶段的方法进行计时，不修改翻译器本身
+    translator.pdf_parser.iter_pages = parse_timer.wrap_iterator(translator.pdf_parser.iter_pages)
+    if args.streaming:
+        open_page_stream = translator.writer.open_page_stream
+
+        def open_timed_stream(*stream_args):
+            stream = write_timer.wrap(open_page_stream)(*stream_args)
+            stream.write_page = write_timer.wrap(stream.write_page)
+            stream.close = write_timer.wrap(stream.close)
+            return stream
+
+        translator.writer.open_page_stream = open_timed_stream
+    else:
+        translator.writer.save_translated_book = write_timer.wrap(translator.writer.save_translated_book)
+    make_request, make_request_async = model.make_request, model.make_request_async
+    model.make_request = request_timer.wrap(make_request)
+    model.make_request_async = request_timer.wrap_async(make_request_async)
+
+    pages_done = 0
+    peak_threads = threading.active_count()
+
+    def on_progress(done, total):
+        nonlocal pages_done, peak_threads
+        pages_done = done
+        peak_threads = max(peak_threads, threading.active_count())
+
+    extension = ".pdf" if args.file_format == "pdf" else ".md"
+    output_file_path = os.path.join(output_dir, os.path.basename(pdf_file_path).replace(".pdf", f"_translated{extension}"))
+    started_at = time.perf_counter()
+    try:
+        translator.translate_pdf(pdf_file_path, args.file_format, output_file_path=output_file_path, progress_callback=on_progress)
+    finally:
+        model.make_request, model.make_request_async = make_request, make_request_async
+    elapsed = time.perf_counter() - started_at
+
+    latencies = request_timer.samples
+    return {
+        "pages": pages_done,
+        "requests": len(latencies),
+        "total_s": round(elapsed, 3),
+        "pages_per_s": round(pages_done / elapsed, 2) if elapsed else 0.0,
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "latency_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "latency_p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "parse_s": round(parse_timer.seconds, 3),
+        "write_s": round(write_timer.seconds, 3),
+        "threads": peak_threads,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark for PDFTranslator.translate_pdf.")
+    parser.add_argument('--model_type', type=str, default='GLMModel', choices=['GLMModel', 'OpenAIModel'], help='Client used to talk to the mock server.')
+    parser.add_argument('--pages', type=str, default='10,50', help='Comma separated page counts of the synthetic PDFs.')
+    parser.add_argument('--table_density', type=str, default='0,0.3', help='Comma separated fractions of pages with a table.')
+    parser.add_argument('--paragraphs_per_page', type=int, default=4, help='Paragraphs per synthetic page.')
+    parser.add_argument('--latency', type=str, default='lognormal:0.05,0.5', help='Mock server latency distribution, see mock_llm_server.LatencyDistribution.')
+    parser.add_argument('--error_rate', type=float, default=0.0, help='Probability of server error answers.')
+    parser.add_argument('--error_status', type=int, default=503, help='Status code of server error answers. GLMModel does not retry 500.')
+    parser.add_argument('--rate_limit_rate', type=float, default=0.0, help='Probability of HTTP 429 answers.')
+    parser.add_argument('--retry_after', type=float, default=0.0, help='Retry-After seconds sent with 429 answers.')
+    parser.add_argument('--replicas', type=int, default=1, help='Mock server replicas behind GLMModel (GLMModel only).')
+    parser.add_argument('--slow_replica_latency', type=str, help='Latency distribution of the last replica, to simulate a slow replica.')
+    parser.add_argument('--hedge_percentile', type=float, default=0.0, help='GLMModel hedge_percentile, 0 disables hedged requests.')
+    parser.add_argument('--concurrency', type=int, default=8, help='PDFTranslator concurrency.')
+    parser.add_argument('--async_requests', action='store_true', help='Send requests as coroutines on one event-loop thread (PDFTranslator async_requests).')
+    parser.add_argument('--batch_max_chars', type=int, default=0, help='PDFTranslator batch_max_chars.')
+    parser.add_argument('--parse_workers', type=int, default=1, help='PDFTranslator parse_workers.')
+    parser.add_argument('--streaming', action='store_true', help='Use the streaming pipeline.')
+    parser.add_argument('--file_format', type=str, default='markdown', choices=['markdown', 'pdf'], help='Output format. PDF output needs the font at ../fonts/simsun.ttc, so run from api/.')
+    parser.add_argument('--render_workers', type=int, default=1, help='PDFTranslator render_workers (PDF output).')
+    parser.add_argument('--pdf_chunk_pages', type=int, default=32, help='PDFTranslator pdf_chunk_pages (PDF output).')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per case; the median run by total time is reported.')
+    parser.add_argument('--json', type=str, help='Also write the results to this JSON file.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    LOG.remove()
+    LOG.add(sys.stderr, level="ERROR")
+
+    results = []
+    # 多个副本时最后一个副本可以使用单独的延迟分布，模拟拖慢整本书的慢副本
+    replicas = max(1, args.replicas) if args.model_type == "GLMModel" else 1
+    latencies = [args.latency] * replicas
+    if args.slow_replica_latency and replicas > 1:
+        latencies[-1] = args.slow_replica_latency
+    with tempfile.TemporaryDirectory(prefix="ai_translator_bench_") as work_dir, contextlib.ExitStack() as stack:
+        servers = [
+            stack.enter_context(MockLLMServer(latency=latency, error_rate=args.error_rate, error_status=args.error_status,
+                                              rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after))
+            for latency in latencies
+        ]
+        model = create_model(args.model_type, [server.url for server in servers], args.hedge_percentile, args.concurrency)
+        for pages in [int(value) for value in args.pages.split(",")]:
+            for table_density in [float(value) for value in args.table_density.split(",")]:
+                pdf_file_path = os.path.join(work_dir, f"synthetic_{pages}p_{table_density:g}t.pdf")
+                generate_pdf(pdf_file_path, pages, args.paragraphs_per_page, table_density)
+                runs = sorted((run_case(model, pdf_file_path, work_dir, args) for _ in range(args.repeat)), key=lambda run: run["total_s"])
+                result = {"case": os.path.basename(pdf_file_path), **runs[len(runs) // 2]}
+                results.append(result)
+                print(json.dumps(result), file=sys.stderr)
+        server_stats = {key: sum(server.stats[key] for server in servers) for key in servers[0].stats}
+        replica_stats = model.replicas.stats() if args.model_type == "GLMModel" else []
+
+    columns = ["case", "pages", "requests", "total_s", "pages_per_s", "latency_p50_ms", "latency_p95_ms", "latency_p99_ms", "parse_s", "write_s", "threads"]
+    widths = [max(len(column), *(len(str(result[column])) for result in results)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for result in results:
+        print("  ".join(str(result[column]).ljust(width) for column, width in zip(columns, widths)))
+    print(f"mock server: {server_stats}")
+    if len(replica_stats) > 1:
+        for replica in replica_stats:
+            print(f"replica {replica['url']}: requests={replica['requests']} hedges={replica['hedges']} failures={replica['failures']} "
+                  f"p50={replica['latency_p50_ms']}ms p95={replica['latency_p95_ms']}ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results, "server": server_stats, "replicas": replica_stats}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
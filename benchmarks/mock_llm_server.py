@@ -0,0 +1,244 @@
+"""
+本地模拟大模型服务，用于在不调用付费API的情况下测量翻译吞吐量。
+
+同时支持两种接口:
+- OpenAI: POST /v1/chat/completions 和 POST /v1/completions，请求中 "stream": true 时以SSE逐段返回
+- ChatGLM: POST /（以及其他路径）{"prompt": ..., "history": [...]} -> {"response": ...}；
+  路径以 /stream 结尾时以SSE逐段返回 {"response": 目前为止的全部文本}
+
+“译文”直接回显原文，并保持批量翻译的分段标记和表格单元格的JSON结构，保证翻译器的解析逻辑与真实服务一致。
+延迟按可配置的分布随机生成，并可按比例返回429和服务端错误（默认503）。
+
+独立运行:
+    python benchmarks/mock_llm_server.py --port 8000 --latency lognormal:0.3,0.5 --rate_limit_rate 0.02
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SEGMENT_PATTERN = re.compile(r'<seg id="(\d+)">(.*?)</seg>', re.DOTALL)
+TABLE_MARKER = "原表格数据：\n"
+
+
+class LatencyDistribution:
+    """
+    请求延迟的随机分布。
+
+    参数:
+    - spec: str，"名称:参数1,参数2"，单位为秒。支持:
+      const:秒数；uniform:下限,上限；normal:均值,标准差；lognormal:中位数,sigma（sigma为对数标准差）。
+    """
+
+    def __init__(self, spec: str = "const:0"):
+        name, _, params = spec.partition(":")
+        self.name = name
+        self.params = [float(param) for param in params.split(",") if param]
+        if name not in ("const", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unsupported latency distribution: {spec}")
+
+    def sample(self) -> float:
+        """
+        生成一个延迟样本（秒），不小于0。
+        """
+        if self.name == "const":
+            value = self.params[0] if self.params else 0.0
+        elif self.name == "uniform":
+            value = random.uniform(*self.params)
+        elif self.name == "normal":
+            value = random.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            value = random.lognormvariate(0, sigma) * median
+        return max(0.0, value)
+
+
+def fake_translation(prompt: str) -> str:
+    """
+    根据提示词生成“译文”：批量提示按分段标记逐段回显，表格提示回显原单元格JSON，其他提示回显冒号之后的原文。
+    """
+    segments = SEGMENT_PATTERN.findall(prompt)
+    if segments:
+        return "\n".join(f'<seg id="{idx}">{text}</seg>' for idx, text in segments)
+    if TABLE_MARKER in prompt:
+        return prompt.split(TABLE_MARKER, 1)[1]
+    return prompt.split("：", 1)[1] if "：" in prompt else prompt
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    # 异步客户端会同时发起数百个连接，默认的监听队列长度（5）会使多余的连接被重置
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class MockLLMServer:
+    """
+    在后台线程中运行的模拟大模型服务。
+
+    参数:
+    - host: str，监听地址。
+    - port: int，监听端口，0表示随机选择空闲端口。
+    - latency: str，延迟分布，见 LatencyDistribution。
+    - error_rate: float，返回服务端错误的概率。
+    - error_status: int，服务端错误的状态码。
+    - rate_limit_rate: float，返回429的概率。
+    - retry_after: float，429响应中 Retry-After 的秒数，0表示不返回该响应头。
+    - stream_chunk_chars: int，流式返回时每个事件包含的字符数。
+    - stream_interval: float，流式返回时相邻事件的间隔秒数。
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: str = "const:0", error_rate: float = 0.0, error_status: int = 503,
+                 rate_limit_rate: float = 0.0, retry_after: float = 0.0, stream_chunk_chars: int = 4, stream_interval: float = 0.0):
+        self.latency = LatencyDistribution(latency)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.stream_chunk_chars = max(1, stream_chunk_chars)
+        self.stream_interval = stream_interval
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self.httpd = _HTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 以便客户端复用长连接
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                server._count("requests")
+                time.sleep(server.latency.sample())
+
+                roll = random.random()
+                if roll < server.rate_limit_rate:
+                    server._count("rate_limited")
+                    headers = {"retry-after": str(server.retry_after)} if server.retry_after else {}
+                    return self._send(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}}, headers)
+                if roll < server.rate_limit_rate + server.error_rate:
+                    server._count("errors")
+                    return self._send(server.error_status, {"error": {"message": "Server error", "type": "server_error"}})
+
+                if self.path.startswith("/v1/chat/completions"):
+                    text = fake_translation(body["messages"][-1]["content"])
+                    if body.get("stream"):
+                        return self._send_events([
+                            {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": body.get("model"),
+                             "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                            for piece in self._pieces(text)
+                        ] + [{"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": body.get("model"),
+                              "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}])
+                    return self._send(200, {
+                        "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": body.get("model"),
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                    })
+                if self.path.startswith("/v1/completions"):
+                    text = fake_translation(body["prompt"])
+                    if body.get("stream"):
+                        pieces = self._pieces(text)
+                        return self._send_events([
+                            {"id": "cmpl-mock", "object": "text_completion", "created": int(time.time()), "model": body.get("model"),
+                             "choices": [{"index": 0, "text": piece, "finish_reason": "stop" if idx == len(pieces) - 1 else None, "logprobs": None}]}
+                            for idx, piece in enumerate(pieces)
+                        ])
+                    return self._send(200, {
+                        "id": "cmpl-mock", "object": "text_completion", "created": int(time.time()), "model": body.get("model"),
+                        "choices": [{"index": 0, "text": text, "finish_reason": "stop", "logprobs": None}],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                    })
+                text = fake_translation(body.get("prompt", ""))
+                if self.path.rstrip("/").endswith("/stream"):
+                    pieces = self._pieces(text)
+                    return self._send_events([{"response": "".join(pieces[:idx + 1])} for idx in range(len(pieces))])
+                return self._send(200, {"response": text, "history": body.get("history", []) + [[body.get("prompt", ""), text]], "status": 200})
+
+            def _pieces(self, text: str) -> list:
+                size = server.stream_chunk_chars
+                return [text[start:start + size] for start in range(0, len(text), size)] or [""]
+
+            def _send_events(self, events: list):
+                # 以分块传输编码逐个发送SSE事件，最后发送 [DONE]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for event in [json.dumps(event, ensure_ascii=False) for event in events] + ["[DONE]"]:
+                    data = f"data: {event}\n\n".encode("utf-8")
+                    self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                    self.wfile.flush()
+                    if server.stream_interval:
+                        time.sleep(server.stream_interval)
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _send(self, status: int, payload: dict, headers: dict = None):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local mock LLM server speaking the OpenAI and ChatGLM APIs.")
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to listen on.')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on.')
+    parser.add_argument('--latency', type=str, default='const:0', help='Latency distribution, e.g. const:0.2, uniform:0.1,0.5, normal:0.3,0.1, lognormal:0.3,0.5.')
+    parser.add_argument('--error_rate', type=float, default=0.0, help='Probability of answering with a server error.')
+    parser.add_argument('--error_status', type=int, default=503, help='Status code of server error answers.')
+    parser.add_argument('--rate_limit_rate', type=float, default=0.0, help='Probability of answering with HTTP 429.')
+    parser.add_argument('--retry_after', type=float, default=0.0, help='Retry-After seconds sent with 429 responses. 0 omits the header.')
+    parser.add_argument('--stream_chunk_chars', type=int, default=4, help='Characters per event of streamed responses.')
+    parser.add_argument('--stream_interval', type=float, default=0.0, help='Seconds between events of streamed responses.')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = MockLLMServer(args.host, args.port, args.latency, args.error_rate, args.error_status, args.rate_limit_rate, args.retry_after,
+                           args.stream_chunk_chars, args.stream_interval)
+    print(f"Mock LLM server listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
@@ -0,0 +1,89 @@
+"""
+生成用于基准测试的合成PDF：页数、每页段落数和表格密度可配置，内容由随机英文句子组成，
+同一组参数和随机种子总是生成相同的文件。
+
+独立运行:
+    python benchmarks/synthetic_pdf.py --pages 50 --table_density 0.3 --output /tmp/bench.pdf
+"""
+import argparse
+import random
+
+from reportlab.lib import colors, pagesizes
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+WORDS = (
+    "the old man was thin and gaunt with deep wrinkles in the back of his neck boat sea fish line sail "
+    "harbor morning current water sun hand shark skiff marlin village boy dream lion beach wind night "
+    "light cord strength patient strange heavy silent tide bird ocean coast river evening storm"
+).split()
+
+
+def make_sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 18))]
+    return " ".join(words).capitalize() + rng.choice([".", ".", ".", "!", "?"])
+
+
+def make_paragraph(rng: random.Random) -> str:
+    return " ".join(make_sentence(rng) for _ in range(rng.randint(2, 6)))
+
+
+def make_table(rng: random.Random, rows: int, cols: int) -> Table:
+    header = [rng.choice(WORDS).capitalize() for _ in range(cols)]
+    data = [header] + [
+        [rng.choice(WORDS) if col % 2 == 0 else f"{rng.uniform(0, 1000):.2f}" for col in range(cols)]
+        for _ in range(rows)
+    ]
+    table = Table(data)
+    table.setStyle(TableStyle([
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+    ]))
+    return table
+
+
+def generate_pdf(output_file_path: str, pages: int = 10, paragraphs_per_page: int = 4, table_density: float = 0.0,
+                 table_rows: int = 5, table_cols: int = 4, seed: int = 0) -> str:
+    """
+    生成合成PDF。
+
+    参数:
+    - output_file_path: str，输出文件路径。
+    - pages: int，页数。
+    - paragraphs_per_page: int，每页的段落数。
+    - table_density: float，含表格的页面比例（0到1）。
+    - table_rows: int，表格的数据行数（不含表头）。
+    - table_cols: int，表格的列数。
+    - seed: int，随机种子。
+
+    返回:
+    - str，输出文件路径。
+    """
+    rng = random.Random(seed)
+    style = getSampleStyleSheet()["Normal"]
+    story = []
+    for page_idx in range(pages):
+        for _ in range(paragraphs_per_page):
+            story.append(Paragraph(make_paragraph(rng), style))
+            story.append(Spacer(1, 8))
+        if rng.random() < table_density:
+            story.append(make_table(rng, table_rows, table_cols))
+        if page_idx < pages - 1:
+            story.append(PageBreak())
+    SimpleDocTemplate(output_file_path, pagesize=pagesizes.letter).build(story)
+    return output_file_path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a synthetic PDF for benchmarks.")
+    parser.add_argument('--output', type=str, required=True, help='Output PDF path.')
+    parser.add_argument('--pages', type=int, default=10, help='Number of pages.')
+    parser.add_argument('--paragraphs_per_page', type=int, default=4, help='Paragraphs per page.')
+    parser.add_argument('--table_density', type=float, default=0.0, help='Fraction of pages that contain a table.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(generate_pdf(args.output, args.pages, args.paragraphs_per_page, args.table_density, seed=args.seed))
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# 与 api/main.py 相同，测试直接从 api 目录导入 book、model、translator 等模块
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), "api"))
+
+
+@pytest.fixture
+def sample_pdf() -> str:
+    """
+    仓库自带的单页示例PDF：一段带标题的英文文本和一张水果价格表。
+    """
+    return os.path.join(TESTS_DIR, "test.pdf")
@@ -0,0 +1,58 @@
+"""
+测试使用的模型：不发送网络请求，按提示的格式返回可预测的“译文”（原文加前缀 "译:"），并记录每个提示。
+"""
+import json
+import threading
+
+from model import Model
+from model.model import BATCH_SEGMENT_PATTERN
+
+TABLE_MARKER = "原表格数据：\n"
+
+
+class FakeModel(Model):
+    """
+    按提示格式回显原文的模型。
+
+    参数:
+    - max_chunk_chars: int，可选，单个请求中文本原文的最大字符数。
+    - drop_cells: 表格请求中第一次出现时不返回的单元格原文，用于模拟模型遗漏单元格。
+    - fail: 返回失败（请求不成功）的原文集合。
+    """
+
+    model_name = "FakeModel"
+
+    def __init__(self, max_chunk_chars: int = None, drop_cells=(), fail=()):
+        self.max_chunk_chars = max_chunk_chars
+        self.drop_cells = set(drop_cells)
+        self.fail = set(fail)
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    @property
+    def calls(self) -> int:
+        return len(self.prompts)
+
+    def table_prompts(self) -> list:
+        return [prompt for prompt in self.prompts if TABLE_MARKER in prompt]
+
+    def make_request(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+        if TABLE_MARKER in prompt:
+            cells = json.loads(prompt.split(TABLE_MARKER, 1)[1])
+            answer = {}
+            for key, cell in cells.items():
+                with self._lock:
+                    if cell in self.drop_cells:
+                        self.drop_cells.discard(cell)
+                        continue
+                answer[key] = f"译:{cell}"
+            return "```json\n" + json.dumps(answer, ensure_ascii=False) + "\n```", True
+        segments = BATCH_SEGMENT_PATTERN.findall(prompt)
+        if segments:
+            return "\n".join(f'<seg id="{idx}">译:{text}</seg>' for idx, text in segments), True
+        text = prompt.split("：", 1)[1]
+        if text in self.fail:
+            return "", False
+        return f"译:{text}", True
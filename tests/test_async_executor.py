@@ -0,0 +1,49 @@
+import asyncio
+import threading
+
+from fakes import FakeModel
+from translator import PDFTranslator
+from translator.async_executor import AsyncExecutor
+
+
+async def _echo(value, delay=0.0):
+    await asyncio.sleep(delay)
+    return value
+
+
+def test_finished_futures_are_released():
+    executor = AsyncExecutor(4)
+    results = [executor.submit(_echo, idx, 0.01) for idx in range(20)]
+    assert [future.result() for future in results] == list(range(20))
+    assert executor.pending == set()
+    assert 1 < executor.peak_in_flight <= 4
+    executor.shutdown()
+
+
+def test_shutdown_waits_for_pending_coroutines():
+    executor = AsyncExecutor(2)
+    future = executor.submit(_echo, "done", 0.1)
+    executor.shutdown()
+    assert future.result(timeout=0) == "done"
+
+
+def test_shutdown_cancels_pending_coroutines():
+    executor = AsyncExecutor(1)
+    started = threading.Event()
+
+    async def block():
+        started.set()
+        await asyncio.sleep(10)
+
+    running = executor.submit(block)
+    waiting = executor.submit(_echo, "never")
+    assert started.wait(2)
+    executor.shutdown(cancel_futures=True)
+    assert running.cancelled() and waiting.cancelled()
+
+
+def test_translates_with_async_requests(sample_pdf, tmp_path):
+    model = FakeModel()
+    PDFTranslator(model, concurrency=4, async_requests=True).translate_pdf(sample_pdf, "markdown", output_file_path=str(tmp_path / "async.md"))
+    PDFTranslator(FakeModel()).translate_pdf(sample_pdf, "markdown", output_file_path=str(tmp_path / "sync.md"))
+    assert (tmp_path / "async.md").read_text(encoding="utf-8") == (tmp_path / "sync.md").read_text(encoding="utf-8")
@@ -0,0 +1,23 @@
+import os
+
+from translator.batch_translator import collect_books
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+
+def test_directory_skips_translated_outputs_and_matches_extension_case(tmp_path):
+    for name in ("a.pdf", "a_translated.pdf", "B.PDF", "B_translated.pdf", "sub/c.Pdf", "sub/c_TRANSLATED.PDF", "notes.txt"):
+        _touch(str(tmp_path / name))
+
+    books = collect_books(str(tmp_path))
+    assert [os.path.relpath(book, tmp_path) for book in books] == ["B.PDF", "a.pdf", os.path.join("sub", "c.Pdf")]
+
+
+def test_glob_skips_translated_outputs(tmp_path):
+    for name in ("a.pdf", "a_translated.pdf"):
+        _touch(str(tmp_path / name))
+
+    assert collect_books(str(tmp_path / "*.pdf")) == [os.path.normpath(str(tmp_path / "a.pdf"))]
@@ -0,0 +1,78 @@
+from book import Content, ContentType, Page
+from fakes import FakeModel
+from model.model import BATCH_SEGMENT_PATTERN
+from translator import PDFTranslator
+
+
+class DroppingModel(FakeModel):
+    """
+    批量请求的返回结果总是少最后一段的模型。
+    """
+
+    def make_request(self, prompt):
+        translation, status = super().make_request(prompt)
+        segments = BATCH_SEGMENT_PATTERN.findall(prompt)
+        if segments:
+            translation = translation.rsplit("\n", 1)[0]
+        return translation, status
+
+
+def _pages(texts, per_page=2):
+    pages = []
+    for start in range(0, len(texts), per_page):
+        page = Page()
+        for text in texts[start:start + per_page]:
+            page.add_content(Content(ContentType.TEXT, text))
+        pages.append(page)
+    return pages
+
+
+def _translations(pages):
+    return [content.translation for page in pages for content in page.contents]
+
+
+def test_split_batch_translation():
+    model = FakeModel()
+    assert model.split_batch_translation('<seg id="1"> 甲 </seg>\n<seg id="2">乙</seg>', 2) == ["甲", "乙"]
+    assert model.split_batch_translation('<seg id="1">甲</seg>', 2) is None
+    assert model.split_batch_translation('<seg id="1">甲</seg><seg id="1">乙</seg>', 2) is None
+    assert model.split_batch_translation('<seg id="1">甲</seg><seg id="2">乙</seg><seg id="3">丙</seg>', 2) is None
+
+
+def test_short_contents_across_pages_share_one_request():
+    texts = [f"Sentence number {idx}." for idx in range(6)]
+    pages = _pages(texts)
+    model = FakeModel()
+    PDFTranslator(model, batch_max_chars=1000)._translate_pages(pages, "中文")
+
+    assert model.calls == 1
+    assert _translations(pages) == [f"译:{text}" for text in texts]
+
+
+def test_batches_respect_the_character_budget_and_item_limit():
+    texts = [f"Sentence number {idx:02}." for idx in range(40)]
+    model = FakeModel()
+    PDFTranslator(model, batch_max_chars=10000)._translate_pages(_pages(texts), "中文")
+    assert model.calls == 2  # 每批最多 32 条
+
+    model = FakeModel()
+    PDFTranslator(model, batch_max_chars=100)._translate_pages(_pages(texts), "中文")
+    assert all(sum(len(text) for _, text in BATCH_SEGMENT_PATTERN.findall(prompt)) <= 100 for prompt in model.prompts)
+    assert model.calls == 8  # 每条19个字符，每批5条
+
+    # 不短于字符预算的内容单独请求
+    model = FakeModel()
+    pages = _pages(["x" * 50, "Short."])
+    PDFTranslator(model, batch_max_chars=50)._translate_pages(pages, "中文")
+    assert model.calls == 2
+    assert _translations(pages) == ["译:" + "x" * 50, "译:Short."]
+
+
+def test_unsplittable_batch_falls_back_to_single_requests():
+    texts = ["First.", "Second.", "Third."]
+    pages = _pages(texts)
+    model = DroppingModel()
+    PDFTranslator(model, batch_max_chars=1000)._translate_pages(pages, "中文")
+
+    assert model.calls == 1 + len(texts)
+    assert _translations(pages) == [f"译:{text}" for text in texts]
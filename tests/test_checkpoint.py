@@ -0,0 +1,58 @@
+import json
+
+from book import TableContent
+from fakes import FakeModel
+from translator import PDFTranslator
+from translator.checkpoint import content_hash
+
+
+def _translate(sample_pdf, checkpoint_dir, output, **kwargs):
+    model = FakeModel()
+    PDFTranslator(model, checkpoint_dir=str(checkpoint_dir)).translate_pdf(sample_pdf, "markdown", output_file_path=str(output), **kwargs)
+    return model
+
+
+def test_table_hash_uses_cell_boundaries():
+    # 两张表的 DataFrame 字符串表示相同（"a b c\nx y z"），单元格不同
+    table = TableContent([["a b", "c"], ["x y", "z"]])
+    other = TableContent([["a", "b c"], ["x", "y z"]])
+    assert content_hash(table) != content_hash(other)
+    assert content_hash(table) == content_hash(TableContent([["a b", "c"], ["x y", "z"]]))
+
+
+def test_resume_skips_finished_contents(sample_pdf, tmp_path):
+    first = _translate(sample_pdf, tmp_path / "checkpoints", tmp_path / "first.md")
+    assert first.calls > 0
+
+    resumed = _translate(sample_pdf, tmp_path / "checkpoints", tmp_path / "resumed.md", resume=True)
+    assert resumed.calls == 0
+    assert (tmp_path / "resumed.md").read_text(encoding="utf-8") == (tmp_path / "first.md").read_text(encoding="utf-8")
+
+
+def test_resume_after_interruption(sample_pdf, tmp_path):
+    _translate(sample_pdf, tmp_path / "checkpoints", tmp_path / "first.md")
+    checkpoint = next((tmp_path / "checkpoints").iterdir())
+    lines = checkpoint.read_text(encoding="utf-8").splitlines(keepends=True)
+    assert len(lines) > 1
+    # 模拟中断：只保留第一条记录和写了一半的第二条
+    checkpoint.write_text(lines[0] + lines[1][:10], encoding="utf-8")
+
+    resumed = _translate(sample_pdf, tmp_path / "checkpoints", tmp_path / "resumed.md", resume=True)
+    assert 0 < resumed.calls
+    assert (tmp_path / "resumed.md").read_text(encoding="utf-8") == (tmp_path / "first.md").read_text(encoding="utf-8")
+
+
+def test_changed_content_is_recorded_again(sample_pdf, tmp_path):
+    _translate(sample_pdf, tmp_path / "checkpoints", tmp_path / "first.md")
+    checkpoint = next((tmp_path / "checkpoints").iterdir())
+    lines = checkpoint.read_text(encoding="utf-8").splitlines(keepends=True)
+    # 模拟原文变化：第一条记录的摘要与当前内容不再一致
+    stale = json.loads(lines[0])
+    stale["hash"] = "0" * 40
+    checkpoint.write_text(json.dumps(stale, ensure_ascii=False) + "\n" + "".join(lines[1:]), encoding="utf-8")
+
+    resumed = _translate(sample_pdf, tmp_path / "checkpoints", tmp_path / "resumed.md", resume=True)
+    assert resumed.calls == 1
+    again = _translate(sample_pdf, tmp_path / "checkpoints", tmp_path / "again.md", resume=True)
+    assert again.calls == 0
+    assert (tmp_path / "again.md").read_text(encoding="utf-8") == (tmp_path / "first.md").read_text(encoding="utf-8")
@@ -0,0 +1,80 @@
+import pytest
+
+from book import Content, ContentType, Page
+from fakes import FakeModel
+from translator import PDFTranslator
+from translator.content_filter import ContentFilter
+
+
+def _classify(text, target_language="中文"):
+    return ContentFilter().classify(Content(ContentType.TEXT, text), target_language)
+
+
+@pytest.mark.parametrize("text", ["12", "- 3 -", "Page 3", "PAGE 4 of 10", "3 / 10", "第3页", "iv", "- xiv -", "XII", "Page iv"])
+def test_page_numbers(text):
+    assert _classify(text) == "page_number"
+
+
+@pytest.mark.parametrize("text", ["mix", "div", "MD", "Mix", "civil", "Iv", "iv v", "I", "V", "L", "x", "- I -"])
+def test_short_words_are_not_roman_page_numbers(text):
+    assert _classify(text) is None
+
+
+CODE = "def area(width, height):\n    return width * height\nresult = area(3, 4)"
+
+
+@pytest.mark.parametrize("line", [
+    "The old man said this; he was tired;",
+    "for example: the following",
+    "x = the number of fish he caught",
+    "if the boy is here:",
+    "We used the following settings:",
+    "class action",
+    "return to the sea",
+])
+def test_prose_lines_do_not_look_like_code(line):
+    assert ContentFilter().code_blocks(f"{line}\n{line}") == [(False, f"{line}\n{line}")]
+
+
+@pytest.mark.parametrize("text", [
+    "Click File -> Save to keep the draft.\nThen choose Edit -> Copy to duplicate it.",
+    "#1 New York Times bestseller\n#2 in Fiction",
+    "The result is x >= 5 for every sample.\nWe then see y <= 3 in the control group.",
+    "C++ is a language.\nC++ has templates.",
+    "Total = 5 apples\nCount = 3 pears",
+    "// TODO list\n# Chapter notes",
+])
+def test_prose_with_operators_is_not_code(text):
+    assert ContentFilter().code_blocks(text) == [(False, text)]
+    assert _classify(text) is None
+
+
+def test_whole_code_content_is_passed_through():
+    assert _classify(CODE) == "code"
+    assert _classify("print(x)") is None  # 单独一行不构成代码块
+
+
+def test_indented_body_and_comments_stay_in_code_block():
+    code = "for fish in catch:\n    # weigh every fish\n    print fish\n    total += fish.weight"
+    text = f"{code}\nHe was tired."
+    assert ContentFilter().code_blocks(text) == [(True, code), (False, "He was tired.")]
+
+
+def test_code_blocks_keep_surrounding_prose():
+    text = f"Run the following code:\n{CODE}\nThen result is 12; check it."
+    blocks = ContentFilter().code_blocks(text)
+    assert blocks == [(False, "Run the following code:"), (True, CODE), (False, "Then result is 12; check it.")]
+    assert "\n".join(block for _, block in blocks) == text
+    assert _classify(text) is None
+    assert ContentFilter(rules=["page_number"]).code_blocks(text) == [(False, text)]
+
+
+def test_only_prose_around_code_is_translated():
+    page = Page()
+    page.add_content(Content(ContentType.TEXT, f"Run the following code:\n{CODE}\nThen result is 12."))
+    model = FakeModel()
+    translator = PDFTranslator(model, content_filter=ContentFilter())
+    translator._translate_pages([page], "中文")
+
+    assert page.contents[0].translation == f"译:Run the following code:\n{CODE}\n译:Then result is 12."
+    assert not any("area" in prompt for prompt in model.prompts)
@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+from translator.fair_executor import FairExecutor
+
+
+def _run_blocked(fairness: str):
+    """
+    在唯一的工作线程被占用时向两本书各提交3个任务，返回任务的执行顺序。
+    """
+    executor = FairExecutor(1, fairness)
+    gate = threading.Event()
+    order = []
+    blocker = executor.queue()
+    blocker.submit(gate.wait)
+    books = [executor.queue(), executor.queue()]
+    for name, book in zip("ab", books):
+        for idx in range(3):
+            book.submit(order.append, f"{name}{idx}")
+    gate.set()
+    for book in books:
+        book.shutdown()
+    executor.shutdown()
+    return order
+
+
+def test_round_robin_interleaves_books():
+    assert _run_blocked("round_robin") == ["a0", "b0", "a1", "b1", "a2", "b2"]
+
+
+def test_fifo_runs_in_submission_order():
+    assert _run_blocked("fifo") == ["a0", "a1", "a2", "b0", "b1", "b2"]
+
+
+def test_finished_futures_are_not_retained():
+    executor = FairExecutor(2)
+    book = executor.queue()
+    futures = [book.submit(pow, idx, 2) for idx in range(100)]
+    assert [future.result() for future in futures] == [idx ** 2 for idx in range(100)]
+    assert not book.pending
+    book.shutdown()
+    executor.shutdown()
+
+
+def test_cancel_pending_tasks():
+    executor = FairExecutor(1)
+    started, gate = threading.Event(), threading.Event()
+    book = executor.queue()
+    running = book.submit(lambda: started.set() or gate.wait())
+    started.wait()
+    queued = [book.submit(pow, 2, 2) for _ in range(3)]
+    book.shutdown(wait=False, cancel_futures=True)
+    assert all(future.cancelled() for future in queued)
+    gate.set()
+    assert running.result() is True
+    book.shutdown()
+    assert not book.pending
+    executor.shutdown()
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        FairExecutor(1, "lifo")
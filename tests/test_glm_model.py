@@ -0,0 +1,66 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from model.glm_model import GLMModel
+
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    """
+    本地的模型服务：按 keep-alive 保持连接，回显请求中的提示，并记录建立过的连接数。
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        body = json.dumps({"response": f"译:{payload['prompt']}"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EchoHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_reuse_pooled_connections(server):
+    model = GLMModel(f"http://127.0.0.1:{server.server_address[1]}/", timeout=5, pool_size=2)
+    try:
+        for idx in range(5):
+            assert model.make_request(f"sequential {idx}") == (f"译:sequential {idx}", True)
+        assert server.connections == 1
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(model.make_request, [f"parallel {idx}" for idx in range(10)]))
+        assert results == [(f"译:parallel {idx}", True) for idx in range(10)]
+        assert server.connections <= 2
+
+        stats = model.connection_stats()
+        assert stats["requests"] == 15
+        assert stats["connections"] == server.connections
+        assert stats["reuse_rate"] >= 1 - 2 / 15
+    finally:
+        model.close()
@@ -0,0 +1,78 @@
+import shutil
+
+from book import Content, ContentType, Page
+from fakes import FakeModel
+from translator import PDFTranslator
+from translator.checkpoint import CheckpointJournal
+
+
+def _translate(sample_pdf, checkpoint_dir, output, **kwargs):
+    model = FakeModel()
+    PDFTranslator(model, checkpoint_dir=str(checkpoint_dir)).translate_pdf(sample_pdf, "markdown", output_file_path=str(output), **kwargs)
+    return model
+
+
+def _revise(sample_pdf, tmp_path):
+    # 内容相同、文件不同的新版本
+    revised = tmp_path / "revised.pdf"
+    shutil.copyfile(sample_pdf, revised)
+    with open(revised, "ab") as f:
+        f.write(b"\n% revised\n")
+    return str(revised)
+
+
+def _pages(*texts_per_page):
+    pages = []
+    for texts in texts_per_page:
+        page = Page()
+        for text in texts:
+            page.add_content(Content(ContentType.TEXT, text))
+        pages.append(page)
+    return pages
+
+
+def test_previous_revision_is_reused(sample_pdf, tmp_path):
+    _translate(sample_pdf, tmp_path / "checkpoints", tmp_path / "first.md")
+    revised = _revise(sample_pdf, tmp_path)
+
+    model = _translate(revised, tmp_path / "checkpoints", tmp_path / "revised.md", previous=sample_pdf)
+    assert model.calls == 0
+    assert (tmp_path / "revised.md").read_text(encoding="utf-8") == (tmp_path / "first.md").read_text(encoding="utf-8")
+
+
+def test_previous_revision_matches_moved_contents(sample_pdf, tmp_path):
+    old = CheckpointJournal(sample_pdf, "中文", str(tmp_path))
+    old.record(0, 0, Content(ContentType.TEXT, "Unchanged"), "译:Unchanged")
+    old.record(0, 1, Content(ContentType.TEXT, "Moved"), "译:Moved")
+    old.close()
+    previous = old.path
+
+    journal = CheckpointJournal(sample_pdf, "English", str(tmp_path), previous=previous)
+    try:
+        assert journal.lookup(0, 0, Content(ContentType.TEXT, "Unchanged")) == "译:Unchanged"
+        assert journal.lookup(3, 2, Content(ContentType.TEXT, "Moved")) == "译:Moved"
+        assert journal.lookup(0, 1, Content(ContentType.TEXT, "Edited")) is None
+        assert journal.previous_hits == 2
+    finally:
+        journal.close()
+
+
+def test_only_new_and_changed_contents_are_translated(sample_pdf, tmp_path):
+    translator = PDFTranslator(FakeModel(), checkpoint_dir=str(tmp_path))
+    old = CheckpointJournal(sample_pdf, "中文", str(tmp_path))
+    translator._translate_pages(_pages(["Chapter one", "The old man"], ["The boy", "The sea"]), "中文", journal=old)
+    old.close()
+
+    # 新版本在最前面插入了一页，并修改了一段
+    model = FakeModel()
+    pages = _pages(["Preface"], ["Chapter one", "The old man"], ["The boy", "The calm sea"])
+    journal = CheckpointJournal(_revise(sample_pdf, tmp_path), "中文", str(tmp_path), previous=old.path)
+    try:
+        PDFTranslator(model)._translate_pages(pages, "中文", journal=journal)
+    finally:
+        journal.close()
+
+    assert sorted(prompt.split("：", 1)[1] for prompt in model.prompts) == ["Preface", "The calm sea"]
+    assert journal.previous_hits == 3
+    assert [[content.translation for content in page.contents] for page in pages] == [
+        ["译:Preface"], ["译:Chapter one", "译:The old man"], ["译:The boy", "译:The calm sea"]]
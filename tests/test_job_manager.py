@@ -0,0 +1,107 @@
+import os
+import shutil
+import time
+
+import pytest
+from fakes import FakeModel
+
+from app import create_app
+from service import JobManager, JobQueueFullError, TranslationJob
+
+
+def _wait(job: TranslationJob, timeout: float = 30):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.05)
+    assert job.finished
+
+
+def _submit(manager: JobManager, pdf_path: str, file_format: str = "markdown") -> TranslationJob:
+    job_id = manager.reserve()
+    upload = os.path.join(manager.job_dir(job_id), "book.pdf")
+    shutil.copy(pdf_path, upload)
+    return manager.submit(job_id, upload, file_format)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = JobManager(FakeModel(), workers=1, max_queue=1, output_dir=str(tmp_path / "jobs"))
+    yield manager
+    manager.shutdown()
+
+
+def test_job_runs_in_background(manager, sample_pdf):
+    job = _submit(manager, sample_pdf)
+    _wait(job)
+    assert job.status == TranslationJob.SUCCEEDED
+    assert job.pages_done == job.total_pages
+    assert job.partials == {}
+    assert "译:" in open(job.output_file_path, encoding="utf-8").read()
+    # 上传的PDF在翻译结束后删除，结果保留到过期
+    assert not os.path.exists(job.pdf_file_path)
+    assert job.expires_at == pytest.approx(job.finished_at + manager.result_ttl)
+
+
+def test_queue_full(manager):
+    manager.reserve()
+    manager.reserve()
+    with pytest.raises(JobQueueFullError):
+        manager.reserve()
+
+
+def test_delete_removes_job_dir(manager, sample_pdf):
+    client = create_app(manager).test_client()
+    job = _submit(manager, sample_pdf)
+    _wait(job)
+    assert client.delete(f"/jobs/{job.job_id}").status_code == 204
+    assert manager.get(job.job_id) is None
+    assert not os.path.exists(manager.job_dir(job.job_id))
+    assert client.delete(f"/jobs/{job.job_id}").status_code == 404
+
+
+def test_expired_jobs_are_removed(tmp_path, sample_pdf):
+    manager = JobManager(FakeModel(), workers=1, output_dir=str(tmp_path / "jobs"), result_ttl=0)
+    try:
+        job = _submit(manager, sample_pdf)
+        _wait(job)
+        assert manager.get(job.job_id) is None
+        assert not os.path.exists(manager.job_dir(job.job_id))
+    finally:
+        manager.shutdown()
+
+
+def test_stale_dirs_removed_on_start(tmp_path):
+    stale = tmp_path / "jobs" / "old"
+    stale.mkdir(parents=True)
+    os.utime(stale, (time.time() - 7200, time.time() - 7200))
+    fresh = tmp_path / "jobs" / "new"
+    fresh.mkdir()
+    JobManager(FakeModel(), output_dir=str(tmp_path / "jobs"), result_ttl=3600).shutdown()
+    assert not stale.exists() and fresh.exists()
+
+
+def test_ack_shortens_expiry(manager, sample_pdf):
+    client = create_app(manager).test_client()
+    with open(sample_pdf, "rb") as f:
+        response = client.post("/jobs", data={"file": (f, "test.pdf")})
+    assert response.status_code == 202
+    job = manager.get(response.get_json()["job_id"])
+    _wait(job)
+    expires_at = job.expires_at
+
+    # 重试或预取的下载不缩短保留时间
+    for _ in range(2):
+        response = client.get(f"/jobs/{job.job_id}/result")
+        assert response.status_code == 200
+        assert "译:" in response.get_data(as_text=True)
+        response.close()
+    assert job.expires_at == expires_at
+
+    response = client.post(f"/jobs/{job.job_id}/ack")
+    assert response.status_code == 200
+    assert job.expires_at <= time.time() + JobManager.DOWNLOAD_GRACE
+    assert client.post("/jobs/unknown/ack").status_code == 404
+
+    job.expires_at = time.time()  # 模拟宽限期结束
+    assert client.get(f"/jobs/{job.job_id}").status_code == 404
+    assert not os.path.exists(manager.job_dir(job.job_id))
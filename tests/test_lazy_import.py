@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+API_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+HEAVY_MODULES = ("pandas", "numpy", "PIL", "reportlab", "openai", "requests", "pdfplumber", "flask")
+
+
+def _loaded_heavy_modules(imports: str) -> set:
+    code = f"import sys\n{imports}\nprint(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    # 导入 utils 会在当前目录下创建日志目录，与 main.py 一样在 api 目录中运行
+    output = subprocess.run([sys.executable, "-c", code], cwd=API_DIR, capture_output=True, text=True, check=True).stdout
+    loaded = output.strip().splitlines()[-1] if output.strip() else ""
+    return set(loaded.split(",")) if loaded else set()
+
+
+def test_cli_modules_do_not_load_heavy_dependencies():
+    imports = ("from utils import ArgumentParser, ConfigLoader, LOG, METRICS\n"
+               "from model import create_cache, create_model\n"
+               "from translator import BatchTranslator, PDFTranslator, collect_books, create_content_filter, segment_index_options")
+    assert _loaded_heavy_modules(imports) == set()
+
+
+@pytest.mark.parametrize("imports, expected", [
+    ("from model import GLMModel", {"requests"}),
+    ("from book import TableContent\nTableContent([['a'], ['b']]).to_dataframe()", {"pandas", "numpy"}),
+])
+def test_heavy_dependencies_load_on_first_use(imports, expected):
+    assert _loaded_heavy_modules(imports) == expected
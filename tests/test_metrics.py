@@ -0,0 +1,42 @@
+import json
+
+from fakes import FakeModel
+from translator import PDFTranslator
+from utils import METRICS
+from utils.metrics import Metrics
+
+
+def test_run_report_counts_stages_and_requests(sample_pdf, tmp_path):
+    METRICS.reset()
+    model = FakeModel()
+    PDFTranslator(model).translate_pdf(sample_pdf, "markdown", output_file_path=str(tmp_path / "book.md"))
+    report_path = tmp_path / "reports" / "run.json"
+    METRICS.write_report(str(report_path), book=sample_pdf, model=model.model_name)
+
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert report["book"] == sample_pdf and report["model"] == "FakeModel"
+    stages = report["stages"]
+    assert {"parse", "request", "set_translation", "write"} <= set(stages)
+    assert stages["parse"]["count"] == 2
+    assert stages["request"]["count"] == model.calls
+    assert stages["write"]["count"] == 1
+    counters = report["counters"]
+    assert counters["requests"] == {"model=FakeModel": model.calls}
+    prompt_bytes = sum(len(prompt.encode("utf-8")) for prompt in model.prompts)
+    assert counters["request_bytes_in"] == {"model=FakeModel": prompt_bytes}
+
+
+def test_nested_timers_and_prometheus_export():
+    metrics = Metrics()
+    with metrics.timer("request"):
+        with metrics.timer("request"):
+            pass
+    metrics.inc("requests", model='a"b')
+    metrics.inc("rate_limited")
+
+    snapshot = metrics.snapshot()
+    assert snapshot["stages"]["request"]["count"] == 1
+    text = metrics.to_prometheus()
+    assert 'ai_translator_stage_calls_total{stage="request"} 1' in text
+    assert 'ai_translator_requests_total{model="a\\"b"} 1' in text
+    assert "ai_translator_rate_limited_total 1" in text
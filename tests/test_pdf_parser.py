@@ -0,0 +1,36 @@
+import os
+
+from book import ContentType
+from translator.pdf_parser import PDFParser, _in_any_bbox
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _contents(book):
+    return [[(content.content_type, content.original) for content in page.contents] for page in book.pages]
+
+
+def test_sharded_parse_matches_single_process():
+    pdf_file_path = os.path.join(TESTS_DIR, "The_Old_Man_of_the_Sea.pdf")
+    single = PDFParser().parse_pdf(pdf_file_path, pages=20)
+    sharded = PDFParser(workers=2).parse_pdf(pdf_file_path, pages=20)
+    assert len(sharded.pages) == 20
+    assert _contents(sharded) == _contents(single)
+
+
+def test_table_words_are_kept_out_of_page_text(sample_pdf):
+    page = PDFParser().parse_pdf(sample_pdf).pages[0]
+    assert [content.content_type for content in page.contents] == [ContentType.TEXT, ContentType.TABLE]
+    text, table = page.contents
+    assert text.original.endswith("Table Testing")
+    assert table.original[:2] == [["Fruit", "Color", "Price (USD)"], ["Apple", "Red", "1.20"]]
+    for word in ("Strawberry", "Blueberry", "Price (USD)", "1.20"):
+        assert word not in text.original
+
+
+def test_objects_are_assigned_by_center_point():
+    bboxes = [(100, 100, 200, 200)]
+    assert _in_any_bbox({"x0": 150, "x1": 160, "top": 150, "bottom": 160}, bboxes)
+    # 只有一部分落在表格区域内的文字按中心点归属，仍属于正文
+    assert not _in_any_bbox({"x0": 190, "x1": 260, "top": 150, "bottom": 160}, bboxes)
+    assert not _in_any_bbox({"pts": []}, bboxes)
@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from book import Content, ContentType, Page
+from fakes import FakeModel
+from translator import PDFTranslator
+from translator.content_filter import ContentFilter
+
+CODE = "def area(width, height):\n    return width * height\nresult = area(3, 4)"
+
+
+class SlowFirstModel(FakeModel):
+    """
+    越靠前的内容返回越慢的模型，并发时请求的完成顺序与提交顺序相反。
+    """
+
+    def make_request(self, prompt):
+        number = int(prompt.rsplit(" ", 1)[1])
+        time.sleep(max(0, 20 - number) * 0.005)
+        return super().make_request(prompt)
+
+
+def _pages(count=5, per_page=4):
+    pages = []
+    for page_idx in range(count):
+        page = Page()
+        for content_idx in range(per_page):
+            page.add_content(Content(ContentType.TEXT, f"Paragraph {page_idx * per_page + content_idx}"))
+        pages.append(page)
+    return pages
+
+
+def _translations(pages):
+    return [[content.translation for content in page.contents] for page in pages]
+
+
+def test_concurrent_translation_keeps_order():
+    sequential = _pages()
+    PDFTranslator(SlowFirstModel(), concurrency=1)._translate_pages(sequential, "中文")
+
+    concurrent = _pages()
+    done = []
+    PDFTranslator(SlowFirstModel(), concurrency=4)._translate_pages(concurrent, "中文", lambda page: done.append(concurrent.index(page)))
+
+    assert _translations(concurrent) == _translations(sequential)
+    assert _translations(concurrent)[0] == ["译:Paragraph 0", "译:Paragraph 1", "译:Paragraph 2", "译:Paragraph 3"]
+    assert done == list(range(len(concurrent)))
+
+
+def test_concurrent_translate_pdf_matches_sequential(sample_pdf, tmp_path):
+    outputs = []
+    for concurrency in (1, 4):
+        output = tmp_path / f"concurrency_{concurrency}.md"
+        PDFTranslator(FakeModel(), concurrency=concurrency).translate_pdf(sample_pdf, "markdown", output_file_path=str(output))
+        outputs.append(output.read_text(encoding="utf-8"))
+    assert outputs[0] == outputs[1]
+    assert "译:" in outputs[0]
+
+
+def test_streaming_output_matches_whole_book(sample_pdf, tmp_path):
+    outputs = []
+    for streaming in (False, True):
+        output = tmp_path / f"streaming_{streaming}.md"
+        PDFTranslator(FakeModel(), concurrency=2, streaming=streaming, queue_size=1).translate_pdf(sample_pdf, "markdown",
+                                                                                                  output_file_path=str(output))
+        outputs.append(output.read_text(encoding="utf-8"))
+    assert outputs[1] == outputs[0]
+    assert "译:" in outputs[0]
+
+
+class StreamingFakeModel(FakeModel):
+    """
+    逐词流式返回译文的模型。
+    """
+
+    supports_streaming = True
+
+    def make_stream_request(self, prompt, on_partial):
+        translation, status = self.make_request(prompt)
+        words = translation.split(" ")
+        for count in range(1, len(words) + 1):
+            on_partial(" ".join(words[:count]))
+        return translation, status
+
+
+def _final_partials(pages, **options):
+    partials = {}
+    PDFTranslator(StreamingFakeModel(max_chunk_chars=options.pop("max_chunk_chars", None)), **options)._translate_pages(
+        pages, "中文", partial_callback=lambda page_idx, content_idx, text: partials.__setitem__((page_idx, content_idx), text))
+    return partials
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"concurrency": 3},
+    {"batch_max_chars": 200},
+    {"max_chunk_chars": 30},
+    {"content_filter": ContentFilter()},
+    {"content_filter": ContentFilter(), "async_requests": True, "concurrency": 3},
+])
+def test_final_partial_equals_stored_translation(options):
+    pages = _pages(count=2, per_page=2)
+    pages[1].contents[0].original = "The old man fished alone. He went far out.\nThe boy had gone to another boat."
+    pages[1].contents[1].original = f"Run the following code:\n{CODE}\nThen the result is 12."
+    partials = _final_partials(pages, **options)
+
+    expected = {(page_idx, content_idx): content.translation
+                for page_idx, page in enumerate(pages) for content_idx, content in enumerate(page.contents)}
+    assert partials == expected
@@ -0,0 +1,72 @@
+import time
+
+from model.rate_limiter import RateLimiter, TokenBucket, estimate_tokens, parse_retry_after
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("abcd" * 10) == 10
+    assert estimate_tokens("你好") == 2
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after({"retry-after": "2"}) == 2.0
+    assert parse_retry_after({"retry-after-ms": "1500", "retry-after": "9"}) == 1.5
+    assert parse_retry_after({"retry-after": "not a date"}) is None
+
+
+def test_token_bucket_allows_overdraft_then_waits():
+    bucket = TokenBucket(60)  # 每秒补充1个
+    assert bucket.reserve(60) == 0.0
+    wait = bucket.reserve(2)
+    assert 1.9 < wait <= 2.0
+
+
+def test_concurrent_429s_back_off_once():
+    limiter = RateLimiter(requests_per_minute=600)
+    # 同一次过载中并发发出的请求同时收到429
+    issued = [limiter.acquire() for _ in range(5)]
+    for issued_at in issued:
+        limiter.on_rate_limited(issued_at=issued_at)
+    assert limiter.scale == RateLimiter.DECREASE_FACTOR
+    assert limiter.rate_limited_count == 5
+
+    # 降速之后发出的请求再次收到429时继续降速
+    issued_at = limiter.acquire()
+    limiter.on_rate_limited(issued_at=issued_at)
+    assert limiter.scale == RateLimiter.DECREASE_FACTOR ** 2
+
+
+def test_429_without_issue_time_always_backs_off():
+    limiter = RateLimiter(requests_per_minute=600)
+    limiter.on_rate_limited()
+    limiter.on_rate_limited()
+    assert limiter.scale == RateLimiter.DECREASE_FACTOR ** 2
+
+
+def test_retry_after_pauses_all_requests():
+    limiter = RateLimiter()
+    limiter.on_rate_limited(retry_after=0.2, issued_at=limiter.acquire())
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.15
+
+
+def test_learns_rate_on_first_429_and_recovers():
+    limiter = RateLimiter()
+    issued = [limiter.acquire() for _ in range(3)]
+    for issued_at in issued:
+        limiter.on_rate_limited(issued_at=issued_at)
+    assert limiter.request_bucket.rate_per_minute == RateLimiter.MIN_LEARNED_RPM
+    assert limiter.scale == 1.0  # 其余两个429来自学习速率之前发出的请求
+
+    limiter.scale = 0.5
+    limiter.on_success()
+    assert limiter.scale == 0.5 + RateLimiter.RECOVERY_STEP
+
+
+def test_backoff_delay_respects_bounds():
+    limiter = RateLimiter(base_delay=1.0, max_delay=4.0)
+    assert all(0 <= limiter.backoff_delay(attempt) <= 4.0 for attempt in range(1, 10))
+    assert limiter.backoff_delay(1, retry_after=3.0) >= 3.0
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+import pytest
+
+from model import glm_model
+from model.glm_model import GLMModel
+from model.replica_pool import ReplicaPool
+
+URLS = ["http://replica-a", "http://replica-b"]
+
+
+def _warm_up(pool, latency=0.01, samples=20):
+    for replica in pool.replicas:
+        replica.latencies.extend([latency] * samples)
+
+
+def test_failing_replica_is_ejected_and_probed_back():
+    probed = []
+    pool = ReplicaPool(URLS, max_failures=2, probe_interval=0.01, probe=lambda replica: probed.append(replica) or True)
+    try:
+        first, second = pool.replicas
+        for _ in range(2):
+            pool.release(pool.acquire(exclude=(second,)), ok=False)
+        assert not first.healthy and first.ejections == 1
+        assert all(pool.acquire() is second for _ in range(3))
+
+        deadline = time.monotonic() + 2
+        while not first.healthy and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert first.healthy and probed[0] is first
+    finally:
+        pool.close()
+
+
+def test_rate_limited_requests_do_not_eject():
+    pool = ReplicaPool(URLS[:1], max_failures=1)
+    pool.release(pool.acquire(), ok=None)
+    assert pool.replicas[0].healthy
+    # 所有副本都被摘除时仍选择其中一个，翻译不会停止
+    pool.release(pool.acquire(), ok=False)
+    assert not pool.replicas[0].healthy
+    assert pool.acquire() is pool.replicas[0]
+    assert pool.acquire(hedge=True) is None
+
+
+def test_hedge_delay_needs_replicas_and_samples():
+    assert ReplicaPool(URLS[:1], hedge_percentile=0.9).hedge_delay() is None
+    pool = ReplicaPool(URLS, hedge_percentile=0.9)
+    assert pool.hedge_delay() is None
+    _warm_up(pool, latency=0.2)
+    assert pool.hedge_delay() == pytest.approx(0.2)
+    assert ReplicaPool(URLS).hedge_delay() is None
+
+
+@pytest.fixture
+def hedged_model():
+    model = GLMModel(URLS, timeout=5, hedge_percentile=0.5)
+    _warm_up(model.replicas)
+    yield model
+    model.close()
+
+
+def test_slow_request_is_hedged(hedged_model):
+    def attempt(replica, payload, read_response, stream):
+        if replica.url == URLS[0]:
+            time.sleep(0.5)
+            return "slow"
+        return "fast"
+
+    hedged_model._attempt = attempt
+    assert hedged_model._send("prompt", {}, None, False) == "fast"
+    assert [replica["hedges"] for replica in hedged_model.replicas.stats()] == [0, 1]
+    assert hedged_model._hedge_delay(stream=True) is None
+
+
+def test_slow_async_request_is_hedged(hedged_model):
+    async def attempt(replica, payload, read_response, stream):
+        if replica.url == URLS[0]:
+            await asyncio.sleep(0.5)
+            return "slow"
+        return "fast"
+
+    hedged_model._attempt_async = attempt
+    assert asyncio.run(hedged_model._send_async("prompt", {}, None, False)) == "fast"
+
+
+def test_async_requests_are_not_hedged_when_hedging_is_off():
+    model = GLMModel(URLS, timeout=5)
+    _warm_up(model.replicas)
+    calls = []
+
+    async def attempt(replica, payload, read_response, stream):
+        calls.append(replica.url)
+        return "ok"
+
+    model._attempt_async = attempt
+    try:
+        assert asyncio.run(model._send_async("prompt", {}, None, False)) == "ok"
+        assert len(calls) == 1
+    finally:
+        model.close()
+
+
+def test_async_request_without_httpx_runs_in_a_thread(monkeypatch):
+    monkeypatch.setattr(glm_model, "httpx", None)
+    model = GLMModel(URLS[0], timeout=5)
+    model.make_request = lambda prompt: (f"译:{prompt}", True)
+    try:
+        assert asyncio.run(model.make_request_async("text")) == ("译:text", True)
+    finally:
+        model.close()
@@ -0,0 +1,109 @@
+from book import Content, ContentType, Page
+from fakes import FakeModel
+from translator import PDFTranslator, SegmentIndex
+
+PARAGRAPH = ("The old man was thin and gaunt with deep wrinkles in the back of his neck. "
+             "The brown blotches of the benevolent skin cancer the sun brings were on his cheeks.")
+
+
+def _page(text):
+    page = Page()
+    page.add_content(Content(ContentType.TEXT, text))
+    return page
+
+
+def test_repeated_head_and_tail_lines_are_split():
+    index = SegmentIndex(min_repeats=3)
+    for number in range(1, 4):
+        index.add_page(_page(f"Book Title\nBody line {number}a\nBody line {number}b\n- {number} -"))
+
+    assert index.split("Book Title\nBody\n- 9 -") == (["Book Title"], "Body", ["- 9 -"])
+    assert index.split("Other Title\nBody") == ([], "Other Title\nBody", [])
+
+
+def test_repeated_block_longer_than_the_edge_is_kept_whole():
+    index = SegmentIndex(min_repeats=3, edge_lines=2)
+    footer = "Copyright 2024 Asiaing.com. All rights reserved. This text may be\ncopied for personal use only and may not be\nsold or distributed."
+    for number in range(1, 4):
+        index.add_page(_page(f"Body line {number}.\n{footer}"))
+
+    assert index.split(f"Another body line.\n{footer}") == ([], f"Another body line.\n{footer}", [])
+
+
+BODIES = ["He was an old man.", "The boy loved him.", "They walked home.", "The sail was patched.", "It was cold.", "He slept."]
+
+
+def _pages_with_header():
+    return [_page(f"Book Title\n{body}\n- {number} -") for number, body in enumerate(BODIES, 1)]
+
+
+def test_headers_are_not_split_off_without_batching():
+    model = FakeModel()
+    PDFTranslator(model)._translate_pages(_pages_with_header(), "中文", segment_index=_observed(_pages_with_header()))
+    assert model.calls == 6
+
+
+def test_headers_are_batched_once():
+    model = FakeModel()
+    pages = _pages_with_header()
+    PDFTranslator(model, batch_max_chars=1000)._translate_pages(pages, "中文", segment_index=_observed(pages))
+
+    assert model.calls == 1
+    assert sum(prompt.count("Book Title") for prompt in model.prompts) == 1
+    assert pages[3].contents[0].translation == "译:Book Title\n译:The sail was patched.\n译:- 4 -"  # 页脚复用第一页的译文，替换其中的数字
+
+
+def _observed(pages):
+    index = SegmentIndex(min_repeats=3)
+    for page in pages:
+        index.add_page(page)
+    return index
+
+
+def test_near_duplicates_share_a_representative():
+    index = SegmentIndex(similarity=0.9)
+    variant = PARAGRAPH.replace("thin", "lean")
+    assert index.match(PARAGRAPH) is None
+    assert index.match(PARAGRAPH.upper()) == PARAGRAPH  # 归一化后完全相同
+    assert index.match(variant) == PARAGRAPH
+    assert index.match(variant) == PARAGRAPH  # 再次出现时仍返回同一个代表段落
+    assert index.match("A short paragraph.") is None
+
+
+def test_entries_are_bounded():
+    index = SegmentIndex(max_entries=2)
+    paragraphs = [PARAGRAPH, PARAGRAPH[::-1], "".join(sorted(PARAGRAPH))]
+    for paragraph in paragraphs:
+        assert index.match(paragraph) is None
+    assert len(index.paragraphs) == 2
+    assert len(index.shingles) == 2
+    assert {member for members in index.bands.values() for member in members} == set(index.shingles)
+
+    for number in range(10):
+        index.add_page(_page(f"Head {number} unique\nBody"))
+    assert len(index.segment_pages) == 2
+
+
+def test_duplicate_paragraphs_reuse_one_request():
+    variant = PARAGRAPH.replace("thin", "lean")
+    pages = [_page(text) for text in (PARAGRAPH, variant, variant, PARAGRAPH)]
+    model = FakeModel()
+    PDFTranslator(model)._translate_pages(pages, "中文", segment_index=SegmentIndex(similarity=0.9))
+
+    assert model.calls == 1
+    assert [page.contents[0].translation for page in pages] == [f"译:{PARAGRAPH}"] * 4
+
+
+def test_paragraphs_that_differ_only_in_numbers_are_translated_separately():
+    paragraph = ("The water was 40 degrees when the old man rowed out past the great well, and the boy had told him "
+                 "the fish would be deep. He watched the lines go down and kept them straight. ") * 3
+    other = paragraph.replace("40 degrees", "60 degrees")
+    index = SegmentIndex(similarity=0.9)
+    assert index.match(paragraph) is None
+    assert index.match(other) is None
+
+    pages = [_page(paragraph), _page(other)]
+    model = FakeModel()
+    PDFTranslator(model)._translate_pages(pages, "中文", segment_index=SegmentIndex(similarity=0.9))
+    assert model.calls == 2
+    assert [page.contents[0].translation for page in pages] == [f"译:{paragraph}", f"译:{other}"]
@@ -0,0 +1,74 @@
+import json
+
+from book import Page, TableContent
+from fakes import FakeModel, TABLE_MARKER
+from translator import PDFTranslator
+
+FRUITS = [["Fruit", "Color", "Price"], ["Apple", "Red", "1.20"], ["Kiwi", "Green", "1.00"]]
+PLUMS = [["Fruit", "Color", "Price"], ["Plum", "Red", "2024-01-01"]]
+
+
+class OmittingModel(FakeModel):
+    """
+    表格请求的返回结果中总是缺少指定单元格的模型。
+    """
+
+    def __init__(self, omit, **kwargs):
+        super().__init__(**kwargs)
+        self.omit = omit
+
+    def make_request(self, prompt):
+        translation, status = super().make_request(prompt)
+        if TABLE_MARKER in prompt:
+            answer = json.loads(translation.strip("`json\n"))
+            translation = json.dumps({key: value for key, value in answer.items() if value != f"译:{self.omit}"}, ensure_ascii=False)
+        return translation, status
+
+
+def _translate(model, *tables, **kwargs):
+    pages = []
+    for table in tables:
+        page = Page()
+        page.add_content(TableContent([list(row) for row in table]))
+        pages.append(page)
+    PDFTranslator(model, **kwargs)._translate_pages(pages, "中文")
+    return [page.contents[0] for page in pages]
+
+
+def _sent_cells(model):
+    return [json.loads(prompt.split(TABLE_MARKER, 1)[1]) for prompt in model.table_prompts()]
+
+
+def test_cells_are_sent_with_position_keys():
+    model = FakeModel()
+    fruits, plums = _translate(model, FRUITS, PLUMS)
+
+    assert fruits.translation == [["译:Fruit", "译:Color", "译:Price"], ["译:Apple", "译:Red", "1.20"], ["译:Kiwi", "译:Green", "1.00"]]
+    assert plums.translation == [["译:Fruit", "译:Color", "译:Price"], ["译:Plum", "译:Red", "2024-01-01"]]
+    first, second = _sent_cells(model)
+    assert first["t1r2c1"] == "Apple"
+    assert "1.20" not in first.values()  # 数字和日期不发送
+    # 第二个表格只发送本书中没有出现过的单元格
+    assert second == {"t2r2c1": "Plum"}
+
+
+def test_tables_share_a_request_when_batching():
+    model = FakeModel()
+    _translate(model, FRUITS, PLUMS, batch_max_chars=1000)
+    assert model.calls == 1
+
+
+def test_only_missing_cells_are_requested_again():
+    model = FakeModel(drop_cells={"Apple"})
+    fruits, = _translate(model, FRUITS)
+
+    assert fruits.status and fruits.translation[1][0] == "译:Apple"
+    assert _sent_cells(model)[1] == {"t1r2c1": "Apple"}
+
+
+def test_cells_missing_twice_are_translated_one_by_one():
+    model = OmittingModel("Kiwi")
+    fruits, = _translate(model, FRUITS)
+
+    assert fruits.translation[2][0] == "译:Kiwi"
+    assert [prompt for prompt in model.prompts if TABLE_MARKER not in prompt] == ["翻译为中文：Kiwi"]
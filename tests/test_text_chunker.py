@@ -0,0 +1,47 @@
+from translator.pdf_parser import PDFParser
+from translator.text_chunker import TextChunker
+
+
+def _rejoin(chunks, separators):
+    text = chunks[0]
+    for separator, chunk in zip(separators, chunks[1:]):
+        text += separator + chunk
+    return text
+
+
+def test_short_text_is_not_split():
+    assert TextChunker(100).split("Short text.") == ["Short text."]
+    assert TextChunker(None).split("x" * 10000) == ["x" * 10000]
+
+
+def test_parser_output_keeps_line_breaks(sample_pdf):
+    text = PDFParser().parse_pdf(sample_pdf).pages[0].contents[0].original
+    assert "\n\n" not in text  # 解析器去掉了空行，只能按行和句子切分
+
+    for max_chars in (80, 200, 400):
+        chunks, separators = TextChunker(max_chars).split_with_separators(text)
+        assert len(chunks) > 1
+        assert all(len(chunk) <= max_chars for chunk in chunks)
+        assert _rejoin(chunks, separators) == text
+    # 标题仍单独成行，不会与上一句合并
+    assert any(chunk.endswith("of the language.\nTable Testing") or chunk == "Table Testing"
+               for chunk in TextChunker(200).split(text))
+
+
+def test_prefers_sentence_boundaries():
+    text = "First sentence here. Second one\nwraps over a line. Third."
+    chunks, separators = TextChunker(40).split_with_separators(text)
+    assert chunks == ["First sentence here.", "Second one\nwraps over a line. Third."]
+    assert separators == [" "]
+
+
+def test_long_line_falls_back_to_whitespace_and_hard_cut():
+    chunks, separators = TextChunker(10).split_with_separators("abcdefghijklmnopqrstuvwxyz hello world")
+    assert chunks == ["abcdefghij", "klmnopqrst", "uvwxyz", "hello", "world"]
+    assert separators == ["", "", " ", " "]
+
+
+def test_chinese_sentences():
+    chunks, separators = TextChunker(10).split_with_separators("今天天气很好。我们去公园吧！好的。")
+    assert chunks == ["今天天气很好。", "我们去公园吧！好的。"]
+    assert separators == [""]
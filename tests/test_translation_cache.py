@@ -0,0 +1,53 @@
+import time
+
+from fakes import FakeModel
+from model.translation_cache import TranslationCache
+
+
+def test_put_get_and_reopen(tmp_path):
+    path = str(tmp_path / "cache" / "translations.sqlite3")
+    cache = TranslationCache(path)
+    assert cache.get("model-a", "prompt") is None
+    cache.put("model-a", "prompt", "译文")
+    assert cache.get("model-a", "prompt") == "译文"
+    assert cache.get("model-b", "prompt") is None  # 不同模型的译文互不复用
+    cache.close()
+
+    reopened = TranslationCache(path)
+    assert reopened.get("model-a", "prompt") == "译文"
+    assert reopened.stats()["size_bytes"] == len("译文".encode("utf-8"))
+    reopened.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite3"), max_size_mb=25 / 1024 / 1024)
+    cache.put("m", "a", "x" * 10)
+    time.sleep(0.01)
+    cache.put("m", "b", "x" * 10)
+    time.sleep(0.01)
+    assert cache.get("m", "a") is not None  # a 比 b 更近被访问
+    time.sleep(0.01)
+    cache.put("m", "c", "x" * 10)
+
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") is not None and cache.get("m", "c") is not None
+    assert cache.stats()["size_bytes"] == 20
+    cache.close()
+
+
+def test_model_requests_go_through_the_cache(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite3"))
+    model = FakeModel(fail={"bad"})
+    model.set_cache(cache)
+
+    assert model.request("翻译为中文：hello") == ("译:hello", True)
+    assert model.request("翻译为中文：hello") == ("译:hello", True)
+    assert model.calls == 1
+
+    # 校验不通过的缓存结果不会返回，失败的结果不会写入缓存
+    assert model.request("翻译为中文：hello", validator=lambda translation: False) == ("译:hello", True)
+    assert model.calls == 2
+    model.request("翻译为中文：bad")
+    model.request("翻译为中文：bad")
+    assert model.calls == 4
+    cache.close()
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from book import Content, ContentType, Page, TableContent
+from translator import writer
+from translator.writer import PdfPageStream, _page_elements
+
+
+def _translated_page():
+    page = Page()
+    text = Content(ContentType.TEXT, "Fruit prices")
+    text.set_translation("水果价格", True)
+    table = TableContent([["Fruit", "Price"], ["Apple", "1.0"], ["Banana", "2.0"]])
+    table.set_translation({"Fruit": "水果", "Price": "价格", "Apple": "苹果", "Banana": "香蕉"}, True)
+    page.add_content(text)
+    page.add_content(table)
+    return page
+
+
+def test_pdf_tables_keep_baseline_rows_without_header():
+    assert _page_elements(_translated_page()) == [("text", "水果价格"), ("table", [["苹果", "1.0"], ["香蕉", "2.0"]])]
+
+
+@pytest.fixture
+def pdf_font(monkeypatch):
+    # 测试环境没有中文字体，用 reportlab 自带的字体代替，译文只使用ASCII字符
+    import reportlab
+    monkeypatch.setattr(writer, "PDF_FONT_PATH", os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf"))
+
+
+def _text_page(text):
+    page = Page()
+    content = Content(ContentType.TEXT, text)
+    content.set_translation(f"Translated {text}", True)
+    page.add_content(content)
+    return page
+
+
+def _page_texts(pdf_file_path):
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(pdf_file_path)
+    try:
+        return [pdf[idx].get_textpage().get_text_range().strip() for idx in range(len(pdf))]
+    finally:
+        pdf.close()
+
+
+def test_chunked_pdf_matches_single_chunk(pdf_font, tmp_path):
+    outputs = []
+    for chunk_pages in (2, 32):
+        output = str(tmp_path / f"chunk_{chunk_pages}.pdf")
+        with PdfPageStream("book.pdf", output, chunk_pages=chunk_pages) as stream:
+            for idx in range(5):
+                stream.write_page(_text_page(f"page {idx}"))
+        outputs.append(_page_texts(output))
+        assert not [name for name in os.listdir(tmp_path) if name.startswith(".pdf_parts_")]
+
+    assert outputs[0] == outputs[1] == [f"Translated page {idx}" for idx in range(5)]